@@ -1,11 +1,19 @@
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import backtest
+from app.routers import backtest, jobs
+from app.services.executor import backtest_pool
+from app.services.jobs import BACKTEST_LOCAL_WORKERS, start_local_workers, stop_local_workers
+from app.services.job_store import BACKTEST_JOB_STORE
+from app.services.hot_cache import start_refresh_thread, stop_refresh_thread
+from app.services.price_store import price_store
 
 # from dotenv import load_dotenv
 from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+import logging
 import time
 
+logger = logging.getLogger('uvicorn.error')
+
 # load_dotenv()
 app = FastAPI(title="Stock Backtesting Service", version="1.0")
 
@@ -24,6 +32,23 @@ app.add_middleware(
 )
 
 app.include_router(backtest.router)
+app.include_router(jobs.router)
+
+@app.on_event("startup")
+def startup():
+    # 로컬 개발용 : 별도 worker 없이 API 프로세스 안에서 대기열 처리
+    if BACKTEST_LOCAL_WORKERS > 0:
+        start_local_workers(BACKTEST_LOCAL_WORKERS)
+    elif BACKTEST_JOB_STORE != "redis":
+        logger.warning("No backtest job worker can read the in-memory job store, jobs stay queued (set BACKTEST_LOCAL_WORKERS for local development)")
+    # 자주 쓰는 종목을 공유 메모리 맵 snapshot으로 게시 (여러 uvicorn worker 중 한 프로세스만 게시)
+    start_refresh_thread(price_store)
+
+@app.on_event("shutdown")
+def shutdown():
+    stop_local_workers()
+    stop_refresh_thread()
+    backtest_pool.shutdown()
 
 @app.get("/")
 def root():
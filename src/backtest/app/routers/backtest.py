@@ -1,11 +1,36 @@
-from fastapi import APIRouter, HTTPException
-from ..services.backtest import BacktestRequest, run_backtest
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from ..services.backtest import BacktestRequest, load_frames
+from ..services.runner import ENGINES, CHECKPOINT_ENGINES, validate_request, request_tickers, engine_args, format_results, result_key, checkpoint_key, save_checkpoint
+from ..services.serializers import ndjson_line, ndjson_portfolio
+from ..services.instrumentation import record_phases
+from ..services.executor import backtest_pool, PoolBusyError
+from ..services.admission import admission, ClientLimitError, estimate_cost, portfolio_cost, record_cost, sweep_cost, simulation_cost, optimize_cost, rolling_cost, correlation_cost
+from ..services.result_cache import result_cache, checkpoint_cache
+from ..services.hot_cache import hot_cache
+from ..services.sweep import SweepRequest, run_sweep, sweep_allocations
+from ..services.simulation import SimulationRequest, validate_simulation, historical_returns, simulation_shards, run_simulation_shard, summarize_simulation
+from ..services.optimizer import OptimizeRequest, validate_optimize, run_optimizer
+from ..services.rolling import RollingRequest, validate_rolling, run_rolling
+from ..services.correlation import CorrelationRequest, validate_correlation, run_correlation
+from ..services.returns import load_returns
 from datetime import datetime
+import contextlib
+import functools
+import asyncio
+import time
 
 router = APIRouter(prefix="/api/backtest", tags=["backtest"])
 
+
+def client_id(request: Request) -> str:
+    """ per-client admission key : X-Client-Id header (set by the UI / gateway), otherwise the peer address """
+    return request.headers.get("x-client-id") or (request.client.host if request.client else "unknown")
+
+
 @router.post("/run")
-async def backtest(params: BacktestRequest):
+async def backtest(params: BacktestRequest, request: Request):
     """
     Run backtest for input ticker, parameters
     Input:
@@ -14,8 +39,13 @@ async def backtest(params: BacktestRequest):
         "end_date": YYYY-mm-dd,
         "initial_capital": int,
         "cashflow": int,
-        "cashflow_freq": str,
+        "cashflow_freq": str,       # "none" / "monthly" / "quarterly" / "yearly" / "custom"
+        "cashflow_dates": [str],    # only with "custom"
         "adjust_inflation": bool,
+        "engine": str,  # "backtrader"(default) / "vector"
+        "format": str,  # "json"(default) / "columnar" / "ndjson"
+        "binary": bool, # columnar/ndjson series as base64 little-endian arrays
+        "profile": bool, # include per-phase timings of each portfolio run (bypasses the result cache)
         "portfolio": [
             {
                 "name": str,
@@ -24,7 +54,12 @@ async def backtest(params: BacktestRequest):
                 },
                 "drag": int,
                 "invest_dividends": bool,
-                "rebalance_freq": str
+                "rebalance_freq": str,      # same choices as cashflow_freq
+                "rebalance_dates": [str],   # only with "custom"
+                "abs_band": float,
+                "rel_band": float,
+                "strategy": str,            # "rebalance"(default) / "sma" / "rsi"
+                "strategy_params": {str: float}   # e.g., {"short_period": 20, "long_period": 50}
             }
         ]
     }
@@ -33,44 +68,403 @@ async def backtest(params: BacktestRequest):
         "start_date": ,
         "performance": ,
         "drawdown": ,
-        "annual_returns": 
+        "annual_returns": ,
+        "metrics": [{name: {"monthly_returns", "cagr", "volatility", "sharpe", "sortino", "max_drawdown", "rolling_returns"}}],
+        "fetch": {"tickers", "downloads", "downloaded_tickers", "cached_tickers", "fetch_ms"},
+        "cache": {"hits", "misses"},
+        "admission": {"tier", "estimated_cost"},
+        "profile": [{name: {"phases": {"fetch", "prepare", "feed", "run", "extract", "metrics": ms}, "total_ms"}}]   # only with "profile"
     }
+    Requests are admitted by estimated cost (tickers x bars x engine factor + fixed cost per portfolio, in seconds):
+    cheap ones run inline, the rest wait for a slot, over-budget ones get 400 (429 when the client has too many requests in flight)
+    format "columnar" : {"format", "date": [epoch day], "portfolios": [{"name", "performance", "drawdown", "annual_returns": {"year", "return"}, "metrics"}], "fetch", "cache"}
+    format "ndjson" : one {"type": "portfolio", "date", ...} line per finished portfolio, then {"type": "summary", "fetch", "cache"}
     """
     try:
-        # Date range validation
-        start_date = datetime.strptime(params.start_date, "%Y-%m-%d")
-        end_date = datetime.strptime(params.end_date, "%Y-%m-%d")
-        if start_date > end_date:
-            raise HTTPException(status_code=400, detail="Start date must be before end date")
-        
-        # Date range is restricted by 1year maximum
-        if abs((end_date - start_date).days) > 365:
-            raise HTTPException(status_code=400, detail="Date range must be within 1 year (under developing)")
-        if len(params.portfolio) == 0:
-            raise HTTPException(status_code=400, detail="Portfolio must not be empty")
-        elif len(params.portfolio) >=4:
-            raise HTTPException(status_code=400, detail="Portfolio must not be more than 4 (Under developing)")
+        validate_request(params)
+        ticket = await admission.acquire(client_id(request), estimate_cost(params))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ClientLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except PoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    fetch = {}
+    # cheap requests skip the process pool (shipping the data costs more than the run)
+    execute = run_in_threadpool if ticket.inline else backtest_pool.submit
+
+    def load_data():
+        # load every ticker of the request once, shared by all portfolios (only when a result is not cached)
+        if "task" not in fetch:
+            fetch["task"] = asyncio.ensure_future(run_in_threadpool(load_frames, request_tickers(params), params.start_date, params.end_date))
+        return fetch["task"]
+
+    async def compute(portfolio):
+        fetch["computed"] = fetch.get("computed", 0) + 1
+        data, _ = await load_data()
+        started = time.monotonic()
+        # hot tickers go to the pool as references to the snapshot version pinned until the run ends
+        with contextlib.nullcontext() if ticket.inline else hot_cache.reading() as snapshot:
+            if params.engine not in CHECKPOINT_ENGINES:
+                result = await execute(ENGINES[params.engine], *engine_args(params, portfolio, data, snapshot))
+            else:
+                # continue from the checkpoint of a shorter run with the same parameters
+                key = checkpoint_key(params, portfolio)
+                result, checkpoint = await execute(CHECKPOINT_ENGINES[params.engine], *engine_args(params, portfolio, data, snapshot), checkpoint_cache.get_local(key))
+                save_checkpoint(key, checkpoint)
+        record_cost(params.engine, portfolio_cost(params, portfolio), time.monotonic() - started)
+        return result
+
+    async def compute_for_cache(portfolio):
+        # phase timings go to the metrics, not into the cached result
+        return record_phases(params.engine, await compute(portfolio))
+
+    async def run_portfolio(portfolio):
+        if params.profile:
+            # profile requests always recompute (the cached result has no timings), then refresh the cache
+            result = await compute(portfolio)
+            await run_in_threadpool(result_cache.set, result_key(params, portfolio), record_phases(params.engine, result))
+            return {**result, "name": portfolio.name}
+        result = await result_cache.get_or_compute(result_key(params, portfolio), functools.partial(compute_for_cache, portfolio))
+        return {**result, "name": portfolio.name}
+
+    async def summary():
+        if "task" in fetch:
+            fetch_stats = (await fetch["task"])[1]
         else:
-            total_result = {
-                "performance": [],
-                "drawdown": [],
-                "annual_returns": []
-            }
-            # run backtest by portfolio
-            for portfolio in params.portfolio:
-                result = run_backtest(
-                    params.start_date,
-                    params.end_date,
-                    params.initial_capital,
-                    params.cashflow,
-                    params.cashflow_freq,
-                    params.adjust_inflation,
-                    portfolio
-                )
-                total_result["date"] = result["date"]
-                total_result["performance"].append({result['name']: result["performance"]})
-                total_result["drawdown"].append({result['name']: result["drawdown"]})
-                total_result["annual_returns"].append({result['name']: result["annual_returns"]})
+            # every portfolio was served from the result cache
+            fetch_stats = {"tickers": 0, "downloads": 0, "downloaded_tickers": 0, "cached_tickers": 0, "fetch_ms": 0}
+        computed = fetch.get("computed", 0)
+        return {
+            "fetch": fetch_stats,
+            "cache": {"hits": len(params.portfolio) - computed, "misses": computed},
+            "admission": {"tier": "inline" if ticket.inline else "queued", "estimated_cost": round(ticket.cost, 4)},
+        }
+
+    if params.format == "ndjson":
+        return StreamingResponse(stream_portfolios(params, run_portfolio, summary, ticket), media_type="application/x-ndjson")
+
+    try:
+        # run backtest by portfolio in parallel on the process pool
+        results = await asyncio.gather(*[run_portfolio(portfolio) for portfolio in params.portfolio])
+        total_result = format_results(params, results)
+        total_result.update(await summary())
         return total_result
+    except PoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Backtest did not finish within {backtest_pool.timeout} seconds")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        ticket.release()
+
+
+async def stream_portfolios(params: BacktestRequest, run_portfolio, summary, ticket):
+    """
+    NDJSON stream : one {"type": "portfolio"} line per portfolio in the order they finish,
+    then {"type": "summary", "fetch", "cache", "admission"} (or {"type": "error", "status", "detail"} if a portfolio failed)
+    The admission ticket is held until the stream ends
+    """
+    tasks = [asyncio.ensure_future(run_portfolio(portfolio)) for portfolio in params.portfolio]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield ndjson_line(ndjson_portfolio(await task, params.binary))
+        yield ndjson_line({"type": "summary", **(await summary())})
+    except Exception as e:
+        status = 503 if isinstance(e, PoolBusyError) else 504 if isinstance(e, asyncio.TimeoutError) else 500
+        yield ndjson_line({"type": "error", "status": status, "detail": str(e) or type(e).__name__})
+    finally:
+        for task in tasks:
+            task.cancel()
+        ticket.release()
+
+@router.post("/sweep")
+async def sweep(params: SweepRequest, request: Request):
+    """
+    Evaluate every combination of allocations x rebalance frequencies x cashflows over one ticker universe
+    Input:
+    {
+        "start_date": YYYY-mm-dd,
+        "end_date": YYYY-mm-dd,
+        "initial_capital": float,
+        "tickers": [str],
+        "allocations": [{str: float}],   # explicit allocations
+        "grid": {str: [float]},          # candidate weights per ticker, combinations summing to 100 are used
+        "rebalance_freqs": [str],
+        "cashflows": [float],
+        "cashflow_freq": str,
+        "include_series": bool
+    }
+    Output:
+    {
+        "tickers": [str],
+        "summary": {"allocation", "rebalance_freq", "cashflow", "final_value", "cagr", "max_drawdown", "volatility"},
+        "date": [str], "performance": [[float]]   # only with include_series
+    }
+    Admitted like /run, estimated cost: combinations x tickers x bars
+    """
+    try:
+        if datetime.strptime(params.start_date, "%Y-%m-%d") > datetime.strptime(params.end_date, "%Y-%m-%d"):
+            raise ValueError("Start date must be before end date")
+        if len(params.tickers) == 0:
+            raise ValueError("Tickers must not be empty")
+        sweep_allocations(params)
+        ticket = await admission.acquire(client_id(request), sweep_cost(params))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ClientLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except PoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    try:
+        tickers = sorted({ticker.upper() for ticker in params.tickers})
+        data, fetch_stats = await run_in_threadpool(load_frames, tickers, params.start_date, params.end_date)
+        execute = run_in_threadpool if ticket.inline else backtest_pool.submit
+        result = await execute(run_sweep, params, data)
+        result["fetch"] = fetch_stats
+        return result
+    except PoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Sweep did not finish within {backtest_pool.timeout} seconds")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        ticket.release()
+
+
+@router.post("/simulate")
+async def simulate(params: SimulationRequest, request: Request):
+    """
+    Monte Carlo simulation of portfolios by block bootstrap of historical daily returns
+    Input:
+    {
+        "start_date": YYYY-mm-dd,   # history to resample
+        "end_date": YYYY-mm-dd,
+        "initial_capital": float,
+        "cashflow": float,
+        "cashflow_freq": str,       # "monthly" / "quarterly" / "yearly"
+        "portfolio": [PortfolioItem],
+        "paths": int,
+        "years": int,
+        "block_size": int,          # consecutive trading days per resampled block
+        "percentiles": [float],
+        "seed": int
+    }
+    Output:
+    {
+        "percentiles": [float],
+        "results": [{"name", "contributions", "terminal_value", "max_drawdown", "cagr", "bands": {"year", "value"}}],
+        "fetch": {"tickers", "downloads", "downloaded_tickers", "cached_tickers", "fetch_ms"}
+    }
+    Admitted like /run, estimated cost: paths x simulated bars x tickers per portfolio
+    """
+    try:
+        validate_simulation(params)
+        ticket = await admission.acquire(client_id(request), simulation_cost(params))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ClientLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except PoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    try:
+        tickers = sorted({item.upper() for portfolio in params.portfolio for item in portfolio.allocation})
+        data, fetch_stats = await run_in_threadpool(load_frames, tickers, params.start_date, params.end_date)
+
+        # fan out the paths of every portfolio over the process pool (one shard per portfolio inline)
+        execute = run_in_threadpool if ticket.inline else backtest_pool.submit
+        shards = simulation_shards(params, 1 if ticket.inline else max(1, backtest_pool.size // len(params.portfolio)))
+        tasks = []
+        for portfolio in params.portfolio:
+            returns = historical_returns(portfolio, data)
+            tasks.append(asyncio.gather(*[
+                execute(run_simulation_shard, params, portfolio, returns, paths, seed)
+                for paths, seed in shards
+            ]))
+        results = await asyncio.gather(*tasks)
+        return {
+            "percentiles": params.percentiles,
+            "results": [summarize_simulation(params, portfolio, result) for portfolio, result in zip(params.portfolio, results)],
+            "fetch": fetch_stats,
+        }
+    except PoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Simulation did not finish within {backtest_pool.timeout} seconds")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        ticket.release()
+
+
+@router.post("/optimize")
+async def optimize(params: OptimizeRequest, request: Request):
+    """
+    Mean-variance optimization over one ticker set : minimum variance, maximum Sharpe and a sampled efficient frontier
+    Input:
+    {
+        "start_date": YYYY-mm-dd,   # history used for expected returns and covariance
+        "end_date": YYYY-mm-dd,
+        "tickers": [str],
+        "min_weight": float,        # per ticker bounds (%)
+        "max_weight": float,
+        "bounds": {str: [float, float]},    # per ticker [min, max] (%), overrides min_weight/max_weight
+        "risk_free": float,         # annual risk free rate (%)
+        "frontier_points": int
+    }
+    Output:
+    {
+        "tickers": [str],
+        "observations": int,
+        "converged": bool,          # false if any frontier point stopped at the iteration limit (approximate)
+        "min_variance": {"name", "allocation": {str: float}, "expected_return", "volatility", "sharpe"},
+        "max_sharpe": {...},
+        "frontier": [{...}],        # ascending expected return
+        "fetch": {"tickers", "downloads", "downloaded_tickers", "cached_tickers", "fetch_ms"}   # null when served from the returns cache
+    }
+    "allocation" is in the PortfolioItem format (%, sums to 100), ready for /api/backtest/run
+    Admitted like /run, estimated cost: tickers^2 x bars + frontier points x tickers^3
+    """
+    try:
+        validate_optimize(params)
+        ticket = await admission.acquire(client_id(request), optimize_cost(params))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ClientLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except PoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    try:
+        matrix, fetch_stats = await load_returns(params.tickers, params.start_date, params.end_date)
+        execute = run_in_threadpool if ticket.inline else backtest_pool.submit
+        result = await execute(run_optimizer, params, matrix)
+        result["fetch"] = fetch_stats
+        return result
+    except PoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Optimization did not finish within {backtest_pool.timeout} seconds")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        ticket.release()
+
+
+@router.post("/rolling")
+async def rolling(params: RollingRequest, request: Request):
+    """
+    Distribution of N-year results of one portfolio over every possible start date (rolling windows)
+    Input:
+    {
+        "start_date": YYYY-mm-dd,
+        "end_date": YYYY-mm-dd,
+        "portfolio": PortfolioItem,
+        "years": int,               # window length
+        "step": int,                # trading days between window starts (1 = every start date)
+        "percentiles": [float],
+        "include_series": bool      # per-window start date, CAGR and max drawdown
+    }
+    Output:
+    {
+        "name": str, "years": int, "windows": int, "percentiles": [float],
+        "cagr": {"percentiles": [float], "mean", "min", "max"},           # %
+        "max_drawdown": {"percentiles": [float], "mean", "min", "max"},   # %
+        "best": {"start", "end", "cagr", "max_drawdown"},                 # by CAGR
+        "worst": {...},
+        "series": {"start": [str], "cagr": [float], "max_drawdown": [float]},   # only with include_series
+        "fetch": {"tickers", "downloads", "downloaded_tickers", "cached_tickers", "fetch_ms"}
+    }
+    The portfolio is simulated once over the whole range without cashflows, windows are read from that single run
+    Admitted like /run, estimated cost: bars x (tickers + windows x window length)
+    """
+    try:
+        validate_rolling(params)
+        ticket = await admission.acquire(client_id(request), rolling_cost(params))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ClientLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except PoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    try:
+        tickers = sorted({item.upper() for item in params.portfolio.allocation})
+        data, fetch_stats = await run_in_threadpool(load_frames, tickers, params.start_date, params.end_date)
+        execute = run_in_threadpool if ticket.inline else backtest_pool.submit
+        result = await execute(run_rolling, params, data)
+        result["fetch"] = fetch_stats
+        return result
+    except PoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Rolling analysis did not finish within {backtest_pool.timeout} seconds")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        ticket.release()
+
+
+@router.post("/correlation")
+async def correlation(params: CorrelationRequest, request: Request):
+    """
+    Pairwise correlation, rolling correlation and volatility of the tickers in a portfolio allocation
+    Input:
+    {
+        "start_date": YYYY-mm-dd,
+        "end_date": YYYY-mm-dd,
+        "allocation": {str: float},     # PortfolioItem.allocation, weights the average correlation
+        "rolling_window": int           # trading days per rolling correlation, sampled at month ends
+    }
+    Output:
+    {
+        "tickers": [str],
+        "observations": int,
+        "correlation": [[float]],       # in "tickers" order
+        "volatility": {str: float},     # annualized (%)
+        "portfolio": {"volatility", "average_correlation", "diversification_ratio"},
+        "rolling": {"window": int, "date": [str], "average": [float], "pairs": {"A/B": [float]}},
+        "fetch": {"tickers", "downloads", "downloaded_tickers", "cached_tickers", "fetch_ms"}   # null when served from the returns cache
+    }
+    Daily return matrices are kept in a per-process LRU keyed by ticker set and date range, so repeated edits of the same portfolio are served from memory
+    Admitted like /run, estimated cost: tickers^2 x bars x rolling windows
+    """
+    try:
+        validate_correlation(params)
+        ticket = await admission.acquire(client_id(request), correlation_cost(params))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ClientLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except PoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    try:
+        matrix, fetch_stats = await load_returns(list(params.allocation), params.start_date, params.end_date)
+        execute = run_in_threadpool if ticket.inline else backtest_pool.submit
+        result = await execute(run_correlation, params, matrix)
+        result["fetch"] = fetch_stats
+        return result
+    except PoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Correlation did not finish within {backtest_pool.timeout} seconds")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        ticket.release()
@@ -0,0 +1,85 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from ..services.backtest import BacktestRequest
+from ..services.job_store import get_job_store
+from ..services.jobs import submit_job
+import asyncio
+import json
+
+router = APIRouter(prefix="/api/backtest", tags=["backtest"])
+
+# stream endpoint가 작업 상태를 확인하는 간격(초)
+STREAM_INTERVAL = 0.5
+
+
+def get_job_or_404(job_id: str) -> dict:
+    job = get_job_store().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@router.post("/jobs", status_code=202)
+async def create_job(params: BacktestRequest):
+    """
+    Submit backtest as a job and return job id immediately
+    Input: same as /api/backtest/run
+    Output: {"job_id": str, "status": "queued"}
+    """
+    try:
+        job_id = await run_in_threadpool(submit_job, params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    Return status and progress of the job
+    Output:
+    {
+        "job_id": str,
+        "status": "queued / running / done / failed",
+        "progress": {portfolio_name: {"bars": int, "total": int}},
+        "error": str
+    }
+    """
+    return get_job_or_404(job_id)
+
+
+@router.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    """
+    Return result of the finished job (same output as /api/backtest/run)
+    """
+    job = get_job_or_404(job_id)
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=job["error"])
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job['status']}")
+    return get_job_store().get_result(job_id)
+
+
+@router.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str):
+    """
+    Stream job status as NDJSON whenever it changes, until the job is done or failed
+    """
+    get_job_or_404(job_id)
+
+    async def events():
+        last_update = None
+        while True:
+            job = await run_in_threadpool(get_job_store().get, job_id)
+            if job is None:
+                break
+            if job["updated_at"] != last_update:
+                last_update = job["updated_at"]
+                yield json.dumps(job) + "\n"
+            if job["status"] in ("done", "failed"):
+                break
+            await asyncio.sleep(STREAM_INTERVAL)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
@@ -0,0 +1,235 @@
+from collections import defaultdict, deque
+from typing import Deque, Dict
+from datetime import date
+from prometheus_client import Counter, Gauge, Histogram
+import numpy as np
+import asyncio
+import logging
+import os
+
+from .backtest import BacktestRequest, PortfolioItem
+from .sweep import SweepRequest, sweep_allocations
+from .simulation import SimulationRequest
+from .optimizer import OptimizeRequest, FRONTIER_LAMBDAS
+from .rolling import RollingRequest
+from .correlation import CorrelationRequest
+from .metrics import TRADING_DAYS
+from .executor import BACKTEST_POOL_SIZE, BACKTEST_QUEUE_DEPTH, BACKTEST_JOB_TIMEOUT, PoolBusyError
+
+logger = logging.getLogger('uvicorn.error')
+
+# 비용 단위는 예상 실행 시간(초) : 종목 수 x bar 수 x 엔진 계수 (benchmarks 결과 기준)
+ENGINE_COST_FACTORS = {
+    "backtrader": float(os.getenv("ADMISSION_BACKTRADER_FACTOR", 2e-4)),
+    "vector": float(os.getenv("ADMISSION_VECTOR_FACTOR", 1e-6)),
+}
+# 한 번에 여러 조합/경로를 numpy 배열로 계산하는 분석 요청(/sweep, /simulate, /optimize, /rolling, /correlation)의 배열 원소 하나당 비용
+ADMISSION_ELEMENT_FACTOR = float(os.getenv("ADMISSION_ELEMENT_FACTOR", 1e-8))
+ADMISSION_PORTFOLIO_COST = float(os.getenv("ADMISSION_PORTFOLIO_COST", 0.01))  # 포트폴리오별 고정 비용 (리포트 계산, 결과 직렬화)
+ADMISSION_INLINE_COST = float(os.getenv("ADMISSION_INLINE_COST", 0.1))   # 이하이면 프로세스 풀 없이 API 프로세스에서 바로 실행
+ADMISSION_MAX_COST = float(os.getenv("ADMISSION_MAX_COST", 60))           # /run 요청 하나의 최대 비용, 초과하면 거절
+ADMISSION_JOB_MAX_COST = float(os.getenv("ADMISSION_JOB_MAX_COST", 1800))  # /jobs 요청 하나의 최대 비용
+ADMISSION_MAX_RUNNING = int(os.getenv("ADMISSION_MAX_RUNNING", 0)) or BACKTEST_POOL_SIZE  # 동시에 실행하는 대기열 요청 수
+ADMISSION_QUEUE_DEPTH = int(os.getenv("ADMISSION_QUEUE_DEPTH", BACKTEST_QUEUE_DEPTH))      # 실행을 기다릴 수 있는 요청 수
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", BACKTEST_JOB_TIMEOUT))  # 대기열에서 기다리는 최대 시간(초)
+ADMISSION_CLIENT_LIMIT = int(os.getenv("ADMISSION_CLIENT_LIMIT", 2))      # client별 동시에 실행/대기하는 요청 수
+
+# Prometheus metrics
+ADMISSION_REQUESTS = Counter('backtest_admission_total', 'Backtest admission decisions', ["decision"])
+ADMISSION_QUEUE = Gauge('backtest_admission_queue_depth', 'Backtest requests waiting for a slot')
+ADMISSION_RUNNING = Gauge('backtest_admission_running', 'Queued-tier backtest requests holding a slot')
+ESTIMATED_COST = Histogram('backtest_estimated_cost_seconds', 'Estimated cost per portfolio run (seconds)', ["engine"], buckets=[0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60])
+ACTUAL_COST = Histogram('backtest_actual_cost_seconds', 'Actual time per portfolio run (seconds)', ["engine"], buckets=[0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60])
+COST_RATIO = Histogram('backtest_cost_ratio', 'Actual / estimated cost per portfolio run', ["engine"], buckets=[0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 4, 10])
+
+
+class CostLimitError(ValueError):
+    """ 예상 비용이 허용 범위를 넘는 요청 """
+
+
+class ClientLimitError(Exception):
+    """ client의 동시 요청 수가 가득 찬 경우 """
+
+
+def estimated_bars(start_date: str, end_date: str) -> int:
+    """ 기간의 거래일 수 (주말 제외, 아직 오지 않은 날짜 제외) """
+    end = min(np.datetime64(end_date), np.datetime64(date.today().isoformat()))
+    return max(int(np.busday_count(np.datetime64(start_date), end + 1)), 1)
+
+
+def portfolio_cost(params: BacktestRequest, portfolio: PortfolioItem) -> float:
+    """ 포트폴리오 하나의 예상 비용(초) : 종목 수 x bar 수 x 엔진 계수 + 고정 비용 """
+    return len(portfolio.allocation) * estimated_bars(params.start_date, params.end_date) * ENGINE_COST_FACTORS[params.engine] + ADMISSION_PORTFOLIO_COST
+
+
+def estimate_cost(params: BacktestRequest) -> float:
+    """ 요청 전체의 예상 비용(초) """
+    return sum(portfolio_cost(params, portfolio) for portfolio in params.portfolio)
+
+
+def sweep_cost(params: SweepRequest) -> float:
+    """ /sweep 예상 비용(초) : 조합 수(비중 x 리밸런싱 주기 x 캐시플로우) x 종목 수 x bar 수 """
+    combinations = len(sweep_allocations(params)) * len(params.rebalance_freqs) * len(params.cashflows)
+    elements = combinations * len(params.tickers) * estimated_bars(params.start_date, params.end_date)
+    return elements * ADMISSION_ELEMENT_FACTOR + ADMISSION_PORTFOLIO_COST
+
+
+def simulation_cost(params: SimulationRequest) -> float:
+    """ /simulate 예상 비용(초) : 포트폴리오별 경로 수 x 시뮬레이션 bar 수 x 종목 수 """
+    horizon = params.years * TRADING_DAYS
+    elements = sum(params.paths * horizon * len(portfolio.allocation) for portfolio in params.portfolio)
+    return elements * ADMISSION_ELEMENT_FACTOR + ADMISSION_PORTFOLIO_COST * len(params.portfolio)
+
+
+def optimize_cost(params: OptimizeRequest) -> float:
+    """ /optimize 예상 비용(초) : 공분산(종목 수^2 x bar 수) + frontier λ별 active set 풀이(종목 수^3) """
+    tickers = len(params.tickers)
+    elements = tickers ** 2 * estimated_bars(params.start_date, params.end_date) + FRONTIER_LAMBDAS * tickers ** 3
+    return elements * ADMISSION_ELEMENT_FACTOR + ADMISSION_PORTFOLIO_COST
+
+
+def rolling_cost(params: RollingRequest) -> float:
+    """ /rolling 예상 비용(초) : 전체 기간 시뮬레이션(종목 수 x bar 수) + window별 낙폭(window 수 x window 길이) """
+    bars = estimated_bars(params.start_date, params.end_date)
+    elements = bars * len(params.portfolio.allocation) + bars // params.step * params.years * TRADING_DAYS
+    return elements * ADMISSION_ELEMENT_FACTOR + ADMISSION_PORTFOLIO_COST
+
+
+def correlation_cost(params: CorrelationRequest) -> float:
+    """ /correlation 예상 비용(초) : 종목 쌍 수 x bar 수 (전체 기간 + 월말마다 rolling window) """
+    bars = estimated_bars(params.start_date, params.end_date)
+    elements = len(params.allocation) ** 2 * bars * (1 + params.rolling_window * 12 / TRADING_DAYS)
+    return elements * ADMISSION_ELEMENT_FACTOR + ADMISSION_PORTFOLIO_COST
+
+
+def check_cost(cost: float, max_cost: float, hint: str = ""):
+    if cost > max_cost:
+        raise CostLimitError(
+            f"Estimated cost {cost:.1f}s exceeds the limit of {max_cost:g}s, "
+            f"use a shorter date range, fewer tickers or portfolios, or the vector engine{hint}"
+        )
+
+
+def record_cost(engine: str, estimated: float, actual: float):
+    """ 실제로 계산한 포트폴리오의 예상/실제 비용 기록 (결과 캐시에서 가져온 경우는 기록하지 않음) """
+    ESTIMATED_COST.labels(engine=engine).observe(estimated)
+    ACTUAL_COST.labels(engine=engine).observe(actual)
+    if estimated > 0:
+        COST_RATIO.labels(engine=engine).observe(actual / estimated)
+
+
+class Ticket:
+    """ 승인된 요청 하나, 실행이 끝나면 release() """
+    def __init__(self, controller: "AdmissionController", client: str, cost: float, inline: bool):
+        self.controller = controller
+        self.client = client
+        self.cost = cost
+        self.inline = inline
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.controller._release(self)
+
+
+class AdmissionController:
+    """
+    예상 비용에 따라 요청을 나눠 처리
+    - inline_cost 이하 : 대기 없이 API 프로세스의 thread에서 실행 (프로세스 풀로 데이터를 보내는 비용이 더 큼)
+    - max_cost 이하 : 동시에 max_running개까지 프로세스 풀에서 실행하고, 나머지는 queue_depth개까지 순서대로 대기
+    - max_cost 초과 : CostLimitError
+    client별로 실행/대기 중인 요청이 client_limit개를 넘으면 ClientLimitError,
+    대기열이 가득 차거나 queue_timeout 안에 차례가 오지 않으면 PoolBusyError
+    제한은 uvicorn worker 프로세스별로 적용된다.
+    """
+    def __init__(
+            self,
+            inline_cost: float = ADMISSION_INLINE_COST,
+            max_cost: float = ADMISSION_MAX_COST,
+            max_running: int = ADMISSION_MAX_RUNNING,
+            queue_depth: int = ADMISSION_QUEUE_DEPTH,
+            queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+            client_limit: int = ADMISSION_CLIENT_LIMIT,
+    ):
+        self.inline_cost = inline_cost
+        self.max_cost = max_cost
+        self.max_running = max_running
+        self.queue_depth = queue_depth
+        self.queue_timeout = queue_timeout
+        self.client_limit = client_limit
+        self.running = 0
+        self.clients: Dict[str, int] = defaultdict(int)
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self, client: str, cost: float) -> Ticket:
+        try:
+            check_cost(cost, self.max_cost, hint=" (or submit it as a job)")
+        except CostLimitError:
+            ADMISSION_REQUESTS.labels(decision="over_budget").inc()
+            raise
+        if self.clients[client] >= self.client_limit:
+            ADMISSION_REQUESTS.labels(decision="client_limit").inc()
+            raise ClientLimitError(f"Too many concurrent backtests from this client (limit {self.client_limit})")
+
+        inline = cost <= self.inline_cost
+        self.clients[client] += 1
+        if not inline:
+            try:
+                await self._wait_slot()
+            except BaseException:
+                self._release_client(client)
+                raise
+        ADMISSION_REQUESTS.labels(decision="inline" if inline else "queued").inc()
+        return Ticket(self, client, cost, inline)
+
+    async def _wait_slot(self):
+        """ 빈 실행 슬롯을 얻을 때까지 대기 (먼저 온 요청부터) """
+        if self.running < self.max_running and not self._waiters:
+            self.running += 1
+            ADMISSION_RUNNING.set(self.running)
+            return
+        if len(self._waiters) >= self.queue_depth:
+            ADMISSION_REQUESTS.labels(decision="busy").inc()
+            raise PoolBusyError(f"Backtest queue is full ({len(self._waiters)} requests waiting)")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUE.set(len(self._waiters))
+        try:
+            # 슬롯은 _release_slot에서 running 수를 유지한 채로 넘겨받음
+            await asyncio.wait_for(waiter, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            ADMISSION_REQUESTS.labels(decision="busy").inc()
+            raise PoolBusyError(f"Backtest did not start within {self.queue_timeout:g} seconds")
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            ADMISSION_QUEUE.set(len(self._waiters))
+
+    def _release_slot(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                ADMISSION_QUEUE.set(len(self._waiters))
+                return
+        self.running -= 1
+        ADMISSION_RUNNING.set(self.running)
+
+    def _release_client(self, client: str):
+        self.clients[client] -= 1
+        if self.clients[client] <= 0:
+            del self.clients[client]
+
+    def _release(self, ticket: Ticket):
+        self._release_client(ticket.client)
+        if not ticket.inline:
+            self._release_slot()
+
+
+admission = AdmissionController()
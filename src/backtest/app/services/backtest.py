@@ -1,182 +1,136 @@
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 from pydantic import BaseModel
-from collections import defaultdict
+from prometheus_client import Counter, Histogram
 import pandas as pd
-import yfinance as yf
+import numpy as np
 import backtrader as bt
 import logging
 import traceback
+import time
+
+from .price_store import price_store, dividend_matrix
+from .hot_cache import hot_cache, HotFrame
+from .metrics import backtest_report
+from .schedules import trading_dates, event_mask
+from .inflation import cpi_table, cashflow_amounts
+from .rebalance import band_breach
+from .strategies import strategy_exposure, exposure_changes
+from .recorder import BarRecorder
+from .instrumentation import PhaseTimer, trace_interval
 
 logger = logging.getLogger('uvicorn.error')
-logger.setLevel(logging.DEBUG)
+
+# Prometheus metrics
+PRICE_FETCH_LATENCY = Histogram('backtest_price_fetch_seconds', 'Price loading time per backtest request (seconds)', buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10])
+PRICE_FETCH_TICKERS = Counter('backtest_price_fetch_tickers', 'Number of tickers loaded for backtests', ["source"])
+
+# 진행 상황을 보고하는 bar 간격
+PROGRESS_INTERVAL = 250
+# 주문은 vector engine과 같이 주문한 bar의 종가에 체결 (cheat-on-close)
+# 매수 수량은 수수료를 제외하고, 체결 시점의 반올림 오차로 증거금 부족 거절이 나지 않도록 현금의 이 비율만큼 남김
+CASH_BUFFER = 1e-4
 
 # --- Input Data Schema ---
 class PortfolioItem(BaseModel):
     name: str
     allocation: Dict[str, float]  # e.g., {"AAPL": 50, "GOOGL": 50} => sum must be 100
     drag: float
-    invest_dividends: bool
-    rebalance_freq: str  # e.g., "monthly / yearly"
+    invest_dividends: bool  # 배당금으로 지급 종목을 다시 매수 (아니면 다음 리밸런싱까지 현금 보유)
+    rebalance_freq: str  # e.g., "none / monthly / quarterly / yearly / custom"
+    rebalance_dates: List[str] = []  # rebalance_freq가 "custom"인 경우 리밸런싱 날짜
+    abs_band: float = 0  # 리밸런싱 일정에 목표 비중과의 차이(%p)가 이 값을 넘는 종목이 있을 때만 리밸런싱
+    rel_band: float = 0  # 리밸런싱 일정에 목표 비중 대비 차이(%)가 이 값을 넘는 종목이 있을 때만 리밸런싱
+    strategy: str = "rebalance"  # e.g., "rebalance / sma / rsi" (strategies.STRATEGIES)
+    strategy_params: Dict[str, float] = {}  # e.g., {"short_period": 20, "long_period": 50}
 class BacktestRequest(BaseModel):
     start_date: str
     end_date: str
     initial_capital: float
     cashflow: float
-    cashflow_freq: str  # e.g., "monthly"
+    cashflow_freq: str  # e.g., "none / monthly / quarterly / yearly / custom"
+    cashflow_dates: List[str] = []  # cashflow_freq가 "custom"인 경우 입금 날짜
     adjust_inflation: bool
     portfolio: List[PortfolioItem]
+    engine: str = "backtrader"  # e.g., "backtrader / vector"
+    format: str = "json"  # e.g., "json / columnar / ndjson"
+    binary: bool = False  # columnar/ndjson series as base64 encoded little-endian arrays
+    profile: bool = False  # 포트폴리오별 단계별 실행 시간을 결과에 포함 (결과 캐시를 사용하지 않고 다시 계산)
 
 
 # --- Backtrader Strategy ---
-class SimpleMovingAverage(bt.Strategy):
-    """
-    A simple moving average strategy for backtesting.
-    """
-    params = (
-        ('sma_short_period', 20),
-        ('sma_long_period', 50),
-        ('cashflow', 0),
-        ('cashflow_freq', "monthly")
-    )
-
-    def log(self, txt, dt=None):
-        """
-        Logging function for the strategy.
-        """
-        dt = dt or self.datas[0].datetime.date(0).isoformat()
-        logger.info('%s, %s', dt, txt)
-
-    def __init__(self):
-        """
-        Initialize the strategy by creating a moving average indicator.
-        """
-        self.sma_short = {}
-        self.sma_long = {}
-        self.portfolio_value = []
-        self.drawdowns = []
-        self.counter = 0
-        self.dataclose = self.datas[0].close
-
-        for data in self.datas:
-            self.sma_short[data] = bt.indicators.SimpleMovingAverage(data.close, period=self.params.sma_short_period)
-            self.sma_long[data] = bt.indicators.SimpleMovingAverage(data.close, period=self.params.sma_long_period)
-
-    def next(self):
-        """
-        Execute the strategy logic for each trading day.
-        """
-        date = self.datetime.date(0).isoformat()
-        portfolio_value = self.broker.getvalue()
-
-        # drawdown 분석
-        drawdown_analyzer = self.analyzers.drawdown.get_analysis()
-        drawdown_value = drawdown_analyzer.drawdown if "drawdown" in drawdown_analyzer else 0
-        
-        # 계좌잔고와 drawdown_value는 소수점 둘째 자리까지만
-        portfolio_value = round(portfolio_value, 2)
-        drawdown_value = round(drawdown_value, 2)
-
-        self.portfolio_value.append((date, portfolio_value))
-        self.drawdowns.append((date, drawdown_value))
-
-        # Cashflow injection logic (monthly or yearly)
-        if self.params.cashflow > 0 and self.params.cashflow_freq == "monthly":
-            if self.counter % 20 == 0:  # Roughly once a month (20 trading days)
-                self.broker.add_cash(self.params.cashflow)
-        self.counter += 1
-        
-        # run SMA Strategy
-        for data in self.datas:
-            ticker = data._name
-            pos = self.getposition(data).size
-
-            sma_short = self.sma_short[data][0]
-            sma_long = self.sma_long[data][0]
-
-            # Buy if short SMA crosses above long SMA
-            if sma_short > sma_long and pos == 0:
-                cash_available = self.broker.get_cash()
-                size = cash_available / len(self.datas) / data.close[0]
-                self.buy(data=data, size=size)
-
-            # Sell if short SMA crosses below long SMA
-            elif sma_short < sma_long and pos > 0:
-                self.sell(data=data, size=pos)
-        self.log(f"Portfolio Value: {self.broker.getvalue():.2f}, Pos: {pos}, Close: {self.dataclose[0]}, Drawdown: {drawdown_value:.2f}")
-
-class RSI(bt.Strategy):
-    """
-    A relative strength index (RSI) strategy for backtesting.
-    """
-    params = (('rsi_period', 14), ('rsi_upper', 70), ('rsi_lower', 30))
-
-    def __init__(self):
-        """
-        Initialize the strategy by creating an RSI indicator.
-        """
-        self.rsi = bt.indicators.RSI(self.data.close, period=self.params.rsi_period)
-
-    def next(self):
-        """
-        Execute the strategy logic for each trading day.
-        """
-        if self.position.size == 0:
-            # Buy if the RSI is below the lower threshold
-            if self.rsi[0] < self.params.rsi_lower:
-                self.buy()
-        else:
-            # Sell if the RSI is above the upper threshold
-            if self.rsi[0] > self.params.rsi_upper:
-                self.sell()
-
+# 지표 기반 전략(SMA, RSI 등)은 strategies 모듈에서 전체 가격 행렬로 신호를 미리 계산해 signals로 전달
 class PortfolioRebalanceStrategy(bt.Strategy):
     params = (
         ('portfolio_allocation', {}),  # 종목별 목표 비중
         ('cashflow', 0),  # 캐시플로우 금액
         ('cashflow_freq', 'monthly'),  # 캐시플로우 주기
         ('invest_dividends', False),  # 배당 재투자 여부
-        ('adjust_inflation', False),  # 인플레이션 조정 여부
         ('abs_band', 0),    # 절대 편차 (%)
         ('rel_band', 0),    # 상대 편차 (%)
         ('rebalance_freq', 'monthly'),  # 리밸런싱 주기
+        ('rebalance_schedule', ()),  # bar별 리밸런싱 여부 (schedules.event_mask)
+        ('cashflow_amounts', ()),  # bar별 입금액 (inflation.cashflow_amounts, 물가 보정 포함)
+        ('signals', {}),  # 전략 노출이 바뀌는 bar index별 종목별 노출 {bar: [0~1]} (strategies.strategy_exposure, 첫 bar 포함)
+        ('dividends', {}),  # 배당락일 bar index별 종목별 주당 배당금 {bar: {종목: 금액}} (price_store.dividend_matrix)
+        ('commission', 0.001),  # 배당 재투자 수량 계산에 사용하는 수수료율
+        ('progress', None),  # 진행 상황 콜백 : progress(처리한 bar 수)
+        ('bars', 0),  # 전체 bar 수 (len(schedules.trading_dates)), 0이면 가장 긴 data feed 길이
+        ('prices', None),  # bar별 종목별 종가 [T, A] (self.datas 순서, 거래가 없는 날은 직전 종가), None이면 data feed에서 읽음
     )
 
     def __init__(self):
         self.counter = 0  # 거래일 카운터
-        self.inflation_factor = 1  # 인플레이션 보정 계수
-        self.portfolio_value = []   # 포트폴리오 가치
-        self.drawdowns = [] # 하락률
+        self.bar = -1  # 현재 bar index (schedules.trading_dates 기준)
+        # next()는 모든 종목의 거래일을 합친 날짜축의 bar마다 호출되므로 첫 종목의 feed 길이보다 길 수 있음
+        self.recorder = BarRecorder(self.params.bars or max(data.buflen() for data in self.datas))  # bar별 날짜, 포트폴리오 가치, 입금액
         self.dataclose = self.datas[0].close
-        self.rebalance_dates = self.get_rebalance_days()
         self.initial_invested = False
 
-        # 배당금 추적을 위한 변수
-        self.dividends = {data: 0 for data in self.datas}
-        
-        # 캐시플로우 적용일 계산
-        self.cashflow_days = self.get_cashflow_days()
-    
+        # 종목별 상태는 self.datas 순서의 배열로 관리 (리밸런싱을 배열 연산 한 번으로 계산)
+        # 보유 수량은 체결 알림(notify_order)으로 갱신하고, 가격은 미리 만든 종가 행렬에서 읽어 bar마다 종목별로 조회하지 않음
+        self.index = {data._name: i for i, data in enumerate(self.datas)}
+        self.sizes = np.zeros(len(self.datas))
+        # 재투자할 배당금 [(종목 index, 금액)] : broker.add_cash는 다음 bar의 주문 체결 뒤에 현금에 반영되므로 다음 bar에 매수
+        self.reinvest = []
+        self.weights = np.array([self.params.portfolio_allocation.get(data._name, 0) / 100 for data in self.datas])
+        self.targets = self.weights.copy()  # 전략 노출을 반영한 목표 비중
+        self.bands = (np.array([self.params.abs_band / 100]), np.array([self.params.rel_band / 100]))
+
+        # 매매 로그는 꺼져 있으면 메시지를 만들지 않도록 호출하는 곳에서 self.trace로 확인
+        self.trace_every = trace_interval()
+        self.trace = False
+
     # Logging function for the strategy
     def log(self, txt, dt=None):
         dt = dt or self.datas[0].datetime.date(0).isoformat()
-        logger.info('%s, %s', dt, txt)
-
-    def get_cashflow_days(self):
-        start_date = self.datas[0].datetime.date(0)
-        if self.params.cashflow_freq == 'monthly':
-            return {d.strftime('%Y-%m-%d') for d in pd.date_range(start_date, periods=100, freq='M')}
-        return set()
-
-    def get_rebalance_days(self):
-        start_date = self.datas[0].datetime.date(0)
-        if self.params.rebalance_freq == 'monthly':
-            return {d.strftime('%Y-%m-%d') for d in pd.date_range(start_date, periods=100, freq='M')}
-        elif self.params.rebalance_freq == 'yearly':
-            return {d.strftime('%Y-%m-%d') for d in pd.date_range(start_date, periods=100, freq='Y')}
-        return set()
+        logger.debug('%s, %s', dt, txt)
+
+    def notify_order(self, order):
+        # 기본 broker는 주문을 한 번에 체결하므로 완료된 주문만 반영 (증거금 부족 등으로 거절된 주문은 수량 변화 없음)
+        if order.status == order.Completed:
+            self.sizes[self.index[order.data._name]] += order.executed.size
+
+    def current_prices(self) -> np.ndarray:
+        """ 현재 bar의 종목별 종가 [A] """
+        if self.params.prices is not None:
+            return self.params.prices[self.bar]
+        return np.array([data.close[0] for data in self.datas])
 
     def next(self):
-        date = self.datetime.date(0).isoformat()
+        self.bar += 1
+        self.trace = self.trace_every > 0 and self.bar % self.trace_every == 0
+        reinvest, self.reinvest = self.reinvest, []
+
+        # 배당금 지급 (배당이 없는 bar는 dict 조회 한 번으로 끝남)
+        payouts = self.params.dividends.get(self.bar)
+        if payouts:
+            self.pay_dividends(payouts)
+
+        # 전략 신호 변경
+        exposure = self.params.signals.get(self.bar)
+        if exposure is not None:
+            self.targets = self.weights * exposure
+
         portfolio_value = self.broker.getvalue()
 
         # 초기 매수
@@ -184,207 +138,281 @@ class PortfolioRebalanceStrategy(bt.Strategy):
             self.initial_buy()
             self.initial_invested = True
 
-        # drawdown 분석
-        drawdown_analyzer = self.analyzers.drawdown.get_analysis()
-        drawdown_value = drawdown_analyzer.drawdown if "drawdown" in drawdown_analyzer else 0
-        
-        # 계좌잔고와 drawdown_value는 소수점 둘째 자리까지만
+        # 계좌잔고는 소수점 둘째 자리까지만 (drawdown은 백테스트 종료 후 metrics에서 계산)
         portfolio_value = round(portfolio_value, 2)
-        drawdown_value = round(drawdown_value, 2)
-
-        self.portfolio_value.append((date, portfolio_value))
-        self.drawdowns.append((date, drawdown_value))
-        
-        # 인플레이션 조정 (1970년 가치로 환산)
-        if self.params.adjust_inflation:
-            self.inflation_factor = self.get_inflation_factor(date)
-            portfolio_value /= self.inflation_factor
-
-        # 배당금 자동 재투자
-        if self.params.invest_dividends:
-            for data in self.datas:
-                self.broker.add_cash(self.dividends[data])
-                self.dividends[data] = 0
-        
+        self.recorder.record(self.datetime[0], portfolio_value)
+
+        if self.params.progress is not None and len(self) % PROGRESS_INTERVAL == 0:
+            self.params.progress(len(self))
+
         # 캐시플로우 처리
-        if date in self.cashflow_days and self.params.cashflow > 0:
-            cash_to_add = self.params.cashflow / self.inflation_factor
+        cash_to_add = self.params.cashflow_amounts[self.bar]
+        if cash_to_add > 0:
             self.broker.add_cash(cash_to_add)
-            self.log(f"Cashflow injected: {cash_to_add:.2f}")
+            self.recorder.add_cashflow(cash_to_add)
+            if self.trace:
+                self.log(f"Cashflow injected: {cash_to_add:.2f}")
 
-        # 리밸런싱 처리
-        if date in self.rebalance_dates:
-            self.rebalance(portfolio_value)
+        # 리밸런싱 처리 (신호가 바뀐 bar는 허용 범위와 관계없이 리밸런싱)
+        signal_changed = exposure is not None and self.bar > 0
+        rebalanced = False
+        if self.params.rebalance_schedule[self.bar] or signal_changed:
+            rebalanced = self.rebalance(portfolio_value, force=signal_changed)
 
-        for data in self.datas:
-            pos = self.getposition(data).size
-            self.log(f"Ticker: {data._name}, Position: {pos}, Portfolio Value: {self.broker.getvalue():.2f}, Close: {self.dataclose[0]}, Drawdown: {drawdown_value:.2f}")
+        # 직전 bar의 배당금 재투자 (리밸런싱한 bar는 배당금도 목표 비중대로 나눠 매수했으므로 생략)
+        if reinvest and not rebalanced:
+            self.reinvest_dividends(reinvest)
 
 
     def initial_buy(self):
         """ 백테스트 시작 시점에서 포트폴리오 비중에 맞춰 종목 매수 """
         total_cash = self.broker.get_cash()
-        self.log(f"Initial buy: {total_cash:.2f}")
-        
-        for data in self.datas:
+        if self.trace:
+            self.log(f"Initial buy: {total_cash:.2f}")
+
+        prices = self.current_prices()
+        for data, target_weight, price in zip(self.datas, self.targets, prices):
             ticker = data._name
-            target_weight = self.params.portfolio_allocation.get(ticker, 0) / 100  # 비중 변환
-            self.log(f"Target weight for {ticker}: {target_weight:.2f}")
+            if self.trace:
+                self.log(f"Target weight for {ticker}: {target_weight:.2f}")
             if target_weight > 0:
-                amount_to_invest = total_cash * target_weight
-                size = amount_to_invest / data.close[0]
+                amount_to_invest = total_cash * (1 - CASH_BUFFER) * target_weight
+                size = amount_to_invest / (price * (1 + self.params.commission))
                 if size > 0:
                     self.buy(data=data, size=size)
-                    self.log(f"Initial buy: {ticker}, Size: {size:.2f}, Price: {data.close[0]:.2f}")
+                    if self.trace:
+                        self.log(f"Initial buy: {ticker}, Size: {size:.2f}, Price: {price:.2f}")
                 else:
-                    self.log(f"Insufficient size for {ticker}: size={size:.2f}")
+                    if self.trace:
+                        self.log(f"Insufficient size for {ticker}: size={size:.2f}")
+
+    def pay_dividends(self, payouts):
+        """ 배당락일 보유 수량만큼 배당금을 현금으로 지급하고, invest_dividends이면 다음 bar에 지급한 종목을 다시 매수 """
+        for ticker, per_share in payouts.items():
+            i = self.index.get(ticker)
+            if i is None or per_share <= 0 or self.sizes[i] <= 0:
+                continue
+            data, size = self.datas[i], self.sizes[i]
+            amount = size * per_share
+            self.broker.add_cash(amount)
+            if self.trace:
+                self.log(f"Dividend paid: {data._name}, Amount: {amount:.2f}")
+            if self.params.invest_dividends:
+                self.reinvest.append((i, amount))
+
+    def reinvest_dividends(self, reinvest):
+        """ 지급된 배당금으로 해당 종목을 수수료를 제외하고 매수 """
+        prices = self.current_prices()
+        for i, amount in reinvest:
+            self.buy(data=self.datas[i], size=amount * (1 - CASH_BUFFER) / (prices[i] * (1 + self.params.commission)))
 
     # 리밸런싱
-    def rebalance(self, portfolio_value):
-        target_allocations = self.params.portfolio_allocation
-        total_cash = self.broker.get_cash()
-        
-        for data in self.datas:
-            ticker = data._name
-            target_weight = target_allocations.get(ticker, 0) / 100  # 비중 변환
-            current_value = self.getposition(data).size * data.close[0]
-            target_value = portfolio_value * target_weight
-            
-            abs_band_min = target_value * (1 - self.params.abs_band / 100)
-            abs_band_max = target_value * (1 + self.params.abs_band / 100)
-            rel_band_min = target_value * (1 - self.params.rel_band / 100)
-            rel_band_max = target_value * (1 + self.params.rel_band / 100)
-            
-            # 리밸런싱 필요 여부 확인
-            if current_value < abs_band_min or current_value > abs_band_max or \
-               current_value < rel_band_min or current_value > rel_band_max:
-                order_size = (target_value - current_value) / data.close[0]
-                if order_size > 0:
-                    self.buy(data=data, size=order_size)
-                    self.log(f"Rebalance buy for {ticker}: size={order_size:.2f}")
-                elif order_size < 0:
-                    self.sell(data=data, size=-order_size)
-                    self.log(f"Rebalance sell for {ticker}: size={-order_size:.2f}")
-
-    def get_inflation_factor(self, date):
-        # 여기서 CPI 데이터를 가져와 인플레이션 보정 계수를 계산할 수 있음.
-        # 예제에서는 간단한 가정으로 처리 (실제 CPI 데이터를 반영하려면 외부 데이터 필요)
-        base_year = 1970
-        current_year = date.year
-        inflation_rate = 0.03  # 연평균 3% 인플레이션 가정
-        return (1 + inflation_rate) ** (current_year - base_year)
-
+    def rebalance(self, portfolio_value, force=False):
+        """
+        현재 수량/가격 배열로 목표 수량과의 차이를 한 번에 계산하고, 허용 범위(abs_band, rel_band)를 벗어난 경우만 주문
+        (force이면 허용 범위와 관계없이 주문) 매도 주문을 먼저 내서 매수에 필요한 현금을 확보
+        Output: 주문했으면 True (허용 범위 안이라 주문하지 않았으면 False)
+        """
+        prices = self.current_prices()
+        sizes = self.sizes
+        current = sizes * prices / portfolio_value
+        if not force and not band_breach(current[None], self.targets[None], *self.bands)[0]:
+            return False
+
+        orders = (portfolio_value * self.targets - sizes * prices) / prices
+        sells = np.flatnonzero(orders < 0)
+        buys = np.flatnonzero(orders > 0)
+        # 매수는 보유 현금과 매도 대금 안에서 수수료를 포함해 체결되도록 비율대로 줄임 (입금액은 다음 리밸런싱부터 사용)
+        commission = self.params.commission
+        available = (self.broker.get_cash() - orders[sells] @ prices[sells] * (1 - commission)) * (1 - CASH_BUFFER)
+        cost = orders[buys] @ prices[buys] * (1 + commission)
+        if cost > available:
+            orders[buys] *= max(available, 0) / cost
+        for i in sells:
+            self.sell(data=self.datas[i], size=-orders[i])
+        for i in buys:
+            self.buy(data=self.datas[i], size=orders[i])
+        if self.trace:
+            self.log(f"Rebalance: {len(sells)} sells, {len(buys)} buys")
+        return True
+
+
+class ArrayData(bt.feeds.PandasData):
+    """
+    PandasData와 같은 컬럼을 읽는 feed
+    행마다 DataFrame.iloc으로 값을 하나씩 읽는 대신 시작할 때 컬럼을 list로 한 번 꺼내 둠 (종목 수가 많으면 preload 시간 대부분이 iloc)
+    """
+    def start(self):
+        super().start()
+        df = self.p.dataname
+        self._columns = [
+            (getattr(self.lines, field), df.iloc[:, index].to_numpy(dtype=np.float64).tolist())
+            for field, index in self._colmapping.items() if index is not None and field != "datetime"
+        ]
+        self._dtnums = [bt.date2num(ts) for ts in df.index.to_pydatetime()]
+
+    def _load(self):
+        self._idx += 1
+        if self._idx >= len(self._dtnums):
+            return False
+        for line, values in self._columns:
+            line[0] = values[self._idx]
+        self.lines.datetime[0] = self._dtnums[self._idx]
+        return True
 
 
 # --- Helper Functions ---
-def fetch_data(ticker: str, start: str, end: str):
+def fetch_frame(ticker: str, start: str, end: str) -> pd.DataFrame:
+    """
+    Return OHLCV data of the ticker as a DataFrame indexed by Date (with dividends / stock_splits columns)
+    Prices are served from the local price store, only missing ranges are downloaded from yfinance
+    """
     try:
-        # Download data from yfinance
-        df = yf.download(ticker, start=start, end=end)
-
-        # Convert shape of df with correct shape of BT's DataFeed 
-        df.columns = df.columns.droplevel(1)
-        df = df.rename(columns={"Price": "Close"})
-        df.columns.name = None
-        df = df.reset_index().rename(columns={"index":"Date"}).set_index("Date")
-
-        df.rename(columns={
-            "Open": "open",
-            "High": "high",
-            "Low": "low",
-            "Close": "close",
-            "Volume": "volume",
-        }, inplace=True)
-
-        if df.empty:
-            raise ValueError(f"No data found for ticker {ticker} in the given date range.")
-        # Convert to Backtrader data feed
-        data = bt.feeds.PandasData(dataname=df)
-        return data
+        return price_store.get_frame(ticker, start, end)
     except Exception as e:
         raise ValueError(f"Error fetching data for {ticker}: {e}")
 
 
-def calculate_annual_returns(portfolio_values):
-    """Calculate annual returns from daily portfolio values."""
+def fetch_data(ticker: str, start: str, end: str):
+    # Convert to Backtrader data feed
+    return bt.feeds.PandasData(dataname=fetch_frame(ticker, start, end))
 
-    # Create a dictionary to track yearly values
-    yearly_returns = defaultdict(list)
-    for date, value in portfolio_values:
-        year = pd.to_datetime(date).year
-        yearly_returns[year].append(value)
 
-    annual_returns = []
-    for year, values in yearly_returns.items():
-        start_value = values[0]
-        end_value = values[-1]
-        annual_return = ((end_value / start_value) - 1) * 100
-        annual_returns.append({"year": year, "return": annual_return})
-    return annual_returns
+def load_frames(tickers: List[str], start: str, end: str):
+    """
+    Load OHLCV data of every ticker in one batched step
+    Duplicated tickers are fetched once, and the result is shared by all portfolio runs of a request
+    Output: ({TICKER: DataFrame}, fetch stats)
+    """
+    start_time = time.time()
+    try:
+        frames, stats = price_store.ensure_many(tickers, start, end)
+    except Exception as e:
+        raise ValueError(f"Error fetching data for {', '.join(tickers)}: {e}")
+    frames = {ticker: price_store.slice(df, start, end) for ticker, df in frames.items()}
+    stats["fetch_ms"] = round((time.time() - start_time) * 1000, 2)
 
-def run_backtest(
-        start_date: str,
-        end_date: str,
-        initial_capital: float,
-        cashflow: float,
-        cashflow_freq: str,
-        adjust_inflation: bool,
-        portfolio: List[PortfolioItem],
-):
-    cerebro = bt.Cerebro()
-
-    # Add strategy with parameters
-    strategy = PortfolioRebalanceStrategy
-    cerebro.addstrategy(
-        strategy,
-        portfolio_allocation=portfolio.allocation,
-        cashflow=cashflow,
-        cashflow_freq=cashflow_freq,
-        invest_dividends=portfolio.invest_dividends,
-        adjust_inflation=adjust_inflation,
-        rebalance_freq=portfolio.rebalance_freq
-    )
+    PRICE_FETCH_LATENCY.observe(stats["fetch_ms"] / 1000)
+    PRICE_FETCH_TICKERS.labels(source="download").inc(stats["downloaded_tickers"])
+    PRICE_FETCH_TICKERS.labels(source="store").inc(stats["cached_tickers"])
+    return frames, stats
 
-    # strategy = SimpleMovingAverage
-    # cerebro.addstrategy(strategy, cashflow=cashflow, cashflow_freq=cashflow_freq)
 
-    # Add data feeds
-    logger.debug("Add data feeds")
+def portfolio_frames(portfolio: PortfolioItem, start: str, end: str, data: Optional[Dict[str, pd.DataFrame]] = None):
+    """
+    Return {ticker: DataFrame} of the portfolio from preloaded data, or fetch it when data is not given
+    Hot tickers passed as snapshot references (HotFrame) are read from that snapshot version without copying
+    """
+    frames = {}
     for item in portfolio.allocation:
         try:
-            data = fetch_data(item, start_date, end_date)
-            cerebro.adddata(data, name=item)
+            if data is None:
+                df = fetch_frame(item, start, end)
+            else:
+                df = data.get(item.upper())
+                if isinstance(df, HotFrame):
+                    df = hot_cache.load(df, start, end)
+            if df is None or df.empty:
+                raise ValueError(f"No data found for ticker {item} in the given date range.")
+            frames[item] = df
         except ValueError as e:
             logger.debug(f"Failed to add data for ticker {item}: {e}")
             raise ValueError(f"Failed to add data for ticker {item}: {e}")
+    return frames
 
-    # Set initial capital and commission
-    logger.debug("Set initial capital and commission")
-    cerebro.broker.setcash(initial_capital)
-    cerebro.broker.setcommission(commission=0.001)
 
-    # Set drawdown analyzer
-    cerebro.addanalyzer(bt.analyzers.DrawDown, _name="drawdown")
+def run_backtest(
+        start_date: str,
+        end_date: str,
+        initial_capital: float,
+        cashflow: float,
+        cashflow_freq: str,
+        adjust_inflation: bool,
+        portfolio: PortfolioItem,
+        data: Optional[Dict[str, pd.DataFrame]] = None,
+        cashflow_dates: Optional[List[str]] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+):
+    """
+    Backtrader 엔진으로 포트폴리오 하나를 실행
+    결과의 "profile"은 단계별 실행 시간 (fetch, prepare, feed, run, extract, metrics)
+    """
+    timer = PhaseTimer()
+    with timer.phase("fetch"):
+        frames = portfolio_frames(portfolio, start_date, end_date, data)
+
+    with timer.phase("prepare"):
+        # 이벤트 일정을 실행 전에 bar index로 변환 (next()에서는 index로만 확인)
+        dates = trading_dates(frames)
+        total_bars = len(dates)
+        tickers = list(frames)
+        dividends = dividend_matrix(frames, dates, tickers)
+
+        # 전략 신호는 실행 전에 전체 종가 행렬에서 계산하고, 노출이 바뀌는 bar만 전달
+        close = pd.concat([frames[ticker]["close"] for ticker in tickers], axis=1).reindex(dates.astype("datetime64[ns]")).ffill().to_numpy()
+        exposure = strategy_exposure(portfolio.strategy, portfolio.strategy_params, close)
+        signals = {}
+        if exposure is not None:
+            changed = exposure_changes(exposure)
+            changed[0] = True
+            signals = {int(bar): exposure[bar] for bar in np.flatnonzero(changed)}
+        dividend_bars = {
+            int(bar): {ticker: float(amount) for ticker, amount in zip(tickers, dividends[bar]) if amount}
+            for bar in np.flatnonzero(dividends.any(axis=1))
+        }
+
+    with timer.phase("feed"):
+        cerebro = bt.Cerebro()
+        # Add strategy with parameters
+        cerebro.addstrategy(
+            PortfolioRebalanceStrategy,
+            portfolio_allocation=portfolio.allocation,
+            cashflow=cashflow,
+            cashflow_freq=cashflow_freq,
+            invest_dividends=portfolio.invest_dividends,
+            rebalance_freq=portfolio.rebalance_freq,
+            abs_band=portfolio.abs_band,
+            rel_band=portfolio.rel_band,
+            rebalance_schedule=event_mask(dates, portfolio.rebalance_freq, portfolio.rebalance_dates).tolist(),
+            cashflow_amounts=cashflow_amounts(dates, event_mask(dates, cashflow_freq, cashflow_dates), max(cashflow, 0), adjust_inflation).tolist(),
+            dividends=dividend_bars,
+            signals=signals,
+            progress=(lambda bars: progress(bars, total_bars)) if progress else None,
+            bars=total_bars,
+            prices=close,
+        )
+
+        # Add data feeds
+        for item, df in frames.items():
+            cerebro.adddata(ArrayData(dataname=df), name=item)
+
+        # Set initial capital and commission
+        cerebro.broker.setcash(initial_capital)
+        cerebro.broker.setcommission(commission=0.001)
+        cerebro.broker.set_coc(True)
 
     # Run the backtest
-    logger.debug("Run the backtest")
-    try:
-        results = cerebro.run()
-    except Exception as e:
-        logger.debug(f"Error during backtest: {e}")
-        logger.debug(traceback.format_exc())
-        raise ValueError(f"Error during backtest: {e}")
+    with timer.phase("run"):
+        try:
+            results = cerebro.run()
+        except Exception as e:
+            logger.debug(f"Error during backtest: {e}")
+            logger.debug(traceback.format_exc())
+            raise ValueError(f"Error during backtest: {e}")
     strategy_instance = results[0]  # Get the first strategy instance
-
-    # Extract portfolio performance data
-    date, performance = zip(*strategy_instance.portfolio_value)
-    drawdown = [dd for _,dd in strategy_instance.drawdowns]
-    annual_returns = calculate_annual_returns(strategy_instance.portfolio_value)
-
+    if progress:
+        progress(strategy_instance.recorder.size, total_bars)
+
+    # Extract portfolio performance data (recorder의 배열을 그대로 사용)
+    with timer.phase("extract"):
+        recorder = strategy_instance.recorder
+        dates = recorder.dates
+        date_strings = np.datetime_as_string(dates, unit="D").tolist()
+    with timer.phase("metrics"):
+        report = backtest_report(dates, recorder.values, recorder.cashflows, cpi_table.deflator(dates), adjust_inflation)  # performance, drawdown, annual_returns, metrics
     return {
         "name": portfolio.name,
-        "date": list(date),
-        "performance": list(performance),
-        "drawdown": list(drawdown),
-        "annual_returns": annual_returns  # List of {"year": int, "return": float}
+        "date": date_strings,
+        **report,
+        "profile": timer.profile(),
     }
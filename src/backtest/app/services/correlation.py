@@ -0,0 +1,116 @@
+from typing import Dict
+from datetime import datetime
+from pydantic import BaseModel
+import numpy as np
+import os
+
+from .metrics import TRADING_DAYS
+
+CORRELATION_MAX_TICKERS = int(os.getenv("CORRELATION_MAX_TICKERS", 50))
+CORRELATION_MAX_WINDOW = TRADING_DAYS * 5
+
+
+# --- Input Data Schema ---
+class CorrelationRequest(BaseModel):
+    start_date: str
+    end_date: str
+    allocation: Dict[str, float]    # PortfolioItem.allocation, 비중은 평균 상관계수와 분산 효과 계산에 사용
+    rolling_window: int = 63        # rolling 상관계수 계산 bar 수 (월말마다 계산)
+
+
+def validate_correlation(params: CorrelationRequest):
+    """ 상관관계 요청 검증, 잘못된 요청이면 ValueError """
+    if datetime.strptime(params.start_date, "%Y-%m-%d") > datetime.strptime(params.end_date, "%Y-%m-%d"):
+        raise ValueError("Start date must be before end date")
+    tickers = {ticker.upper() for ticker in params.allocation}
+    if len(tickers) < 2:
+        raise ValueError("At least 2 tickers are required")
+    if len(tickers) > CORRELATION_MAX_TICKERS:
+        raise ValueError(f"Tickers must not be more than {CORRELATION_MAX_TICKERS}")
+    if len(tickers) != len(params.allocation):
+        raise ValueError("Allocation has duplicated tickers")
+    if any(weight < 0 for weight in params.allocation.values()) or sum(params.allocation.values()) <= 0:
+        raise ValueError("Allocation weights must not be negative and must not all be zero")
+    if not 2 <= params.rolling_window <= CORRELATION_MAX_WINDOW:
+        raise ValueError(f"Rolling window must be between 2 and {CORRELATION_MAX_WINDOW}")
+
+
+def correlation_matrix(returns: np.ndarray) -> np.ndarray:
+    """
+    열 사이의 상관계수 [..., A, A] (returns [..., T, A])
+    변동이 없는 종목(현금성 자산 등)과의 상관계수는 0
+    """
+    centered = returns - returns.mean(axis=-2, keepdims=True)
+    cov = np.einsum("...ta,...tb->...ab", centered, centered)
+    std = np.sqrt(np.diagonal(cov, axis1=-2, axis2=-1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / (std[..., :, None] * std[..., None, :])
+    corr = np.clip(np.nan_to_num(corr, nan=0.0, posinf=0.0, neginf=0.0), -1, 1)
+    index = np.arange(returns.shape[-1])
+    corr[..., index, index] = 1
+    return corr
+
+
+def average_correlation(corr: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """ 서로 다른 종목 쌍의 상관계수를 비중 곱으로 가중평균 [...] (비중이 한 종목에 몰려 있으면 단순 평균) """
+    pair_weights = np.outer(weights, weights)
+    np.fill_diagonal(pair_weights, 0)
+    if pair_weights.sum() <= 0:
+        pair_weights = 1 - np.eye(len(weights))
+    return (corr * pair_weights).sum(axis=(-2, -1)) / pair_weights.sum()
+
+
+def month_ends(dates: np.ndarray) -> np.ndarray:
+    """ 각 월의 마지막 bar index """
+    months = dates.astype("datetime64[M]")
+    return np.flatnonzero(np.r_[months[1:] != months[:-1], True])
+
+
+def run_correlation(params: CorrelationRequest, matrix: dict) -> dict:
+    """
+    일별 수익률 행렬(returns.aligned_returns)로 종목 간 상관관계와 변동성 계산
+    Output:
+    {
+        "tickers": [str], "observations": int,
+        "correlation": [[float]],                           # [A][A]
+        "volatility": {str: float},                         # 연환산 (%)
+        "portfolio": {"volatility", "average_correlation", "diversification_ratio"},
+        "rolling": {"window": int, "date": [str], "average": [float], "pairs": {"A/B": [float]}}   # 월말 기준
+    }
+    """
+    tickers, returns, dates = matrix["tickers"], matrix["returns"], matrix["dates"]
+    allocation = {ticker.upper(): weight for ticker, weight in params.allocation.items()}
+    weights = np.array([allocation[ticker] for ticker in tickers], dtype=np.float64)
+    weights /= weights.sum()
+
+    corr = correlation_matrix(returns)
+    cov = np.cov(returns, rowvar=False) * TRADING_DAYS
+    vol = np.sqrt(np.diag(cov))
+    portfolio_vol = float(np.sqrt(max(weights @ cov @ weights, 0)))
+
+    # rolling 상관계수 : 월말마다 직전 window bar의 [월, bar, 종목] view를 한 번에 계산
+    window = params.rolling_window
+    ends = month_ends(dates)
+    ends = ends[ends >= window - 1]
+    views = np.lib.stride_tricks.sliding_window_view(returns, window, axis=0)[ends - window + 1]  # [K, A, window]
+    rolling = correlation_matrix(np.swapaxes(views, -2, -1)) if len(ends) else np.empty((0, len(tickers), len(tickers)))
+    pairs = [(i, j) for i in range(len(tickers)) for j in range(i + 1, len(tickers))]
+
+    return {
+        "tickers": tickers,
+        "observations": len(returns),
+        "correlation": np.round(corr, 4).tolist(),
+        "volatility": {ticker: round(float(v) * 100, 4) for ticker, v in zip(tickers, vol)},
+        "portfolio": {
+            "volatility": round(portfolio_vol * 100, 4),
+            "average_correlation": round(float(average_correlation(corr, weights)), 4),
+            # 종목 변동성의 가중합 / 포트폴리오 변동성 (1이면 분산 효과 없음)
+            "diversification_ratio": round(float(weights @ vol / portfolio_vol), 4) if portfolio_vol > 0 else None,
+        },
+        "rolling": {
+            "window": window,
+            "date": np.datetime_as_string(dates[ends], unit="D").tolist(),
+            "average": np.round(average_correlation(rolling, weights), 4).tolist(),
+            "pairs": {f"{tickers[i]}/{tickers[j]}": np.round(rolling[:, i, j], 4).tolist() for i, j in pairs},
+        },
+    }
@@ -0,0 +1,86 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+import multiprocessing
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger('uvicorn.error')
+
+
+def available_cpus() -> int:
+    """
+    Pod에 할당된 CPU 수
+    cgroup v2의 CPU quota(cpu.max)가 있으면 그 값을, 없으면 프로세스가 사용할 수 있는 CPU 수를 사용
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+BACKTEST_POOL_SIZE = int(os.getenv("BACKTEST_POOL_SIZE", 0)) or available_cpus()
+BACKTEST_QUEUE_DEPTH = int(os.getenv("BACKTEST_QUEUE_DEPTH", 16))
+BACKTEST_JOB_TIMEOUT = float(os.getenv("BACKTEST_JOB_TIMEOUT", 120))
+
+
+class PoolBusyError(Exception):
+    """ 실행 중인 작업과 대기열이 모두 가득 찬 경우 """
+
+
+class BacktestPool:
+    """
+    CPU 연산인 백테스트를 event loop 밖의 프로세스 풀에서 실행
+    - size : 동시에 실행하는 프로세스 수
+    - queue_depth : 실행 대기 가능한 작업 수, 초과하면 PoolBusyError
+    - timeout : 작업별 대기 시간(초), 초과하면 asyncio.TimeoutError
+    시간이 초과된 작업의 결과는 버려지지만, 이미 실행 중인 프로세스는 작업이 끝날 때까지 점유된다.
+    자식 프로세스가 비정상 종료(OOM kill 등)되면 풀을 버리고 다음 작업에서 새로 생성한다.
+    """
+    def __init__(self, size: int = BACKTEST_POOL_SIZE, queue_depth: int = BACKTEST_QUEUE_DEPTH, timeout: float = BACKTEST_JOB_TIMEOUT):
+        self.size = size
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self.pending = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # 부모 프로세스의 thread(가격 다운로드 등)를 복제하지 않도록 spawn으로 생성
+            self._pool = ProcessPoolExecutor(max_workers=self.size, mp_context=multiprocessing.get_context("spawn"))
+            logger.info(f"Backtest process pool started: size={self.size}, queue_depth={self.queue_depth}")
+        return self._pool
+
+    async def submit(self, fn: Callable, *args):
+        """ 프로세스 풀에서 fn(*args)를 실행하고 결과를 기다림 """
+        if self.pending >= self.size + self.queue_depth:
+            raise PoolBusyError(f"Backtest queue is full ({self.pending} jobs pending)")
+
+        self.pending += 1
+        pool = self._get_pool()
+        try:
+            loop = asyncio.get_running_loop()
+            return await asyncio.wait_for(loop.run_in_executor(pool, fn, *args), timeout=self.timeout)
+        except BrokenProcessPool:
+            # 같은 풀의 다른 작업이 이미 새 풀로 바꿨으면 그대로 둠
+            if self._pool is pool:
+                logger.error("Backtest process pool is broken (a worker died), restarting it on the next job")
+                pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+            raise
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+backtest_pool = BacktestPool()
@@ -0,0 +1,298 @@
+from typing import Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+import pandas as pd
+import numpy as np
+import threading
+import logging
+import shutil
+import fcntl
+import json
+import time
+import os
+
+from .symbols import store_symbol
+
+logger = logging.getLogger('uvicorn.error')
+
+# 자주 쓰는 종목을 메모리 맵 파일로 한 번만 게시하고, 같은 Pod의 uvicorn worker와 프로세스 풀이 복사 없이 공유
+HOT_TICKERS = [store_symbol(t) for t in os.getenv("HOT_TICKERS", "SPY,QQQ,VTI,IWM,TLT,IEF,AGG,GLD,AAPL,MSFT").split(",") if t.strip()]
+HOT_TICKER_DIR = os.getenv("HOT_TICKER_DIR", os.path.join(os.getenv("PRICE_STORE_DIR", "data/prices"), "hot"))
+HOT_TICKER_START = os.getenv("HOT_TICKER_START", "1990-01-01")
+HOT_TICKER_REFRESH = int(os.getenv("HOT_TICKER_REFRESH", 21600))  # 게시 주기(초), 0이면 게시하지 않고 읽기만
+HOT_TICKER_CHECK = float(os.getenv("HOT_TICKER_CHECK", 5))        # 새 snapshot 확인 간격(초)
+
+MANIFEST = "manifest.json"
+READERS = ".readers"    # snapshot을 읽는 동안 공유 잠금(flock)을 거는 파일, 게시자는 배타 잠금을 얻은 버전만 삭제
+
+
+def covered(info: dict, start: str, end: str) -> bool:
+    """ [start, end) 구간 전체가 manifest의 종목 커버리지에 있는지 (오늘 이후는 확정되지 않으므로 오늘까지만 확인) """
+    return info["start"] <= start and min(end, date.today().isoformat()) <= info["end"]
+
+
+def open_frame(directory: str, ticker: str, columns: List[str]) -> pd.DataFrame:
+    """ snapshot 디렉토리의 종목 하나를 메모리 맵 위의 DataFrame으로 (복사 없음) """
+    values = np.load(os.path.join(directory, f"{ticker}.npy"), mmap_mode="r")
+    dates = np.load(os.path.join(directory, f"{ticker}.dates.npy"))
+    return pd.DataFrame(values, index=pd.DatetimeIndex(dates, name="Date"), columns=columns, copy=False)
+
+
+class HotFrame:
+    """
+    특정 버전의 snapshot에 있는 종목 하나의 참조
+    프로세스 풀에는 DataFrame 대신 이 참조를 보내고, 엔진 프로세스는 자신의 manifest와 관계없이 같은 버전을 읽는다.
+    """
+    def __init__(self, directory: str, ticker: str, columns: List[str]):
+        self.directory = directory
+        self.ticker = ticker
+        self.columns = columns
+
+
+class HotSnapshot:
+    """ HotTickerCache.reading()이 고정한 snapshot 버전 """
+    def __init__(self, directory: str, manifest: dict):
+        self.directory = directory
+        self.manifest = manifest
+
+    def reference(self, ticker: str, start: str, end: str) -> Optional[HotFrame]:
+        """ [start, end) 구간 전체가 이 snapshot에 있으면 참조, 아니면 None """
+        ticker = store_symbol(ticker)
+        info = self.manifest["tickers"].get(ticker)
+        if info is None or not covered(info, start, end):
+            return None
+        return HotFrame(self.directory, ticker, self.manifest["columns"])
+
+
+class HotTickerCache:
+    """
+    게시된 hot ticker snapshot을 읽는 쪽
+    - <root>/manifest.json : 현재 snapshot 버전, 컬럼, 종목별 커버리지 (os.replace로 원자적으로 교체)
+    - <root>/<version>/<TICKER>.npy : [T, C] float64 값, <TICKER>.dates.npy : [T] 날짜
+    값 배열은 np.load(mmap_mode="r")로 열어 page cache를 모든 프로세스가 공유하고,
+    DataFrame도 복사 없이 메모리 맵 위에 만든다 (읽기 전용이므로 수정하려면 copy 필요).
+    """
+    def __init__(self, root: str = HOT_TICKER_DIR, check_interval: float = HOT_TICKER_CHECK):
+        self.root = root
+        self.check_interval = check_interval
+        self._manifest: Optional[dict] = None
+        self._mtime = None
+        self._checked = 0.0
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        """ manifest가 바뀌었으면 새 snapshot으로 전환 (check_interval마다 stat 한 번) """
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        path = os.path.join(self.root, MANIFEST)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            self._manifest, self._mtime, self._frames = None, None, {}
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read hot ticker manifest: {e}")
+            return
+        if self._manifest is None or manifest["version"] != self._manifest["version"]:
+            # 이전 snapshot의 DataFrame을 사용 중인 요청은 기존 메모리 맵을 그대로 사용
+            self._frames = {}
+        self._manifest, self._mtime = manifest, mtime
+
+    def invalidate(self):
+        """ 다음 조회에서 바로 manifest를 다시 확인 """
+        self._checked = 0.0
+
+    def _directory(self) -> str:
+        return os.path.join(self.root, self._manifest["version"])
+
+    def _open(self, ticker: str) -> pd.DataFrame:
+        return open_frame(self._directory(), ticker, self._manifest["columns"])
+
+    def get(self, ticker: str) -> Optional[Tuple[pd.DataFrame, Tuple[str, str]]]:
+        """ hot ticker이면 (전체 DataFrame, 커버리지 [start, end)), 아니면 None """
+        ticker = store_symbol(ticker)
+        with self._lock:
+            self._refresh()
+            if self._manifest is None or ticker not in self._manifest["tickers"]:
+                return None
+            info = self._manifest["tickers"][ticker]
+            if ticker not in self._frames:
+                try:
+                    self._frames[ticker] = self._open(ticker)
+                except OSError as e:
+                    logger.error(f"Failed to open hot ticker {ticker}: {e}")
+                    return None
+            return self._frames[ticker], (info["start"], info["end"])
+
+    @contextmanager
+    def reading(self):
+        """
+        현재 snapshot 버전을 with 블록 동안 고정 (공유 잠금을 건 버전은 게시자가 삭제하지 않음)
+        프로세스 풀로 HotFrame 참조를 보낸 요청은 실행이 끝날 때까지 이 블록 안에 있어야 한다.
+        Output: HotSnapshot, snapshot이 없거나 삭제 중이면 None
+        """
+        with self._lock:
+            self._refresh()
+            manifest = self._manifest
+        if manifest is None:
+            yield None
+            return
+        directory = os.path.join(self.root, manifest["version"])
+        try:
+            readers = open(os.path.join(directory, READERS))
+        except FileNotFoundError:
+            yield None
+            return
+        with readers:
+            try:
+                fcntl.flock(readers, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield None
+                return
+            # 잠금을 얻기 전에 게시자가 삭제를 마쳤을 수 있음
+            yield HotSnapshot(directory, manifest) if os.path.isdir(directory) else None
+
+    def load(self, ref: HotFrame, start: str, end: str) -> pd.DataFrame:
+        """ 참조가 가리키는 버전의 [start, end) 구간 (메모리 맵의 view, 현재 버전이면 열어 둔 DataFrame을 재사용) """
+        with self._lock:
+            self._refresh()
+            current = self._manifest is not None and self._directory() == ref.directory
+            df = self._frames.get(ref.ticker) if current else None
+        if df is None:
+            df = open_frame(ref.directory, ref.ticker, ref.columns)
+            if current:
+                with self._lock:
+                    self._frames.setdefault(ref.ticker, df)
+        return df.iloc[df.index.searchsorted(pd.Timestamp(start)):df.index.searchsorted(pd.Timestamp(end))]
+
+
+hot_cache = HotTickerCache()
+
+
+# --- Publisher ---
+def publish_snapshot(store, tickers: List[str] = HOT_TICKERS, start: str = HOT_TICKER_START, root: str = HOT_TICKER_DIR) -> Optional[str]:
+    """
+    가격 저장소의 hot ticker를 새 snapshot 디렉토리에 쓰고 manifest를 교체
+    읽는 쪽은 manifest만 보고 전환하므로 쓰는 도중의 snapshot을 읽지 않는다.
+    이전 snapshot 하나는 전환 중인 프로세스를 위해 남기고, 그보다 오래된 snapshot은 읽는 중(reading)이 아니면 삭제
+    (읽는 중인 버전은 다음 게시 때 다시 확인, 이미 열린 메모리 맵은 파일이 삭제되어도 유지됨)
+    Output: 게시한 버전 (게시할 종목이 없으면 None)
+    """
+    end = (date.today() + timedelta(days=1)).isoformat()
+    frames, _ = store.ensure_many(tickers, start, end)
+
+    version = datetime.now().strftime("%Y%m%dT%H%M%S") + f"-{os.getpid()}"
+    tmp_dir = os.path.join(root, f".{version}.tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    open(os.path.join(tmp_dir, READERS), "w").close()
+    columns, entries = None, {}
+    for ticker, df in frames.items():
+        coverage = store.get_entry(ticker)[1]
+        if df.empty or coverage is None:
+            logger.warning(f"Hot ticker {ticker} has no stored prices, skipped")
+            continue
+        columns = list(df.columns)
+        np.save(os.path.join(tmp_dir, f"{ticker}.npy"), np.ascontiguousarray(df.to_numpy(dtype=np.float64)))
+        np.save(os.path.join(tmp_dir, f"{ticker}.dates.npy"), df.index.values.astype("datetime64[ns]"))
+        entries[ticker] = {"start": coverage[0], "end": coverage[1], "rows": len(df)}
+    if not entries:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return None
+    os.replace(tmp_dir, os.path.join(root, version))
+
+    manifest_path = os.path.join(root, MANIFEST)
+    previous = None
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)["version"]
+    with open(f"{manifest_path}.{os.getpid()}.tmp", "w") as f:
+        json.dump({"version": version, "columns": columns, "tickers": entries, "published": datetime.now().isoformat()}, f)
+    os.replace(f"{manifest_path}.{os.getpid()}.tmp", manifest_path)
+    hot_cache.invalidate()
+
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if os.path.isdir(path) and not name.startswith(".") and name not in (version, previous):
+            remove_snapshot(path)
+    logger.info(f"Published hot ticker snapshot {version}: {len(entries)} tickers")
+    return version
+
+
+def remove_snapshot(path: str) -> bool:
+    """ 읽는 중인 프로세스가 없으면 snapshot 디렉토리를 삭제, 삭제했으면 True """
+    try:
+        readers = open(os.path.join(path, READERS))
+    except FileNotFoundError:
+        # 잠금 파일이 없는 이전 형식의 snapshot
+        shutil.rmtree(path, ignore_errors=True)
+        return True
+    with readers:
+        try:
+            fcntl.flock(readers, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info(f"Hot ticker snapshot {os.path.basename(path)} is still being read, kept")
+            return False
+        shutil.rmtree(path, ignore_errors=True)
+    return True
+
+
+def snapshot_age(root: str = HOT_TICKER_DIR) -> Optional[float]:
+    """ 현재 snapshot이 게시된 후 지난 시간(초), snapshot이 없으면 None """
+    try:
+        return time.time() - os.stat(os.path.join(root, MANIFEST)).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def refresh_snapshot(store, interval: int = HOT_TICKER_REFRESH, root: str = HOT_TICKER_DIR) -> Optional[str]:
+    """
+    snapshot이 없거나 interval보다 오래되었으면 다시 게시
+    같은 디렉토리를 쓰는 여러 프로세스(uvicorn worker) 중 잠금을 얻은 한 프로세스만 게시
+    """
+    age = snapshot_age(root)
+    if age is not None and age < interval:
+        return None
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, ".lock"), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+        # 잠금을 기다리는 동안 다른 프로세스가 게시했을 수 있음
+        age = snapshot_age(root)
+        if age is not None and age < interval:
+            return None
+        return publish_snapshot(store, root=root)
+
+
+_stop_event = threading.Event()
+
+
+def start_refresh_thread(store, interval: int = HOT_TICKER_REFRESH):
+    """ 시작 시 한 번, 이후 interval마다 snapshot 갱신 (interval이 0이면 게시하지 않음) """
+    if interval <= 0 or not HOT_TICKERS:
+        return
+
+    def loop():
+        while True:
+            try:
+                refresh_snapshot(store, interval)
+            except Exception as e:
+                logger.error(f"Failed to publish hot ticker snapshot: {e}")
+            # 여러 프로세스가 동시에 만료를 확인하지 않도록 주기의 일부 간격으로 확인
+            if _stop_event.wait(min(interval, 60)):
+                return
+
+    threading.Thread(target=loop, name="hot-ticker-refresh", daemon=True).start()
+
+
+def stop_refresh_thread():
+    _stop_event.set()
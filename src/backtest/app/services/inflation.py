@@ -0,0 +1,66 @@
+from typing import Optional
+import pandas as pd
+import numpy as np
+import logging
+import os
+
+logger = logging.getLogger('uvicorn.error')
+
+# 기본 CPI 테이블 : 미국 CPI-U 연평균(1982-84=100)을 해당 연도 7월 값으로 기록
+# scraper의 cpi job이 만든 월별 파일(CPI_PATH)이 있으면 그 파일을 사용
+BUNDLED_CPI_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cpi.csv")
+CPI_PATH = os.getenv("CPI_PATH", "")
+
+
+class CpiTable:
+    """
+    월 단위로 index된 CPI 배열
+    - 원본에 없는 달은 인접 값의 로그 선형 보간, 범위를 벗어난 달은 처음/마지막 값을 그대로 사용
+    - 서비스 시작 시 한 번 읽어두고, 날짜 배열 전체를 한 번의 index 연산으로 변환
+    """
+    def __init__(self, months: np.ndarray, values: np.ndarray):
+        self.first_month = int(months[0])
+        dense = np.arange(months[0], months[-1] + 1)
+        self.values = np.exp(np.interp(dense, months, np.log(values)))
+
+    @classmethod
+    def load(cls, path: str) -> "CpiTable":
+        """ date,cpi 형식의 CSV (date는 YYYY-mm-dd, 월별이 아니어도 됨) """
+        df = pd.read_csv(path).dropna()
+        months = df["date"].values.astype("datetime64[M]").astype(np.int64)
+        order = np.argsort(months)
+        return cls(months[order], df["cpi"].to_numpy(dtype=np.float64)[order])
+
+    def at(self, dates: np.ndarray) -> np.ndarray:
+        """ 날짜 배열의 월별 CPI [T] """
+        index = dates.astype("datetime64[M]").astype(np.int64) - self.first_month
+        return self.values[np.clip(index, 0, len(self.values) - 1)]
+
+    def deflator(self, dates: np.ndarray) -> np.ndarray:
+        """ 첫 날짜 대비 물가 배수 [T] (명목 금액 / deflator = 시작 시점 가치) """
+        cpi = self.at(dates)
+        return cpi / cpi[0]
+
+
+def load_cpi_table(path: Optional[str] = CPI_PATH) -> CpiTable:
+    """ CPI_PATH의 테이블을 읽고, 없거나 읽을 수 없으면 기본 테이블 사용 """
+    if path and os.path.exists(path):
+        try:
+            return CpiTable.load(path)
+        except Exception as e:
+            logger.error(f"Failed to load CPI table {path}: {e}")
+    return CpiTable.load(BUNDLED_CPI_PATH)
+
+
+cpi_table = load_cpi_table()
+
+
+def cashflow_amounts(dates: np.ndarray, mask: np.ndarray, cashflow: float, adjust_inflation: bool) -> np.ndarray:
+    """
+    bar별 입금액 [T]
+    adjust_inflation이면 입금액의 실질 가치가 시작 시점과 같도록 CPI 배수만큼 늘려서 입금
+    """
+    amounts = np.where(mask, float(cashflow), 0.0)
+    if adjust_inflation and cashflow:
+        amounts *= cpi_table.deflator(dates)
+    return amounts
@@ -0,0 +1,73 @@
+from contextlib import contextmanager
+from typing import Dict, Optional
+from prometheus_client import Histogram
+import logging
+import time
+import os
+
+logger = logging.getLogger('uvicorn.error')
+
+# 전략의 매매 로그 (bar마다 호출되는 경로) : 0이면 끔, N이면 N번째 bar마다 기록 (logger가 DEBUG일 때만)
+BACKTEST_TRACE_SAMPLE = int(os.getenv("BACKTEST_TRACE_SAMPLE", 0))
+# 백테스트 logger level (e.g., "DEBUG"), 비어 있으면 uvicorn 설정을 따름
+BACKTEST_LOG_LEVEL = os.getenv("BACKTEST_LOG_LEVEL", "").upper()
+
+# Prometheus metrics
+# 엔진은 프로세스 풀에서 실행되므로 단계별 시간은 결과에 담아 API 프로세스에서 기록 (record_phases)
+PHASE_LATENCY = Histogram('backtest_phase_seconds', 'Backtest time per phase (seconds)', ["engine", "phase"], buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30])
+
+
+def configure_logging():
+    """ 프로세스 풀 worker에는 uvicorn 로그 설정이 없으므로 BACKTEST_LOG_LEVEL이 있으면 직접 설정 """
+    if not BACKTEST_LOG_LEVEL:
+        return
+    logger.setLevel(BACKTEST_LOG_LEVEL)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(f"%(levelname)s [{os.getpid()}] %(message)s"))
+        logger.addHandler(handler)
+
+
+configure_logging()
+
+
+def trace_interval() -> int:
+    """ 매매 로그를 남길 bar 간격 (0이면 기록하지 않음), 전략 시작 시 한 번만 확인 """
+    return BACKTEST_TRACE_SAMPLE if BACKTEST_TRACE_SAMPLE > 0 and logger.isEnabledFor(logging.DEBUG) else 0
+
+
+class PhaseTimer:
+    """
+    백테스트 한 번의 단계별 실행 시간
+    with timer.phase("run"): ... 로 측정하고, profile()을 결과의 "profile"로 반환
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def profile(self) -> dict:
+        """ {"phases": {단계: ms}, "total_ms": ms} """
+        return {
+            "phases": {name: round(seconds * 1000, 3) for name, seconds in self.timings.items()},
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+        }
+
+
+def record_phases(engine: str, result: dict) -> dict:
+    """
+    엔진 결과의 단계별 시간을 Prometheus에 기록하고 profile을 뺀 결과를 반환 (결과 캐시에는 profile을 저장하지 않음)
+    """
+    profile: Optional[dict] = result.get("profile")
+    if profile is None:
+        return result
+    for name, ms in profile["phases"].items():
+        PHASE_LATENCY.labels(engine=engine, phase=name).observe(ms / 1000)
+    return {key: value for key, value in result.items() if key != "profile"}
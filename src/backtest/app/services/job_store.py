@@ -0,0 +1,223 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional
+import threading
+import logging
+import redis
+import queue
+import json
+import time
+import os
+
+logger = logging.getLogger('uvicorn.error')
+
+BACKTEST_JOB_STORE = os.getenv("BACKTEST_JOB_STORE", "memory")  # e.g., "memory / redis"
+BACKTEST_JOB_TTL = int(os.getenv("BACKTEST_JOB_TTL", 86400))    # 작업 정보와 결과 보관 시간(초)
+
+
+class JobStore(ABC):
+    """
+    백테스트 작업의 대기열, 상태, 결과 저장소 인터페이스
+    작업 상태 : queued -> running -> done / failed
+    """
+    @abstractmethod
+    def create(self, job_id: str, request: dict):
+        """ 작업을 생성하고 대기열에 추가 """
+
+    @abstractmethod
+    def dequeue(self, timeout: float) -> Optional[str]:
+        """ 대기열에서 다음 작업 id를 꺼냄, timeout 동안 작업이 없으면 None """
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[dict]:
+        """ 작업 상태 {"job_id", "status", "progress", "error", "created_at", "updated_at"} """
+
+    @abstractmethod
+    def get_request(self, job_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def update(self, job_id: str, status: str, error: Optional[str] = None):
+        ...
+
+    @abstractmethod
+    def set_progress(self, job_id: str, name: str, bars: int, total: int):
+        """ 포트폴리오별 진행 상황 (처리한 bar 수 / 전체 bar 수) """
+
+    @abstractmethod
+    def set_result(self, job_id: str, result: dict):
+        """ 결과를 저장하고 작업을 done으로 변경 """
+
+    @abstractmethod
+    def get_result(self, job_id: str) -> Optional[dict]:
+        ...
+
+
+class InMemoryJobStore(JobStore):
+    """
+    단일 프로세스용 저장소 (테스트, 로컬 개발)
+    작업은 마지막으로 변경된 뒤 ttl초가 지나면 다음 생성/조회 때 삭제 (만료 시각 순서로 보관해 오래된 것부터 확인)
+    """
+    def __init__(self, ttl: int = BACKTEST_JOB_TTL):
+        self.ttl = ttl
+        self._expires: "OrderedDict[str, float]" = OrderedDict()
+        self._jobs: Dict[str, dict] = {}
+        self._requests: Dict[str, dict] = {}
+        self._results: Dict[str, dict] = {}
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._lock = threading.Lock()
+
+    def _touch(self, job_id: str):
+        """ 작업의 만료 시각을 지금부터 ttl초 뒤로 (lock 안에서 호출) """
+        self._expires[job_id] = time.time() + self.ttl
+        self._expires.move_to_end(job_id)
+
+    def _evict(self):
+        """ 만료된 작업의 상태, 요청, 결과 삭제 (lock 안에서 호출) """
+        now = time.time()
+        while self._expires:
+            job_id, expires = next(iter(self._expires.items()))
+            if expires > now:
+                break
+            del self._expires[job_id]
+            self._jobs.pop(job_id, None)
+            self._requests.pop(job_id, None)
+            self._results.pop(job_id, None)
+
+    def create(self, job_id: str, request: dict):
+        now = time.time()
+        with self._lock:
+            self._evict()
+            self._touch(job_id)
+            self._jobs[job_id] = {"job_id": job_id, "status": "queued", "progress": {}, "error": None, "created_at": now, "updated_at": now}
+            self._requests[job_id] = request
+        self._queue.put(job_id)
+
+    def dequeue(self, timeout: float) -> Optional[str]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            self._evict()
+            job = self._jobs.get(job_id)
+            return {**job, "progress": dict(job["progress"])} if job else None
+
+    def get_request(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            self._evict()
+            return self._requests.get(job_id)
+
+    def update(self, job_id: str, status: str, error: Optional[str] = None):
+        with self._lock:
+            # 실행 중에 만료된 작업은 다시 만들지 않음 (Redis 저장소와 같이 조회되지 않음)
+            if job_id not in self._jobs:
+                return
+            self._jobs[job_id].update(status=status, error=error, updated_at=time.time())
+            self._touch(job_id)
+
+    def set_progress(self, job_id: str, name: str, bars: int, total: int):
+        with self._lock:
+            if job_id not in self._jobs:
+                return
+            self._jobs[job_id]["progress"][name] = {"bars": bars, "total": total}
+            self._jobs[job_id]["updated_at"] = time.time()
+            self._touch(job_id)
+
+    def set_result(self, job_id: str, result: dict):
+        with self._lock:
+            if job_id not in self._jobs:
+                return
+            self._results[job_id] = result
+        self.update(job_id, "done")
+
+    def get_result(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            self._evict()
+            return self._results.get(job_id)
+
+
+class RedisJobStore(JobStore):
+    """
+    여러 API pod와 worker pod가 공유하는 Redis 저장소
+    - backtest:jobs:queue         : 대기열 (list)
+    - backtest:job:<id>           : 작업 상태 (hash)
+    - backtest:job:<id>:request   : 요청 (JSON)
+    - backtest:job:<id>:progress  : 포트폴리오별 진행 상황 (hash)
+    - backtest:job:<id>:result    : 결과 (JSON)
+    """
+    QUEUE_KEY = "backtest:jobs:queue"
+
+    def __init__(self, ttl: int = BACKTEST_JOB_TTL):
+        self.ttl = ttl
+        self.redis_client = redis.Redis(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", 6379)),
+            db=int(os.getenv("REDIS_DB", 0)),
+            decode_responses=True
+        )
+
+    def _key(self, job_id: str, suffix: str = "") -> str:
+        return f"backtest:job:{job_id}{suffix}"
+
+    def create(self, job_id: str, request: dict):
+        now = time.time()
+        pipe = self.redis_client.pipeline()
+        pipe.hset(self._key(job_id), mapping={"status": "queued", "error": "", "created_at": now, "updated_at": now})
+        pipe.expire(self._key(job_id), self.ttl)
+        pipe.set(self._key(job_id, ":request"), json.dumps(request), ex=self.ttl)
+        pipe.rpush(self.QUEUE_KEY, job_id)
+        pipe.execute()
+
+    def dequeue(self, timeout: float) -> Optional[str]:
+        item = self.redis_client.blpop([self.QUEUE_KEY], timeout=max(1, int(timeout)))
+        return item[1] if item else None
+
+    def get(self, job_id: str) -> Optional[dict]:
+        job = self.redis_client.hgetall(self._key(job_id))
+        if not job:
+            return None
+        progress = self.redis_client.hgetall(self._key(job_id, ":progress"))
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "progress": {name: json.loads(value) for name, value in progress.items()},
+            "error": job["error"] or None,
+            "created_at": float(job["created_at"]),
+            "updated_at": float(job["updated_at"]),
+        }
+
+    def get_request(self, job_id: str) -> Optional[dict]:
+        request = self.redis_client.get(self._key(job_id, ":request"))
+        return json.loads(request) if request else None
+
+    def update(self, job_id: str, status: str, error: Optional[str] = None):
+        self.redis_client.hset(self._key(job_id), mapping={"status": status, "error": error or "", "updated_at": time.time()})
+
+    def set_progress(self, job_id: str, name: str, bars: int, total: int):
+        pipe = self.redis_client.pipeline()
+        pipe.hset(self._key(job_id, ":progress"), name, json.dumps({"bars": bars, "total": total}))
+        pipe.expire(self._key(job_id, ":progress"), self.ttl)
+        pipe.hset(self._key(job_id), "updated_at", time.time())
+        pipe.execute()
+
+    def set_result(self, job_id: str, result: dict):
+        self.redis_client.set(self._key(job_id, ":result"), json.dumps(result), ex=self.ttl)
+        self.update(job_id, "done")
+
+    def get_result(self, job_id: str) -> Optional[dict]:
+        result = self.redis_client.get(self._key(job_id, ":result"))
+        return json.loads(result) if result else None
+
+
+_job_store: Optional[JobStore] = None
+
+def get_job_store() -> JobStore:
+    """ BACKTEST_JOB_STORE 설정에 따른 저장소 (프로세스당 하나) """
+    global _job_store
+    if _job_store is None:
+        _job_store = RedisJobStore() if BACKTEST_JOB_STORE == "redis" else InMemoryJobStore()
+        logger.info(f"Backtest job store: {type(_job_store).__name__}")
+    return _job_store
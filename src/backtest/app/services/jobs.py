@@ -0,0 +1,66 @@
+from typing import List, Optional
+import threading
+import traceback
+import logging
+import uuid
+import os
+
+from .backtest import BacktestRequest
+from .job_store import JobStore, get_job_store
+from .runner import run_request, validate_request
+from .admission import ADMISSION_JOB_MAX_COST, estimate_cost, check_cost
+
+logger = logging.getLogger('uvicorn.error')
+
+# API 프로세스 안에서 작업을 처리할 worker thread 수, 기본값 0 : 작업은 별도 worker Deployment(python -m app.worker)가 처리
+# local worker는 API 프로세스의 GIL을 요청 처리와 나눠 쓰므로 로컬 개발(BACKTEST_JOB_STORE=memory)에서만 사용
+BACKTEST_LOCAL_WORKERS = int(os.getenv("BACKTEST_LOCAL_WORKERS", 0))
+
+
+def submit_job(params: BacktestRequest, store: Optional[JobStore] = None) -> str:
+    """ 요청을 검증한 뒤 대기열에 등록하고 작업 id 반환 """
+    validate_request(params)
+    check_cost(estimate_cost(params), ADMISSION_JOB_MAX_COST)
+    job_id = uuid.uuid4().hex
+    (store or get_job_store()).create(job_id, params.model_dump())
+    return job_id
+
+
+def execute_job(job_id: str, store: JobStore):
+    """ 작업 하나를 실행하고 상태, 진행 상황, 결과를 저장소에 기록 """
+    request = store.get_request(job_id)
+    if request is None:
+        logger.warning(f"Backtest job {job_id} expired before running")
+        return
+
+    store.update(job_id, "running")
+    try:
+        params = BacktestRequest(**request)
+        result = run_request(params, progress=lambda name, bars, total: store.set_progress(job_id, name, bars, total))
+        store.set_result(job_id, result)
+    except Exception as e:
+        logger.debug(traceback.format_exc())
+        store.update(job_id, "failed", error=str(e))
+
+
+def run_worker(store: JobStore, stop_event: threading.Event, poll_timeout: float = 1.0):
+    """ stop_event가 설정될 때까지 대기열의 작업을 꺼내 처리 """
+    while not stop_event.is_set():
+        job_id = store.dequeue(timeout=poll_timeout)
+        if job_id is not None:
+            execute_job(job_id, store)
+
+
+_local_workers: List[threading.Thread] = []
+_stop_event = threading.Event()
+
+def start_local_workers(count: int = BACKTEST_LOCAL_WORKERS):
+    """ API 프로세스 안에서 대기열을 처리하는 worker thread 시작 """
+    store = get_job_store()
+    for i in range(count):
+        worker = threading.Thread(target=run_worker, args=(store, _stop_event), name=f"backtest-worker-{i}", daemon=True)
+        worker.start()
+        _local_workers.append(worker)
+
+def stop_local_workers():
+    _stop_event.set()
@@ -0,0 +1,179 @@
+from typing import Dict, List, Optional
+import numpy as np
+
+TRADING_DAYS = 252
+
+
+def daily_returns(values: np.ndarray, cashflows: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    bar별 수익률 [..., T-1]
+    cashflows가 주어지면 입금액을 제외한 시간가중 수익률로 계산
+    (t bar에 입금된 금액은 t+1 bar의 평가금액부터 반영됨)
+    """
+    prev = values[..., :-1]
+    curr = values[..., 1:]
+    if cashflows is not None:
+        curr = curr - cashflows[..., :-1]
+    return curr / prev - 1
+
+
+def cagr(values: np.ndarray, dates: np.ndarray, cashflows: Optional[np.ndarray] = None) -> np.ndarray:
+    """ 연평균 수익률(%) - 마지막 축을 시간축으로 계산 """
+    years = max((dates[-1] - dates[0]).astype(np.int64) / 365.25, 1 / 365.25)
+    growth = np.prod(1 + daily_returns(values, cashflows), axis=-1)
+    return (growth ** (1 / years) - 1) * 100
+
+
+def volatility(values: np.ndarray, cashflows: Optional[np.ndarray] = None) -> np.ndarray:
+    """ 연환산 변동성(%) """
+    returns = daily_returns(values, cashflows)
+    if returns.shape[-1] < 2:
+        return np.zeros(values.shape[:-1])
+    return returns.std(axis=-1, ddof=1) * np.sqrt(TRADING_DAYS) * 100
+
+
+def max_drawdown(values: np.ndarray) -> np.ndarray:
+    """ 최대 낙폭(%) """
+    peak = np.maximum.accumulate(values, axis=-1)
+    return ((peak - values) / peak).max(axis=-1) * 100
+
+
+def drawdown_series(values: np.ndarray) -> np.ndarray:
+    """ 고점 대비 하락률(%) """
+    peak = np.maximum.accumulate(values, axis=-1)
+    return (peak - values) / peak * 100
+
+
+def growth_index(values: np.ndarray, cashflows: Optional[np.ndarray] = None) -> np.ndarray:
+    """ 첫 bar를 1로 하는 시간가중 누적 수익 지수 [T] """
+    return np.concatenate([[1.0], np.cumprod(1 + daily_returns(values, cashflows))])
+
+
+def period_returns(dates: np.ndarray, index: np.ndarray, unit: str) -> tuple:
+    """
+    기간(unit: 'Y' / 'M')별 수익률(%)
+    직전 기간의 마지막 bar 대비 해당 기간 마지막 bar의 변화율 (첫 기간은 첫 bar 대비)
+    Output: (periods[N] datetime64[unit], returns[N])
+    """
+    periods = dates.astype(f"datetime64[{unit}]")
+    ends = np.flatnonzero(np.r_[periods[1:] != periods[:-1], True])
+    start_values = np.r_[index[0], index[ends[:-1]]]
+    return periods[ends], (index[ends] / start_values - 1) * 100
+
+
+def drawdown_duration(dates: np.ndarray, index: np.ndarray) -> dict:
+    """
+    최대 낙폭 구간 : 직전 고점, 저점, 고점 회복일(회복하지 못했으면 None)과 고점부터 회복(또는 마지막 bar)까지의 일수
+    """
+    peak = np.maximum.accumulate(index)
+    drawdown = (peak - index) / peak
+    trough = int(np.argmax(drawdown))
+    if drawdown[trough] == 0:
+        return {"max_drawdown": 0.0, "peak": None, "trough": None, "recovery": None, "days": 0}
+    start = int(np.flatnonzero(index[:trough + 1] == peak[trough])[-1])
+    recovered = np.flatnonzero(index[trough:] >= peak[trough])
+    end = trough + int(recovered[0]) if len(recovered) else None
+    last = end if end is not None else len(dates) - 1
+    as_str = lambda i: str(dates[i]) if i is not None else None
+    return {
+        "max_drawdown": round(float(drawdown[trough] * 100), 4),
+        "peak": as_str(start),
+        "trough": as_str(trough),
+        "recovery": as_str(end),
+        "days": int((dates[last] - dates[start]).astype(np.int64)),
+    }
+
+
+def rolling_returns(index: np.ndarray, years: int) -> Optional[dict]:
+    """ years년(252 * years bar) 보유 시 연환산 수익률(%)의 분포, 기간이 짧으면 None """
+    window = TRADING_DAYS * years
+    if len(index) <= window:
+        return None
+    returns = ((index[window:] / index[:-window]) ** (1 / years) - 1) * 100
+    return {
+        "min": round(float(returns.min()), 4),
+        "max": round(float(returns.max()), 4),
+        "mean": round(float(returns.mean()), 4),
+        "last": round(float(returns[-1]), 4),
+    }
+
+
+ROLLING_YEARS = (1, 3, 5, 10)
+
+
+def annual_returns(dates: np.ndarray, index: np.ndarray) -> List[Dict]:
+    """ 연도별 수익률(%) : [{"year": int, "return": float}] """
+    years, returns = period_returns(dates, index, "Y")
+    return [{"year": int(y), "return": round(float(r), 4)} for y, r in zip(years.astype(np.int64) + 1970, returns)]
+
+
+def performance_metrics(dates: np.ndarray, values: np.ndarray, cashflows: Optional[np.ndarray] = None, risk_free: float = 0.0) -> dict:
+    """
+    평가금액 series 하나에 대한 성과 지표 (입금액은 시간가중 수익률로 제외)
+    dates: [T] datetime64[D], values: [T] bar별 평가금액, cashflows: [T] bar별 입금액, risk_free: 연 무위험 수익률(%)
+    Output:
+    {
+        "monthly_returns": {"month": [YYYY-mm], "return": [float]},
+        "cagr", "volatility", "sharpe", "sortino": float,
+        "max_drawdown": {"max_drawdown", "peak", "trough", "recovery", "days"},
+        "rolling_returns": {"1y" | "3y" | ...: {"min", "max", "mean", "last"}}
+    }
+    """
+    returns = daily_returns(values, cashflows)
+    index = np.concatenate([[1.0], np.cumprod(1 + returns)])
+    excess = returns - risk_free / 100 / TRADING_DAYS
+
+    std = returns.std(ddof=1) if len(returns) > 1 else 0.0
+    downside = np.sqrt(np.mean(np.minimum(excess, 0) ** 2)) if len(returns) else 0.0
+    sharpe = excess.mean() / std * np.sqrt(TRADING_DAYS) if std > 0 else None
+    sortino = excess.mean() / downside * np.sqrt(TRADING_DAYS) if downside > 0 else None
+
+    months, monthly = period_returns(dates, index, "M")
+    rolling = {f"{n}y": rolling_returns(index, n) for n in ROLLING_YEARS}
+
+    return {
+        "monthly_returns": {
+            "month": np.datetime_as_string(months, unit="M").tolist(),
+            "return": np.round(monthly, 4).tolist(),
+        },
+        "cagr": round(float(cagr(values, dates, cashflows)), 4),
+        "volatility": round(float(std * np.sqrt(TRADING_DAYS) * 100), 4),
+        "sharpe": round(float(sharpe), 4) if sharpe is not None else None,
+        "sortino": round(float(sortino), 4) if sortino is not None else None,
+        "max_drawdown": drawdown_duration(dates, index),
+        "rolling_returns": {k: v for k, v in rolling.items() if v is not None},
+    }
+
+
+def backtest_report(
+        dates: np.ndarray,
+        values: np.ndarray,
+        cashflows: Optional[np.ndarray] = None,
+        deflator: Optional[np.ndarray] = None,
+        adjust_inflation: bool = False,
+) -> dict:
+    """
+    백테스트가 끝난 뒤 평가금액 series로 응답에 포함할 series와 성과 지표를 한 번에 계산
+    - drawdown과 수익률은 입금액을 제외한 시간가중 지수 기준
+    - deflator(첫 날짜 대비 물가 배수)가 주어지면 실질 기준 지표를 metrics["real"]에 추가
+    - adjust_inflation이면 performance, drawdown, annual_returns를 시작 시점 가치(실질)로 반환
+    """
+    metrics = performance_metrics(dates, values, cashflows)
+    series, series_cashflows = values, cashflows
+    if deflator is not None:
+        real_values = values / deflator
+        real_cashflows = cashflows / deflator if cashflows is not None else None
+        metrics["real"] = {
+            **performance_metrics(dates, real_values, real_cashflows),
+            "annual_returns": annual_returns(dates, growth_index(real_values, real_cashflows)),
+        }
+        if adjust_inflation:
+            series, series_cashflows = real_values, real_cashflows
+
+    index = growth_index(series, series_cashflows)
+    return {
+        "performance": np.round(series, 2).tolist(),
+        "drawdown": np.round(drawdown_series(index), 2).tolist(),
+        "annual_returns": annual_returns(dates, index),
+        "metrics": metrics,
+    }
@@ -0,0 +1,257 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from pydantic import BaseModel
+import numpy as np
+import logging
+import os
+
+from .metrics import TRADING_DAYS
+
+logger = logging.getLogger('uvicorn.error')
+
+OPTIMIZER_MAX_TICKERS = int(os.getenv("OPTIMIZER_MAX_TICKERS", 300))
+# 투자선 한 번(λ 전체)에 쓰는 projected gradient 최대 반복 수 (active set이 수렴하지 않을 때만 사용)
+# 반복 한 번은 종목 수와 거의 관계없이 ~1ms이므로 요청 전체의 최악 실행 시간을 BACKTEST_JOB_TIMEOUT 안으로 제한
+OPTIMIZER_MAX_ITERATIONS = int(os.getenv("OPTIMIZER_MAX_ITERATIONS", 5000))
+OPTIMIZER_POLISH_INTERVAL = int(os.getenv("OPTIMIZER_POLISH_INTERVAL", 50))   # 이 반복 수마다 active set으로 정확한 해를 다시 시도
+OPTIMIZER_TOLERANCE = float(os.getenv("OPTIMIZER_TOLERANCE", 1e-8))          # 반복 사이 비중 변화가 이보다 작으면 종료
+OPTIMIZER_MAX_POINTS = 100
+
+# 효율적 투자선을 따라 한 번에 푸는 위험 회피 계수 수 (max Sharpe 탐색에도 사용)
+FRONTIER_LAMBDAS = 64
+# 사영의 tau 이분 탐색 횟수 (이후 자유 변수 기준으로 정확히 계산)
+PROJECTION_STEPS = 30
+# active set 하나에서 시작해 KKT 연립방정식을 다시 푸는 최대 횟수
+ACTIVE_SET_STEPS = 50
+
+
+# --- Input Data Schema ---
+class OptimizeRequest(BaseModel):
+    start_date: str
+    end_date: str
+    tickers: List[str]
+    min_weight: float = 0                   # 종목별 최소 비중 (%)
+    max_weight: float = 100                 # 종목별 최대 비중 (%)
+    bounds: Dict[str, List[float]] = {}     # e.g., {"TLT": [10, 40]} 종목별 [최소, 최대] 비중 (%), min_weight/max_weight보다 우선
+    risk_free: float = 0                    # 연 무위험 수익률 (%), Sharpe 계산에 사용
+    frontier_points: int = 20
+
+
+def weight_bounds(params: OptimizeRequest, tickers: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """ 종목별 비중 하한/상한 [A] (비율) """
+    bounds = {ticker.upper(): value for ticker, value in params.bounds.items()}
+    lo = np.array([bounds.get(ticker, [params.min_weight, params.max_weight])[0] for ticker in tickers], dtype=np.float64) / 100
+    hi = np.array([bounds.get(ticker, [params.min_weight, params.max_weight])[1] for ticker in tickers], dtype=np.float64) / 100
+    return lo, hi
+
+
+def validate_optimize(params: OptimizeRequest):
+    """ 최적화 요청 검증, 잘못된 요청이면 ValueError """
+    if datetime.strptime(params.start_date, "%Y-%m-%d") > datetime.strptime(params.end_date, "%Y-%m-%d"):
+        raise ValueError("Start date must be before end date")
+    tickers = sorted({ticker.upper() for ticker in params.tickers})
+    if len(tickers) < 2:
+        raise ValueError("At least 2 tickers are required")
+    if len(tickers) > OPTIMIZER_MAX_TICKERS:
+        raise ValueError(f"Tickers must not be more than {OPTIMIZER_MAX_TICKERS}")
+    if not 2 <= params.frontier_points <= OPTIMIZER_MAX_POINTS:
+        raise ValueError(f"Frontier points must be between 2 and {OPTIMIZER_MAX_POINTS}")
+    unknown = {ticker.upper() for ticker in params.bounds} - set(tickers)
+    if unknown:
+        raise ValueError(f"Bounds for tickers not in the request: {', '.join(sorted(unknown))}")
+    if any(len(value) != 2 for value in params.bounds.values()):
+        raise ValueError("Bounds must be [min, max]")
+    lo, hi = weight_bounds(params, tickers)
+    if (lo < 0).any() or (hi > 1).any() or (lo > hi).any():
+        raise ValueError("Weight bounds must satisfy 0 <= min <= max <= 100")
+    if lo.sum() > 1 + 1e-9 or hi.sum() < 1 - 1e-9:
+        raise ValueError("Weight bounds are infeasible: minimums must sum to at most 100 and maximums to at least 100")
+
+
+def return_statistics(matrix: dict) -> Tuple[np.ndarray, np.ndarray, int]:
+    """ 일별 총수익률 행렬(returns.aligned_returns)의 연율화 평균 [A]과 공분산 [A, A] -> (mean, cov, 관측 수) """
+    returns = matrix["returns"]
+    return returns.mean(axis=0) * TRADING_DAYS, np.cov(returns, rowvar=False) * TRADING_DAYS, len(returns)
+
+
+# --- Solver ---
+def project(v: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """
+    각 행을 {sum(w) = 1, lo <= w <= hi}에 유클리드 사영 [K, A]
+    w = clip(v - tau, lo, hi)의 합이 1이 되는 tau를 이분 탐색으로 좁힌 뒤,
+    상/하한에 걸리지 않은 종목만으로 tau를 정확히 계산
+    """
+    low = (v - hi).min(axis=1) - 1
+    high = (v - lo).max(axis=1)
+    for _ in range(PROJECTION_STEPS):
+        tau = (low + high) / 2
+        over = np.clip(v - tau[:, None], lo, hi).sum(axis=1) > 1
+        low = np.where(over, tau, low)
+        high = np.where(over, high, tau)
+    tau = (low + high) / 2
+    w = v - tau[:, None]
+    free = (w > lo) & (w < hi)
+    fixed = np.where(w <= lo, lo, np.where(w >= hi, hi, 0)).sum(axis=1)
+    n_free = free.sum(axis=1)
+    exact = np.where(n_free > 0, ((v * free).sum(axis=1) + fixed - 1) / np.maximum(n_free, 1), tau)
+    return np.clip(v - exact[:, None], lo, hi)
+
+
+def active_set(cov: np.ndarray, linear: np.ndarray, lo: np.ndarray, hi: np.ndarray, w: np.ndarray) -> Optional[np.ndarray]:
+    """
+    min w'Σw - linear'w (sum(w) = 1, lo <= w <= hi)의 정확한 해 [A], 찾지 못하면 None
+    w에서 상/하한에 걸린 종목을 시작 active set으로 primal-dual active set 반복 :
+    자유 종목만으로 KKT 연립방정식을 풀고, 범위를 벗어난 종목은 상/하한으로, 승수 부호가 맞지 않는 종목은 자유 변수로 옮김
+    """
+    at_lo = w <= lo + OPTIMIZER_TOLERANCE
+    at_hi = (w >= hi - OPTIMIZER_TOLERANCE) & ~at_lo
+    tolerance = OPTIMIZER_TOLERANCE * max(2 * np.abs(cov).max(), np.abs(linear).max(), 1e-12)
+    seen = set()
+    for _ in range(ACTIVE_SET_STEPS):
+        key = (at_lo.tobytes(), at_hi.tobytes())
+        free = ~(at_lo | at_hi)
+        if key in seen or not free.any():
+            return None
+        seen.add(key)
+
+        # 자유 종목 비중과 합계 제약의 승수 ν : [2Σ_FF 1; 1' 0] [w_F; ν] = [linear_F - 2Σ_FB w_B; 1 - sum(w_B)]
+        w = np.where(at_lo, lo, np.where(at_hi, hi, 0.0))
+        n = int(free.sum())
+        system = np.ones((n + 1, n + 1))
+        system[:n, :n] = 2 * cov[np.ix_(free, free)]
+        system[n, n] = 0
+        rhs = np.append(linear[free] - 2 * cov[free] @ w, 1 - w.sum())
+        try:
+            solution = np.linalg.solve(system, rhs)
+        except np.linalg.LinAlgError:
+            solution = np.linalg.lstsq(system, rhs, rcond=None)[0]
+        w[free] = solution[:n]
+        # 하한 종목은 gradient >= 0, 상한 종목은 gradient <= 0 이어야 최적
+        gradient = 2 * cov @ w - linear + solution[n]
+
+        below = free & (w < lo - OPTIMIZER_TOLERANCE)
+        above = free & (w > hi + OPTIMIZER_TOLERANCE)
+        if not (below.any() or above.any() or (gradient[at_lo] < -tolerance).any() or (gradient[at_hi] > tolerance).any()):
+            return np.clip(w, lo, hi)
+        at_lo = below | (at_lo & (gradient >= -tolerance))
+        at_hi = above | (at_hi & (gradient <= tolerance))
+    return None
+
+
+def projected_gradient(cov: np.ndarray, linear: np.ndarray, lo: np.ndarray, hi: np.ndarray, w: np.ndarray, step: float, iterations: int) -> Tuple[np.ndarray, bool]:
+    """ accelerated projected gradient(FISTA)를 iterations번 실행 -> (비중 [A], 반복 사이 변화가 OPTIMIZER_TOLERANCE 미만인지) """
+    w = w[None, :]
+    y, t = w, 1.0
+    for _ in range(iterations):
+        w_next = project(y - step * (2 * y @ cov - linear), lo, hi)
+        if np.abs(w_next - w).max() < OPTIMIZER_TOLERANCE:
+            return w_next[0], True
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        y = w_next + (t - 1) / t_next * (w_next - w)
+        w, t = w_next, t_next
+    return w[0], False
+
+
+def solve_frontier(cov: np.ndarray, mean: np.ndarray, lambdas: np.ndarray, lo: np.ndarray, hi: np.ndarray, start: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    위험 회피 계수별 min w'Σw - λ μ'w (sum(w) = 1, lo <= w <= hi) -> (비중 [K, A], 수렴 여부 [K])
+    λ 순서대로 직전 λ의 해(처음은 start 또는 균등 비중)에서 시작해 active set으로 풀고,
+    active set이 수렴하지 않으면 FISTA로 OPTIMIZER_POLISH_INTERVAL번씩 해를 좁힌 뒤 다시 시도
+    FISTA 반복은 모든 λ를 합쳐 OPTIMIZER_MAX_ITERATIONS번까지만 사용하고, 다 쓰면 남은 λ는 active set만 시도
+    """
+    step = 1 / (2 * max(np.linalg.eigvalsh(cov)[-1], 1e-12))
+    weights = np.empty((len(lambdas), len(mean)))
+    converged = np.zeros(len(lambdas), dtype=bool)
+    w = project(np.full((1, len(mean)), 1 / len(mean)), lo, hi)[0] if start is None else start
+    budget = OPTIMIZER_MAX_ITERATIONS
+    for k, lam in enumerate(lambdas):
+        linear = lam * mean
+        while True:
+            exact = active_set(cov, linear, lo, hi, w)
+            if exact is not None:
+                w, converged[k] = exact, True
+                break
+            if budget <= 0:
+                break
+            iterations = min(OPTIMIZER_POLISH_INTERVAL, budget)
+            budget -= iterations
+            w, converged[k] = projected_gradient(cov, linear, lo, hi, w, step, iterations)
+            if converged[k]:
+                break
+        weights[k] = w
+    return weights, converged
+
+
+def portfolio_stats(weights: np.ndarray, mean: np.ndarray, cov: np.ndarray, risk_free: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ 비중 [K, A]별 연 기대수익률, 변동성, Sharpe [K] """
+    returns = weights @ mean
+    vol = np.sqrt(np.maximum(np.einsum("ka,ab,kb->k", weights, cov, weights), 0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(vol > 0, (returns - risk_free) / vol, 0.0)
+    return returns, vol, sharpe
+
+
+def allocation(weights: np.ndarray, tickers: List[str]) -> Dict[str, float]:
+    """ PortfolioItem.allocation 형식 (%, 소수점 둘째 자리, 합 100, 비중 0인 종목 제외) """
+    percent = np.round(weights * 100, 2)
+    percent[np.argmax(percent)] += round(100 - percent.sum(), 2)
+    return {ticker: round(float(value), 2) for ticker, value in zip(tickers, percent) if value > 0}
+
+
+def run_optimizer(params: OptimizeRequest, matrix: dict) -> dict:
+    """
+    일별 수익률 행렬(returns.aligned_returns)에서 공분산 행렬을 한 번 계산하고 최소 분산, 최대 Sharpe, 효율적 투자선 포트폴리오를 계산
+    Output:
+    {
+        "tickers": [str], "observations": int,
+        "converged": bool,    # 모든 λ에서 KKT 조건을 만족하는 해를 찾았는지 (False면 반복 한도에서 멈춘 근사해 포함)
+        "min_variance": {"name", "allocation", "expected_return", "volatility", "sharpe"},
+        "max_sharpe": {...},
+        "frontier": [{...}]   # 기대수익률 오름차순
+    }
+    """
+    tickers = matrix["tickers"]
+    mean, cov, observations = return_statistics(matrix)
+    lo, hi = weight_bounds(params, tickers)
+    risk_free = params.risk_free / 100
+
+    # λ = 0은 최소 분산, 큰 λ는 최대 수익률 쪽 끝 (λ 단위는 분산 항과 수익률 항의 크기로 맞춤)
+    scale = 2 * np.linalg.eigvalsh(cov)[-1] / max(np.ptp(mean), 1e-12)
+    lambdas = np.concatenate([[0.0], scale * np.logspace(-3, 3, FRONTIER_LAMBDAS - 1)])
+    weights, converged = solve_frontier(cov, mean, lambdas, lo, hi)
+    returns, vol, sharpe = portfolio_stats(weights, mean, cov, risk_free)
+
+    # 최대 Sharpe : 투자선 위의 최고점 양옆 λ 구간을 다시 촘촘하게 풀이 (구간 시작 λ의 해에서 시작)
+    best = int(np.argmax(sharpe))
+    fine = np.linspace(lambdas[max(best - 1, 0)], lambdas[min(best + 1, len(lambdas) - 1)], FRONTIER_LAMBDAS)
+    fine_weights, fine_converged = solve_frontier(cov, mean, fine, lo, hi, start=weights[max(best - 1, 0)])
+    fine_sharpe = portfolio_stats(fine_weights, mean, cov, risk_free)[2]
+    max_sharpe = fine_weights[np.argmax(fine_sharpe)] if fine_sharpe.max() > sharpe[best] else weights[best]
+    unconverged = int((~converged).sum() + (~fine_converged).sum())
+    if unconverged:
+        logger.warning(f"Optimizer did not converge for {unconverged} of {len(lambdas) + len(fine)} risk aversion values ({len(tickers)} tickers)")
+
+    # 효율적 투자선 : 최소 분산부터 최대 수익률까지 기대수익률이 고르게 떨어진 점
+    order = np.argsort(returns)
+    targets = np.linspace(returns[0], returns.max(), params.frontier_points)
+    picks = np.unique(order[np.clip(np.searchsorted(returns[order], targets), 0, len(order) - 1)])
+    picks = picks[np.argsort(returns[picks])]
+
+    def describe(name: str, w: np.ndarray) -> dict:
+        r, v, s = portfolio_stats(w[None, :], mean, cov, risk_free)
+        return {
+            "name": name,
+            "allocation": allocation(w, tickers),
+            "expected_return": round(float(r[0]) * 100, 4),
+            "volatility": round(float(v[0]) * 100, 4),
+            "sharpe": round(float(s[0]), 4),
+        }
+
+    return {
+        "tickers": tickers,
+        "observations": observations,
+        "converged": unconverged == 0,
+        "min_variance": describe("min_variance", weights[0]),
+        "max_sharpe": describe("max_sharpe", max_sharpe),
+        "frontier": [describe(f"frontier_{i}", weights[k]) for i, k in enumerate(picks)],
+    }
@@ -0,0 +1,343 @@
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+import numpy as np
+import yfinance as yf
+import backtrader as bt
+import threading
+import logging
+import json
+import os
+
+from .hot_cache import hot_cache
+from .symbols import store_symbol, store_name
+
+logger = logging.getLogger('uvicorn.error')
+
+PRICE_STORE_DIR = os.getenv("PRICE_STORE_DIR", "data/prices")
+PRICE_MEMORY_CACHE = int(os.getenv("PRICE_MEMORY_CACHE", 64))
+PRICE_FETCH_WORKERS = int(os.getenv("PRICE_FETCH_WORKERS", 8))
+# scraper의 prices job이 매일 갱신하는 읽기 전용 저장소 (같은 형식), 이 저장소에 있는 종목은 다운로드하지 않음
+PRICE_ARCHIVE_DIR = os.getenv("PRICE_ARCHIVE_DIR", "")
+PRICE_ARCHIVE_GRACE_DAYS = int(os.getenv("PRICE_ARCHIVE_GRACE_DAYS", 4))  # 다음 갱신 전까지 비어 있는 최근 구간을 다운로드 없이 허용하는 일수
+
+COLUMNS = ["open", "high", "low", "close", "volume"]
+# 배당/분할은 가격과 같은 요청으로 받아 같은 파일에 컬럼으로 저장 (해당 일에 이벤트가 없으면 0)
+# - dividends : 주당 배당금 (배당락일 기준)
+# - stock_splits : 분할 비율 (2:1 분할이면 2)
+ACTION_COLUMNS = ["dividends", "stock_splits"]
+STORE_COLUMNS = COLUMNS + ACTION_COLUMNS
+
+# 저장 형식이 바뀌면 버전을 올려 이전 형식으로 저장된 종목을 다시 받음
+# 2 : 배당 조정 전 종가(분할만 반영) + 배당/분할 컬럼
+STORE_VERSION = 2
+
+fetch_executor = ThreadPoolExecutor(max_workers=PRICE_FETCH_WORKERS, thread_name_prefix="price-fetch")
+
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    yfinance 다운로드 결과를 Backtrader DataFeed 형태(Date index, 소문자 OHLCV 컬럼 + 배당/분할 컬럼)로 변환
+    """
+    # Convert shape of df with correct shape of BT's DataFeed
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.droplevel(1)
+    df = df.rename(columns={"Price": "Close"})
+    df.columns.name = None
+    df = df.reset_index().rename(columns={"index": "Date"}).set_index("Date")
+
+    df = df.rename(columns={
+        "Open": "open",
+        "High": "high",
+        "Low": "low",
+        "Close": "close",
+        "Volume": "volume",
+        "Dividends": "dividends",
+        "Stock Splits": "stock_splits",
+    })
+    df.index = pd.DatetimeIndex(df.index).tz_localize(None).normalize()
+    # 기간 중 배당/분할이 한 번도 없는 종목은 컬럼이 빠질 수 있음
+    df = df.reindex(columns=STORE_COLUMNS).astype(np.float64)
+    df[ACTION_COLUMNS] = df[ACTION_COLUMNS].fillna(0.0)
+    return df
+
+
+def empty_frame() -> pd.DataFrame:
+    return pd.DataFrame(columns=STORE_COLUMNS, index=pd.DatetimeIndex([], name="Date"), dtype=np.float64)
+
+
+def ticker_frame(df: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """ 여러 종목을 한 번에 받은 결과에서 한 종목의 컬럼만 추출 """
+    if isinstance(df.columns, pd.MultiIndex):
+        level = 0 if ticker in df.columns.get_level_values(0) else 1
+        if ticker not in df.columns.get_level_values(level):
+            return empty_frame()
+        df = df.xs(ticker, axis=1, level=level)
+    return normalize_frame(df).dropna(subset=["close"])
+
+
+def download_frames(tickers: List[str], start: str, end: str) -> Dict[str, Tuple[pd.DataFrame, bool]]:
+    """
+    yfinance에서 여러 종목의 [start, end) 구간을 한 번의 요청으로 다운로드
+    배당은 종가에 반영하지 않고(auto_adjust=False) 배당/분할 컬럼으로 함께 받아, 백테스트가 배당 재투자 여부를 직접 처리한다.
+    Output: {ticker: (DataFrame, 커버리지 기록 여부)}
+    yfinance는 실패 시에도 빈 DataFrame을 반환하므로, 휴장일만 포함될 수 있는 짧은 구간이 아닌데
+    데이터가 비어 있으면 실패로 보고 다음 요청에서 다시 받는다.
+    """
+    df = yf.download(tickers, start=start, end=end, group_by="ticker", actions=True, auto_adjust=False, progress=False, threads=True)
+    short_range = (pd.Timestamp(end) - pd.Timestamp(start)).days <= 7
+
+    result = {}
+    for ticker in tickers:
+        frame = empty_frame() if df.empty else ticker_frame(df, ticker)
+        result[ticker] = (frame, not frame.empty or short_range)
+    return result
+
+
+class PriceStore:
+    """
+    종목별 일봉 OHLCV와 배당/분할을 Parquet 파일로 보관하는 로컬 가격 저장소
+    - <root>/<TICKER>.parquet : 가격 + 배당/분할 데이터 (STORE_COLUMNS)
+    - <root>/<TICKER>.json    : 저장된 조회 구간 [start, end), 저장 형식 버전
+    요청 구간 중 저장되지 않은 앞/뒤 구간만 yfinance에서 받아 병합하고,
+    최근 사용한 종목은 메모리에 보관해 반복 백테스트에서 디스크 I/O도 생략한다.
+    게시된 hot ticker snapshot(hot_cache)에 있는 종목은 파일 대신 공유 메모리 맵을 사용한다.
+    archive(scraper가 미리 수집한 같은 형식의 읽기 전용 저장소)에 있는 종목은 archive를 기준으로 하고,
+    archive의 마지막 갱신 이후 grace_days 이내의 최근 구간은 다운로드하지 않는다.
+    """
+    def __init__(self, root: str = PRICE_STORE_DIR, memory_size: int = PRICE_MEMORY_CACHE,
+                 archive: str = PRICE_ARCHIVE_DIR, grace_days: int = PRICE_ARCHIVE_GRACE_DAYS):
+        self.root = root
+        self.archive = archive
+        self.grace_days = grace_days
+        self._archived = set()  # archive에 있는 종목
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, Tuple[pd.DataFrame, Optional[Tuple[str, str]]]]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._ticker_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+
+    def _paths(self, ticker: str, root: Optional[str] = None) -> Tuple[str, str]:
+        root = root or self.root
+        name = store_name(ticker)
+        return os.path.join(root, f"{name}.parquet"), os.path.join(root, f"{name}.json")
+
+    def _read(self, root: str, ticker: str):
+        """ root에 저장된 (DataFrame, 커버리지), 없거나 이전 형식이면 None """
+        data_path, meta_path = self._paths(ticker, root)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        # 이전 형식(배당 조정 종가, 배당 컬럼 없음)은 전체 구간을 다시 받음
+        if meta.get("version") != STORE_VERSION or "start" not in meta:
+            return None
+        return pd.read_parquet(data_path), (meta["start"], meta["end"])
+
+    # --- Persistence ---
+    def _load(self, ticker: str):
+        with self._memory_lock:
+            if ticker in self._memory:
+                self._memory.move_to_end(ticker)
+                return self._memory[ticker]
+
+        # hot ticker는 프로세스마다 복사본을 두지 않도록 메모리 LRU에 넣지 않음
+        entry = hot_cache.get(ticker)
+        if entry is not None:
+            return entry
+
+        entry = self._read(self.root, ticker)
+        archived = self._read(self.archive, ticker) if self.archive else None
+        if archived is not None:
+            self._archived.add(ticker)
+            # 로컬 저장소는 archive에 다운로드한 구간을 더한 것이므로, archive가 더 최근까지 갱신된 경우만 archive 사용
+            if entry is None or archived[1][1] > entry[1][1]:
+                entry = archived
+        if entry is None:
+            entry = (empty_frame(), None)
+        self._remember(ticker, entry)
+        return entry
+
+    def _remember(self, ticker: str, entry):
+        with self._memory_lock:
+            self._memory[ticker] = entry
+            self._memory.move_to_end(ticker)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _save(self, ticker: str, df: pd.DataFrame, coverage: Tuple[str, str]):
+        # 여러 worker가 같은 파일을 쓸 수 있으므로 임시 파일에 쓴 뒤 교체
+        os.makedirs(self.root, exist_ok=True)
+        data_path, meta_path = self._paths(ticker)
+        df.to_parquet(f"{data_path}.{os.getpid()}.tmp")
+        os.replace(f"{data_path}.{os.getpid()}.tmp", data_path)
+        with open(f"{meta_path}.{os.getpid()}.tmp", "w") as f:
+            json.dump({"start": coverage[0], "end": coverage[1], "version": STORE_VERSION}, f)
+        os.replace(f"{meta_path}.{os.getpid()}.tmp", meta_path)
+        self._remember(ticker, (df, coverage))
+
+    # --- Incremental fill ---
+    @staticmethod
+    def missing_ranges(coverage: Optional[Tuple[str, str]], start: str, end: str) -> List[Tuple[str, str]]:
+        """ 저장된 구간 밖의 요청 구간 """
+        if coverage is None:
+            return [(start, end)]
+        ranges = []
+        if start < coverage[0]:
+            ranges.append((start, coverage[0]))
+        if end > coverage[1]:
+            ranges.append((coverage[1], end))
+        return ranges
+
+    def _plan(self, ticker: str, start: str, end: str):
+        df, coverage = self._load(ticker)
+        # 오늘 이후는 아직 확정되지 않은 데이터이므로 커버리지로 기록하지 않음
+        end = min(end, date.today().isoformat())
+        ranges = [(s, e) for s, e in self.missing_ranges(coverage, start, end) if s < e]
+        if ticker in self._archived:
+            # archive의 다음 갱신을 기다리는 최근 며칠은 사용자 요청에서 다운로드하지 않음
+            ranges = [(s, e) for s, e in ranges if not (s == coverage[1] and (pd.Timestamp(e) - pd.Timestamp(s)).days <= self.grace_days)]
+        return df, coverage, ranges
+
+    @staticmethod
+    def apply_splits(df: pd.DataFrame, fetched) -> pd.DataFrame:
+        """
+        저장된 데이터 이후에 일어난 분할을 저장된 데이터에 반영
+        yfinance의 가격/배당은 받은 시점까지의 분할이 반영되어 있으므로, 새로 받은 구간에 분할이 있으면
+        그 이전에 받아둔 가격/배당은 분할 비율로 나누고 거래량은 곱해야 새 구간과 이어진다.
+        """
+        if df.empty:
+            return df
+        last = df.index[-1]
+        splits = pd.concat([frame["stock_splits"] for _, _, frame, _ in fetched if not frame.empty] or [pd.Series(dtype=np.float64)])
+        splits = splits[(splits.index > last) & (splits > 0)]
+        splits = splits[~splits.index.duplicated()]
+        if splits.empty:
+            return df
+        ratio = float(splits.prod())
+        df = df.copy()
+        df[["open", "high", "low", "close", "dividends"]] /= ratio
+        df["volume"] *= ratio
+        return df
+
+    def _merge(self, ticker: str, df: pd.DataFrame, coverage, fetched) -> pd.DataFrame:
+        """ 새로 받은 구간(fetched: [(start, end, DataFrame, ok)])을 저장된 데이터에 병합 """
+        frames = [self.apply_splits(df, fetched)]
+        for s, e, frame, ok in fetched:
+            frames.append(frame)
+            if ok:
+                coverage = (min(coverage[0], s), max(coverage[1], e)) if coverage else (s, e)
+
+        frames = [f for f in frames if not f.empty]
+        if frames:
+            df = pd.concat(frames)
+            df = df[~df.index.duplicated(keep="last")].sort_index()
+        if coverage is None:
+            # 다운로드에 실패하면 커버리지를 남기지 않고 다음 요청에서 다시 시도
+            self._remember(ticker, (df, None))
+            return df
+        self._save(ticker, df, coverage)
+        return df
+
+    def ensure_many(self, tickers: List[str], start: str, end: str) -> Tuple[Dict[str, pd.DataFrame], Dict[str, int]]:
+        """
+        여러 종목의 요청 구간이 저장소에 채워져 있도록 보장하고 종목별 전체 DataFrame 반환
+        빠진 구간이 같은 종목끼리 묶어 yfinance를 한 번만 호출하고, 묶음들은 동시에 다운로드한다.
+        Output: ({ticker: DataFrame}, 다운로드 통계)
+        """
+        # 같은 종목의 다른 표기(BRK.B, BRK-B)는 한 번만 받고, 결과는 요청한 표기(대문자)로 반환
+        requested = {t.upper(): store_symbol(t) for t in tickers}
+        tickers = sorted(set(requested.values()))
+        # 동시에 들어온 요청이 같은 종목을 중복 다운로드하지 않도록 정렬된 순서로 잠금
+        locks = [self._ticker_locks[t] for t in tickers]
+        for lock in locks:
+            lock.acquire()
+        try:
+            plans = dict(zip(tickers, fetch_executor.map(lambda t: self._plan(t, start, end), tickers)))
+
+            groups = defaultdict(list)
+            for ticker, (_, _, ranges) in plans.items():
+                for r in ranges:
+                    groups[r].append(ticker)
+
+            fetched = defaultdict(list)
+            futures = {fetch_executor.submit(download_frames, group, s, e): (s, e) for (s, e), group in groups.items()}
+            for future, (s, e) in futures.items():
+                logger.debug(f"Download {len(groups[(s, e)])} tickers prices: {s} ~ {e}")
+                for ticker, (frame, ok) in future.result().items():
+                    fetched[ticker].append((s, e, frame, ok))
+
+            frames = {}
+            for ticker, (df, coverage, _) in plans.items():
+                frames[ticker] = self._merge(ticker, df, coverage, fetched[ticker]) if ticker in fetched else df
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+        stats = {
+            "tickers": len(tickers),
+            "downloads": len(groups),
+            "downloaded_tickers": len(fetched),
+            "cached_tickers": len(tickers) - len(fetched),
+        }
+        return {key: frames[symbol] for key, symbol in requested.items()}, stats
+
+    def ensure(self, ticker: str, start: str, end: str) -> pd.DataFrame:
+        """ 요청 구간이 저장소에 채워져 있도록 보장하고 종목의 전체 DataFrame 반환 """
+        frames, _ = self.ensure_many([ticker], start, end)
+        return frames[ticker.upper()]
+
+    def get_entry(self, ticker: str) -> Tuple[pd.DataFrame, Optional[Tuple[str, str]]]:
+        """ 저장된 전체 DataFrame과 커버리지 [start, end) (저장된 적 없으면 None) """
+        return self._load(store_symbol(ticker))
+
+    @staticmethod
+    def slice(df: pd.DataFrame, start: str, end: str) -> pd.DataFrame:
+        """ [start, end) 구간 """
+        return df.iloc[df.index.searchsorted(pd.Timestamp(start)):df.index.searchsorted(pd.Timestamp(end))]
+
+    # --- Accessors ---
+    def get_frame(self, ticker: str, start: str, end: str) -> pd.DataFrame:
+        """ [start, end) 구간의 OHLCV DataFrame """
+        df = self.slice(self.ensure(ticker, start, end), start, end)
+        if df.empty:
+            raise ValueError(f"No data found for ticker {ticker} in the given date range.")
+        return df
+
+    def get_actions(self, ticker: str, start: str, end: str) -> pd.DataFrame:
+        """ [start, end) 구간의 배당/분할이 있었던 날짜만 """
+        df = self.get_frame(ticker, start, end)[ACTION_COLUMNS]
+        return df[(df != 0).any(axis=1)]
+
+    def get_feed(self, ticker: str, start: str, end: str) -> bt.feeds.PandasData:
+        """ Backtrader용 PandasData feed """
+        return bt.feeds.PandasData(dataname=self.get_frame(ticker, start, end))
+
+    def get_array(self, ticker: str, start: str, end: str, field: str = "close") -> np.ndarray:
+        """ 다른 엔진에서 사용할 컬럼 배열 """
+        return self.get_frame(ticker, start, end)[field].to_numpy()
+
+
+price_store = PriceStore()
+
+
+def dividend_matrix(frames: Dict[str, pd.DataFrame], dates: np.ndarray, tickers: List[str]) -> np.ndarray:
+    """
+    종목별 주당 배당금을 백테스트 날짜축에 맞춘 배열 [T, A] (배당이 없는 bar는 0)
+    실행 전에 한 번 만들어두고 엔진은 bar index로만 조회 (실행 중에는 저장소나 네트워크를 사용하지 않음)
+    """
+    amounts = np.zeros((len(dates), len(tickers)), dtype=np.float64)
+    for i, ticker in enumerate(tickers):
+        df = frames[ticker]
+        if "dividends" not in df:
+            continue
+        # 배당은 분기에 한 번 정도이므로 배당이 있는 날짜만 날짜축 위치로 변환
+        dividends = df["dividends"].to_numpy()
+        paid = np.flatnonzero(dividends > 0)
+        paid_dates = df.index.values[paid].astype("datetime64[D]")
+        bars = np.searchsorted(dates, paid_dates)
+        on_axis = bars < len(dates)
+        on_axis[on_axis] = dates[bars[on_axis]] == paid_dates[on_axis]
+        amounts[bars[on_axis], i] = dividends[paid[on_axis]]
+    return amounts
@@ -0,0 +1,18 @@
+import numpy as np
+
+
+def band_breach(current: np.ndarray, target: np.ndarray, abs_band: np.ndarray, rel_band: np.ndarray) -> np.ndarray:
+    """
+    리밸런싱 일정이 된 포트폴리오 중 실제로 리밸런싱할 포트폴리오 [P] bool
+    한 종목이라도 허용 범위를 벗어나면 포트폴리오 전체를 목표 비중으로 되돌림
+    - abs_band : 목표 비중과 현재 비중의 차이 (비중 단위, 0.05 = 5%p)
+    - rel_band : 목표 비중 대비 차이의 비율 (0.25 = 목표 비중의 25%)
+    둘 다 0이면 허용 범위 없이 항상 리밸런싱
+
+    current, target: [P, A] 현재/목표 비중, abs_band, rel_band: [P]
+    """
+    abs_band = abs_band[:, None]
+    rel_band = rel_band[:, None]
+    drift = np.abs(current - target)
+    breach = ((abs_band > 0) & (drift > abs_band)) | ((rel_band > 0) & (drift > rel_band * target))
+    return breach.any(axis=1) | ((abs_band[:, 0] <= 0) & (rel_band[:, 0] <= 0))
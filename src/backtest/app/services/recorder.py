@@ -0,0 +1,47 @@
+import numpy as np
+
+# backtrader 날짜 값(0001-01-01 기준 일수 + 1)과 epoch day의 차이
+BT_EPOCH_ORDINAL = 719163
+
+
+class BarRecorder:
+    """
+    전략이 bar마다 기록하는 값을 feed 길이만큼 미리 할당한 배열에 저장
+    날짜는 epoch day(int32)로 저장하고, 결과는 복사 없이 배열 view로 metrics에 전달
+    - days : [N] epoch day
+    - values : [N] 포트폴리오 평가금액
+    - cashflows : [N] 입금액
+    """
+    def __init__(self, size: int):
+        self.size = 0
+        self._days = np.empty(size, dtype=np.int32)
+        self._values = np.empty(size, dtype=np.float64)
+        self._cashflows = np.zeros(size, dtype=np.float64)
+
+    def record(self, bt_date: float, value: float):
+        """ 새 bar의 날짜(backtrader 날짜 값)와 평가금액 기록 """
+        if self.size >= len(self._values):
+            raise ValueError(f"More bars than the recorder was sized for ({len(self._values)}), the strategy calendar is longer than expected")
+        self._days[self.size] = int(bt_date) - BT_EPOCH_ORDINAL
+        self._values[self.size] = value
+        self.size += 1
+
+    def add_cashflow(self, amount: float):
+        """ 마지막으로 기록한 bar의 입금액 """
+        self._cashflows[self.size - 1] += amount
+
+    @property
+    def days(self) -> np.ndarray:
+        return self._days[:self.size]
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self.days.astype("datetime64[D]")
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[:self.size]
+
+    @property
+    def cashflows(self) -> np.ndarray:
+        return self._cashflows[:self.size]
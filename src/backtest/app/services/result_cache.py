@@ -0,0 +1,141 @@
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+from prometheus_client import Counter
+import functools
+import threading
+import asyncio
+import logging
+import redis
+import json
+import os
+
+logger = logging.getLogger('uvicorn.error')
+
+BACKTEST_RESULT_CACHE_SIZE = int(os.getenv("BACKTEST_RESULT_CACHE_SIZE", 256))     # 프로세스별 보관 결과 수
+BACKTEST_RESULT_CACHE_BACKEND = os.getenv("BACKTEST_RESULT_CACHE_BACKEND", "")    # e.g., "" / "redis"
+BACKTEST_RESULT_CACHE_TTL = int(os.getenv("BACKTEST_RESULT_CACHE_TTL", 86400))
+BACKTEST_CHECKPOINT_CACHE_SIZE = int(os.getenv("BACKTEST_CHECKPOINT_CACHE_SIZE", 64))  # 프로세스별 보관 checkpoint 수
+BACKTEST_RETURNS_CACHE_SIZE = int(os.getenv("BACKTEST_RETURNS_CACHE_SIZE", 32))        # 프로세스별 보관 일별 수익률 행렬 수
+
+RESULT_CACHE_REQUESTS = Counter('backtest_result_cache_total', 'Backtest result cache lookups', ["result"])
+
+
+class ResultCache:
+    """
+    요청 hash를 key로 하는 백테스트 결과 캐시
+    - 프로세스 메모리 LRU (max_entries 개수 제한)
+    - 선택적으로 Redis를 공유 저장소로 사용해 모든 replica가 결과를 재사용
+    - 같은 key의 계산이 진행 중이면 새로 계산하지 않고 결과를 함께 기다림 (single-flight)
+    """
+    def __init__(self, max_entries: int = BACKTEST_RESULT_CACHE_SIZE, backend: Optional[redis.Redis] = None, ttl: int = BACKTEST_RESULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.backend = backend
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _backend_key(self, key: str) -> str:
+        return f"backtest:result:{key}"
+
+    def get_local(self, key: str) -> Optional[dict]:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set_local(self, key: str, value: dict):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_shared(self, key: str) -> Optional[dict]:
+        if self.backend is None:
+            return None
+        try:
+            value = self.backend.get(self._backend_key(key))
+        except redis.RedisError as e:
+            logger.error(f"Result cache lookup failed: {e}")
+            return None
+        if value is None:
+            return None
+        value = json.loads(value)
+        self.set_local(key, value)
+        return value
+
+    def get(self, key: str) -> Optional[dict]:
+        value = self.get_local(key)
+        if value is not None:
+            RESULT_CACHE_REQUESTS.labels(result="hit").inc()
+            return value
+        value = self.get_shared(key)
+        RESULT_CACHE_REQUESTS.labels(result="shared_hit" if value is not None else "miss").inc()
+        return value
+
+    def set(self, key: str, value: dict):
+        self.set_local(key, value)
+        if self.backend is not None:
+            try:
+                self.backend.set(self._backend_key(key), json.dumps(value), ex=self.ttl)
+            except redis.RedisError as e:
+                logger.error(f"Failed to update result cache: {e}")
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[dict]]) -> dict:
+        """
+        캐시된 결과를 반환하고, 없으면 compute()로 계산해 저장
+        같은 key로 동시에 들어온 요청은 하나의 계산 결과를 공유
+        계산은 처음 요청한 쪽과 분리된 task에서 실행되므로, 그 요청이 취소되어도 나머지 요청은 결과나 계산 오류를 받는다.
+        """
+        value = self.get_local(key)
+        if value is not None:
+            RESULT_CACHE_REQUESTS.labels(result="hit").inc()
+            return value
+        task = self._inflight.get(key)
+        if task is not None:
+            RESULT_CACHE_REQUESTS.labels(result="joined").inc()
+        else:
+            task = asyncio.ensure_future(self._compute(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._finished, key))
+        # 기다리던 요청이 취소되어도 계산은 취소하지 않음
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[dict]]) -> dict:
+        value = await run_in_threadpool(self.get_shared, key)
+        if value is not None:
+            RESULT_CACHE_REQUESTS.labels(result="shared_hit").inc()
+            return value
+        RESULT_CACHE_REQUESTS.labels(result="miss").inc()
+        value = await compute()
+        await run_in_threadpool(self.set, key, value)
+        return value
+
+    def _finished(self, key: str, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 기다리는 요청이 모두 취소된 경우 'exception was never retrieved' 경고 방지
+        if not task.cancelled():
+            task.exception()
+
+
+def _create_backend() -> Optional[redis.Redis]:
+    if BACKTEST_RESULT_CACHE_BACKEND != "redis":
+        return None
+    return redis.Redis(
+        host=os.getenv("REDIS_HOST", "localhost"),
+        port=int(os.getenv("REDIS_PORT", 6379)),
+        db=int(os.getenv("REDIS_DB", 0)),
+    )
+
+
+result_cache = ResultCache(backend=_create_backend())
+
+# 기간을 늘려 다시 실행할 때 이어서 계산하기 위한 엔진 상태 (NumPy 배열을 포함하므로 프로세스 메모리에만 보관)
+checkpoint_cache = ResultCache(max_entries=BACKTEST_CHECKPOINT_CACHE_SIZE)
+
+# 종목 집합과 기간별로 정렬한 일별 수익률 행렬 (포트폴리오 입력을 고칠 때마다 다시 불러오지 않도록 프로세스 메모리에만 보관)
+returns_cache = ResultCache(max_entries=BACKTEST_RETURNS_CACHE_SIZE)
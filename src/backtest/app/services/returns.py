@@ -0,0 +1,47 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import date
+from fastapi.concurrency import run_in_threadpool
+import pandas as pd
+
+from .backtest import load_frames
+from .vector_engine import build_price_matrix
+from .price_store import dividend_matrix
+from .result_cache import returns_cache
+
+
+def aligned_returns(frames: Dict[str, pd.DataFrame]) -> dict:
+    """
+    모든 종목의 가격이 있는 날짜축으로 정렬한 일별 총수익률(배당 포함)
+    Output: {"dates": [T-1] datetime64[D], "tickers": [A], "returns": [T-1, A]} (배열은 읽기 전용, 캐시에서 여러 요청이 공유)
+    """
+    dates, close, tickers = build_price_matrix(frames)
+    if len(dates) < 3:
+        raise ValueError("Not enough overlapping price data to estimate returns")
+    dividends = dividend_matrix(frames, dates, tickers)
+    returns = (close[1:] + dividends[1:]) / close[:-1] - 1
+    dates = dates[1:]
+    returns.flags.writeable = False
+    dates.flags.writeable = False
+    return {"dates": dates, "tickers": tickers, "returns": returns}
+
+
+def returns_key(tickers: List[str], start: str, end: str) -> str:
+    """ 종목 집합과 기간의 key (아직 오지 않은 날짜는 오늘로 잘라 날짜가 지나면 key가 바뀜) """
+    return f"{','.join(sorted(tickers))}:{start}:{min(end, date.today().isoformat())}"
+
+
+async def load_returns(tickers: List[str], start: str, end: str) -> Tuple[dict, Optional[dict]]:
+    """
+    종목들의 일별 수익률 행렬을 returns_cache에서 가져오고, 없으면 가격을 불러와 계산해 저장
+    Output: (aligned_returns 결과, fetch stats (캐시에서 가져왔으면 None))
+    """
+    tickers = sorted({ticker.upper() for ticker in tickers})
+    fetch_stats = {}
+
+    async def compute() -> dict:
+        data, stats = await run_in_threadpool(load_frames, tickers, start, end)
+        fetch_stats.update(stats)
+        return await run_in_threadpool(aligned_returns, data)
+
+    matrix = await returns_cache.get_or_compute(returns_key(tickers, start, end), compute)
+    return matrix, fetch_stats or None
@@ -0,0 +1,158 @@
+from typing import Dict, List
+from datetime import datetime
+from pydantic import BaseModel
+import pandas as pd
+import numpy as np
+import os
+
+from .backtest import PortfolioItem
+from .vector_engine import build_price_matrix, simulate
+from .price_store import dividend_matrix
+from .schedules import event_mask, validate_schedule
+from .strategies import validate_strategy, strategy_exposure, exposure_changes
+
+ROLLING_MAX_YEARS = int(os.getenv("ROLLING_MAX_YEARS", 50))
+ROLLING_CHUNK_ELEMENTS = int(os.getenv("ROLLING_CHUNK_ELEMENTS", 4_000_000))  # 낙폭을 한 번에 계산하는 (window 수 x window 길이) 상한 (메모리 제한)
+
+YEAR_DAYS = 365.25
+
+
+# --- Input Data Schema ---
+class RollingRequest(BaseModel):
+    start_date: str
+    end_date: str
+    portfolio: PortfolioItem
+    years: int = 10                 # window 길이 (년)
+    step: int = 1                   # window 시작 bar 간격 (1이면 모든 거래일)
+    percentiles: List[float] = [5, 25, 50, 75, 95]
+    include_series: bool = False    # window별 시작일, CAGR, 최대 낙폭 포함
+
+
+def validate_rolling(params: RollingRequest):
+    """ rolling window 요청 검증, 잘못된 요청이면 ValueError """
+    if datetime.strptime(params.start_date, "%Y-%m-%d") > datetime.strptime(params.end_date, "%Y-%m-%d"):
+        raise ValueError("Start date must be before end date")
+    if not 0 < params.years <= ROLLING_MAX_YEARS:
+        raise ValueError(f"Years must be between 1 and {ROLLING_MAX_YEARS}")
+    if params.step <= 0:
+        raise ValueError("Step must be positive")
+    if any(not 0 <= q <= 100 for q in params.percentiles):
+        raise ValueError("Percentiles must be between 0 and 100")
+    portfolio = params.portfolio
+    if len(portfolio.allocation) == 0:
+        raise ValueError("Allocation must not be empty")
+    validate_schedule(portfolio.rebalance_freq, portfolio.rebalance_dates, "Rebalance frequency")
+    if portfolio.abs_band < 0 or portfolio.rel_band < 0:
+        raise ValueError("Rebalance bands must not be negative")
+    validate_strategy(portfolio.strategy, portfolio.strategy_params)
+
+
+def portfolio_growth(portfolio: PortfolioItem, data: Dict[str, pd.DataFrame]) -> tuple:
+    """
+    전체 기간을 vector engine으로 한 번 시뮬레이션한 누적 수익 지수 (입금 없음, 첫 bar = 1)
+    Output: (dates[T], values[T])
+    """
+    allocation = {ticker.upper(): weight for ticker, weight in portfolio.allocation.items()}
+    frames = {ticker: data[ticker] for ticker in allocation}
+    dates, close, tickers = build_price_matrix(frames)
+    weights = np.array([[allocation[t] / 100 for t in tickers]])
+    exposure = strategy_exposure(portfolio.strategy, portfolio.strategy_params, close)
+    signals = {} if exposure is None else {"exposure": exposure, "exposure_changed": exposure_changes(exposure)}
+    values = simulate(
+        close, weights, np.ones(1), np.zeros((1, len(dates))), event_mask(dates, portfolio.rebalance_freq, portfolio.rebalance_dates)[None, :],
+        dividends=dividend_matrix(frames, dates, tickers), reinvest=np.array([portfolio.invest_dividends]),
+        abs_band=np.array([portfolio.abs_band / 100]), rel_band=np.array([portfolio.rel_band / 100]), **signals
+    )[0]
+    return dates, values
+
+
+def window_bounds(dates: np.ndarray, years: int, step: int) -> tuple:
+    """
+    years년 window의 시작/끝 bar index [W]
+    끝은 시작일 + years년 이전의 마지막 거래일, 끝까지 데이터가 있는 window만 포함
+    """
+    horizon = np.timedelta64(int(round(years * YEAR_DAYS)), "D")
+    starts = np.arange(0, len(dates), step)
+    starts = starts[dates[starts] + horizon <= dates[-1]]
+    ends = np.searchsorted(dates, dates[starts] + horizon, side="right") - 1
+    return starts, ends
+
+
+def window_drawdowns(values: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    window별 최대 낙폭(%) [W]
+    window 시작 기준 running max를 [window, bar] 행렬에서 한 번에 계산 (복사 없는 sliding view, 메모리 제한만큼씩)
+    """
+    length = int((ends - starts).max()) + 1
+    # 마지막 window가 length를 채우도록 마지막 값으로 늘림 (window 끝 이후의 bar는 mask로 제외)
+    padded = np.concatenate([values, np.full(length, values[-1])])
+    view = np.lib.stride_tricks.sliding_window_view(padded, length)
+    offsets = np.arange(length)
+    drawdowns = np.empty(len(starts))
+    chunk = max(1, ROLLING_CHUNK_ELEMENTS // length)
+    for begin in range(0, len(starts), chunk):
+        rows = slice(begin, begin + chunk)
+        window = view[starts[rows]]
+        ratio = window / np.maximum.accumulate(window, axis=1)
+        ratio[offsets[None, :] > (ends[rows] - starts[rows])[:, None]] = 1
+        drawdowns[rows] = (1 - ratio.min(axis=1)) * 100
+    return drawdowns
+
+
+def distribution(values: np.ndarray, percentiles: List[float], digits: int) -> dict:
+    return {
+        "percentiles": np.round(np.percentile(values, percentiles), digits).tolist(),
+        "mean": round(float(values.mean()), digits),
+        "min": round(float(values.min()), digits),
+        "max": round(float(values.max()), digits),
+    }
+
+
+def run_rolling(params: RollingRequest, data: Dict[str, pd.DataFrame]) -> dict:
+    """
+    가능한 모든 시작일(step bar 간격)에 대해 years년 보유한 결과의 분포
+    전체 기간을 한 번만 시뮬레이션하고, window별 CAGR은 누적 수익 지수의 비율로, 최대 낙폭은 running max 행렬로 계산
+    (리밸런싱 일정은 전체 기간의 달력 기준으로 모든 window에 같이 적용)
+    Output:
+    {
+        "name": str, "years": int, "windows": int, "percentiles": [float],
+        "cagr": {"percentiles": [float], "mean", "min", "max"},           # %
+        "max_drawdown": {"percentiles": [float], "mean", "min", "max"},   # %
+        "best": {"start", "end", "cagr", "max_drawdown"}, "worst": {...},  # CAGR 기준
+        "series": {"start": [str], "cagr": [float], "max_drawdown": [float]}   # include_series일 때만
+    }
+    """
+    dates, values = portfolio_growth(params.portfolio, data)
+    starts, ends = window_bounds(dates, params.years, params.step)
+    if len(starts) == 0:
+        raise ValueError(f"Price history is shorter than {params.years} years")
+
+    elapsed = (dates[ends] - dates[starts]).astype(np.int64) / YEAR_DAYS
+    cagr = ((values[ends] / values[starts]) ** (1 / elapsed) - 1) * 100
+    drawdowns = window_drawdowns(values, starts, ends)
+
+    def describe(i: int) -> dict:
+        return {
+            "start": str(dates[starts[i]]),
+            "end": str(dates[ends[i]]),
+            "cagr": round(float(cagr[i]), 4),
+            "max_drawdown": round(float(drawdowns[i]), 4),
+        }
+
+    result = {
+        "name": params.portfolio.name,
+        "years": params.years,
+        "windows": len(starts),
+        "percentiles": params.percentiles,
+        "cagr": distribution(cagr, params.percentiles, 4),
+        "max_drawdown": distribution(drawdowns, params.percentiles, 4),
+        "best": describe(int(np.argmax(cagr))),
+        "worst": describe(int(np.argmin(cagr))),
+    }
+    if params.include_series:
+        result["series"] = {
+            "start": np.datetime_as_string(dates[starts], unit="D").tolist(),
+            "cagr": np.round(cagr, 4).tolist(),
+            "max_drawdown": np.round(drawdowns, 4).tolist(),
+        }
+    return result
@@ -0,0 +1,209 @@
+from typing import Callable, Dict, List, Optional
+from datetime import date, datetime
+import pandas as pd
+import hashlib
+import json
+
+from .backtest import BacktestRequest, PortfolioItem, run_backtest, load_frames
+from .vector_engine import run_vectorized_backtest, extend_vectorized_backtest
+from .result_cache import result_cache, checkpoint_cache
+from .serializers import RESPONSE_FORMATS, columnar_results
+from .schedules import validate_schedule
+from .hot_cache import HotSnapshot
+from .strategies import STRATEGIES, validate_strategy
+from .instrumentation import record_phases
+
+# 요청별로 선택 가능한 백테스트 엔진
+ENGINES = {
+    "backtrader": run_backtest,
+    "vector": run_vectorized_backtest,
+}
+
+# checkpoint에서 이어서 실행할 수 있는 엔진 : engine(*engine_args, checkpoint) -> (result, checkpoint)
+CHECKPOINT_ENGINES = {
+    "vector": extend_vectorized_backtest,
+}
+
+# 엔진이 사용하는 컬럼 (프로세스 풀로 보내는 데이터 크기를 줄이기 위해 나머지 컬럼은 제외, 없으면 전체)
+ENGINE_COLUMNS = {
+    "vector": ["close", "dividends"],
+}
+
+# 엔진의 계산 방식이 바뀌면 버전을 올려 이전에 캐시된 결과를 무효화
+ENGINE_VERSIONS = {
+    "backtrader": 8,
+    "vector": 7,
+}
+
+
+def validate_request(params: BacktestRequest):
+    """
+    백테스트 요청 검증, 잘못된 요청이면 ValueError
+    """
+    start_date = datetime.strptime(params.start_date, "%Y-%m-%d")
+    end_date = datetime.strptime(params.end_date, "%Y-%m-%d")
+    if start_date > end_date:
+        raise ValueError("Start date must be before end date")
+    if params.engine not in ENGINES:
+        raise ValueError(f"Engine must be one of {', '.join(ENGINES)}")
+    if params.format not in RESPONSE_FORMATS:
+        raise ValueError(f"Format must be one of {', '.join(RESPONSE_FORMATS)}")
+    validate_schedule(params.cashflow_freq, params.cashflow_dates, "Cashflow frequency")
+    for portfolio in params.portfolio:
+        validate_schedule(portfolio.rebalance_freq, portfolio.rebalance_dates, "Rebalance frequency")
+        if portfolio.abs_band < 0 or portfolio.rel_band < 0:
+            raise ValueError("Rebalance bands must not be negative")
+        validate_strategy(portfolio.strategy, portfolio.strategy_params)
+
+    # 기간과 포트폴리오 수는 admission에서 예상 비용으로 제한
+    if len(params.portfolio) == 0:
+        raise ValueError("Portfolio must not be empty")
+
+
+def request_tickers(params: BacktestRequest) -> List[str]:
+    """ 요청에 포함된 모든 포트폴리오의 종목 (중복 제거) """
+    return sorted({item.upper() for portfolio in params.portfolio for item in portfolio.allocation})
+
+
+def portfolio_data(portfolio: PortfolioItem, data: Dict[str, pd.DataFrame], columns: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+    """ 요청 단위로 불러온 데이터 중 포트폴리오에 필요한 종목(과 컬럼)만 """
+    frames = {item.upper(): data[item.upper()] for item in portfolio.allocation}
+    if columns is not None:
+        frames = {ticker: df[df.columns.intersection(columns)] for ticker, df in frames.items()}
+    return frames
+
+
+def engine_args(params: BacktestRequest, portfolio: PortfolioItem, data: Dict[str, pd.DataFrame], snapshot: Optional[HotSnapshot] = None) -> tuple:
+    """
+    ENGINES[params.engine]에 전달할 인자
+    snapshot(hot_cache.reading())을 주면 그 버전에 요청 구간이 모두 있는 종목은 DataFrame 대신 참조(HotFrame)를 보내
+    프로세스 풀로 복사하지 않고 엔진 프로세스가 같은 버전을 직접 읽음 (실행이 끝날 때까지 snapshot을 고정해야 함)
+    """
+    frames = portfolio_data(portfolio, data, ENGINE_COLUMNS.get(params.engine))
+    if snapshot is not None:
+        for ticker in frames:
+            ref = snapshot.reference(ticker, params.start_date, params.end_date)
+            if ref is not None:
+                frames[ticker] = ref
+    return (
+        params.start_date,
+        params.end_date,
+        params.initial_capital,
+        params.cashflow,
+        params.cashflow_freq,
+        params.adjust_inflation,
+        portfolio,
+        frames,
+        params.cashflow_dates,
+    )
+
+
+def canonical_request(params: BacktestRequest, portfolio: PortfolioItem) -> dict:
+    """
+    포트폴리오 하나의 백테스트 결과를 결정하는 값
+    결과에 영향을 주지 않는 값(포트폴리오 이름, 종목 순서/대소문자)은 정규화하고,
+    아직 확정되지 않은 미래 구간은 오늘 날짜로 잘라 날짜가 지나면 key가 바뀌도록 한다.
+    """
+    item = portfolio.model_dump(exclude={"name"})
+    item["allocation"] = sorted((ticker.upper(), float(weight)) for ticker, weight in portfolio.allocation.items())
+    item["rebalance_dates"] = sorted(portfolio.rebalance_dates) if portfolio.rebalance_freq == "custom" else []
+    # 기본값을 생략한 요청과 명시한 요청이 같은 key를 갖도록 전략 파라미터를 채움
+    item["strategy_params"] = {name: float(value) for name, value in STRATEGIES[portfolio.strategy].resolve(portfolio.strategy_params).items()}
+    return {
+        "engine": params.engine,
+        "engine_version": ENGINE_VERSIONS[params.engine],
+        "start_date": params.start_date,
+        "end_date": min(params.end_date, date.today().isoformat()),
+        "initial_capital": float(params.initial_capital),
+        "cashflow": float(params.cashflow),
+        "cashflow_freq": params.cashflow_freq,
+        "cashflow_dates": sorted(params.cashflow_dates) if params.cashflow_freq == "custom" else [],
+        "adjust_inflation": params.adjust_inflation,
+        "portfolio": item,
+    }
+
+
+def result_key(params: BacktestRequest, portfolio: PortfolioItem) -> str:
+    """ 포트폴리오 하나의 백테스트 결과를 식별하는 hash """
+    canonical = canonical_request(params, portfolio)
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+
+def checkpoint_key(params: BacktestRequest, portfolio: PortfolioItem) -> str:
+    """ 종료일만 다른 요청끼리 공유하는 checkpoint의 hash """
+    canonical = canonical_request(params, portfolio)
+    del canonical["end_date"]
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+
+def save_checkpoint(key: str, checkpoint: dict):
+    """ 더 긴 기간의 checkpoint를 짧은 기간의 checkpoint로 덮어쓰지 않음 """
+    current = checkpoint_cache.get_local(key)
+    if current is None or len(checkpoint["dates"]) >= len(current["dates"]):
+        checkpoint_cache.set_local(key, checkpoint)
+
+
+def combine_results(results: List[dict]) -> dict:
+    """ 포트폴리오별 결과를 API 응답 형태로 병합 """
+    total_result = {
+        "performance": [],
+        "drawdown": [],
+        "annual_returns": [],
+        "metrics": []
+    }
+    for result in results:
+        total_result["date"] = result["date"]
+        total_result["performance"].append({result['name']: result["performance"]})
+        total_result["drawdown"].append({result['name']: result["drawdown"]})
+        total_result["annual_returns"].append({result['name']: result["annual_returns"]})
+        total_result["metrics"].append({result['name']: result["metrics"]})
+        if "profile" in result:
+            total_result.setdefault("profile", []).append({result['name']: result["profile"]})
+    return total_result
+
+
+def format_results(params: BacktestRequest, results: List[dict]) -> dict:
+    """ 요청한 형식(params.format)으로 포트폴리오별 결과 병합 (job 결과는 ndjson 대신 기존 형식) """
+    if params.format == "columnar":
+        return columnar_results(results, params.binary)
+    return combine_results(results)
+
+
+def run_request(params: BacktestRequest, progress: Optional[Callable[[str, int, int], None]] = None) -> dict:
+    """
+    요청 전체를 현재 프로세스에서 순차 실행 (job worker용)
+    progress(portfolio_name, bars_processed, total_bars)로 포트폴리오별 진행 상황을 전달
+    """
+    validate_request(params)
+    keys = [result_key(params, portfolio) for portfolio in params.portfolio]
+    cached = [None if params.profile else result_cache.get(key) for key in keys]
+
+    missing = [portfolio for portfolio, result in zip(params.portfolio, cached) if result is None]
+    tickers = sorted({item.upper() for portfolio in missing for item in portfolio.allocation})
+    data, fetch_stats = load_frames(tickers, params.start_date, params.end_date)
+
+    results = []
+    for portfolio, key, result in zip(params.portfolio, keys, cached):
+        if result is None:
+            report = (lambda bars, total, name=portfolio.name: progress(name, bars, total)) if progress else None
+            if params.engine in CHECKPOINT_ENGINES:
+                ckpt_key = checkpoint_key(params, portfolio)
+                result, checkpoint = CHECKPOINT_ENGINES[params.engine](
+                    *engine_args(params, portfolio, data), checkpoint_cache.get_local(ckpt_key), progress=report
+                )
+                save_checkpoint(ckpt_key, checkpoint)
+            else:
+                result = ENGINES[params.engine](*engine_args(params, portfolio, data), progress=report)
+            # 단계별 시간은 기록만 하고 캐시에는 저장하지 않음 (profile 요청이면 응답에 포함)
+            stripped = record_phases(params.engine, result)
+            result_cache.set(key, stripped)
+            if not params.profile:
+                result = stripped
+        elif progress:
+            progress(portfolio.name, len(result["date"]), len(result["date"]))
+        results.append({**result, "name": portfolio.name})
+
+    total_result = format_results(params, results)
+    total_result["fetch"] = fetch_stats
+    total_result["cache"] = {"hits": len(keys) - len(missing), "misses": len(missing)}
+    return total_result
@@ -0,0 +1,69 @@
+from typing import Dict, List, Optional
+import pandas as pd
+import numpy as np
+
+# 리밸런싱/캐시플로우 주기
+# - monthly / quarterly / yearly : 각 기간의 마지막 거래일
+# - custom : 지정한 날짜 (휴장일이면 다음 거래일)
+# - none : 이벤트 없음
+FREQUENCIES = ("none", "monthly", "quarterly", "yearly", "custom")
+
+PERIOD_UNITS = {
+    "monthly": "M",
+    "yearly": "Y",
+}
+
+
+def trading_dates(frames: Dict[str, pd.DataFrame]) -> np.ndarray:
+    """
+    여러 종목의 거래일을 합친 날짜축 (모든 종목의 가격이 존재하는 시점부터) [T] datetime64[D]
+    vector engine의 가격 행렬, Backtrader의 next() 호출 시점과 같은 축
+    """
+    start = max(df.index[0] for df in frames.values())
+    index = pd.DatetimeIndex(np.unique(np.concatenate([df.index.values for df in frames.values()])))
+    return index[index >= start].values.astype("datetime64[D]")
+
+
+def period_keys(dates: np.ndarray, freq: str) -> np.ndarray:
+    """ 각 bar가 속한 기간 (분기는 월 index // 3) """
+    if freq == "quarterly":
+        return dates.astype("datetime64[M]").astype(np.int64) // 3
+    return dates.astype(f"datetime64[{PERIOD_UNITS[freq]}]").astype(np.int64)
+
+
+def event_bars(dates: np.ndarray, freq: str, custom_dates: Optional[List[str]] = None) -> np.ndarray:
+    """
+    주기를 실제 거래일 bar index로 변환 [N] int
+    마지막 bar는 기간이 끝나지 않았을 수 있고 이후 평가금액에도 반영되지 않으므로 제외
+    """
+    if len(dates) == 0 or freq == "none":
+        return np.array([], dtype=np.int64)
+    if freq == "custom":
+        targets = np.array(custom_dates or [], dtype="datetime64[D]")
+        bars = np.unique(np.searchsorted(dates, targets[targets >= dates[0]]))
+    elif freq in ("monthly", "quarterly", "yearly"):
+        keys = period_keys(dates, freq)
+        bars = np.flatnonzero(keys[1:] != keys[:-1])
+    else:
+        raise ValueError(f"Frequency must be one of {', '.join(FREQUENCIES)}")
+    return bars[bars < len(dates) - 1]
+
+
+def event_mask(dates: np.ndarray, freq: str, custom_dates: Optional[List[str]] = None) -> np.ndarray:
+    """ event_bars를 bar별 boolean mask로 [T] """
+    mask = np.zeros(len(dates), dtype=bool)
+    mask[event_bars(dates, freq, custom_dates)] = True
+    return mask
+
+
+def validate_schedule(freq: str, custom_dates: Optional[List[str]] = None, name: str = "Frequency"):
+    """ 주기와 custom 날짜 검증, 잘못된 값이면 ValueError """
+    if freq not in FREQUENCIES:
+        raise ValueError(f"{name} must be one of {', '.join(FREQUENCIES)}")
+    if freq == "custom":
+        if not custom_dates:
+            raise ValueError(f"{name} 'custom' requires a list of dates")
+        try:
+            np.array(custom_dates, dtype="datetime64[D]")
+        except ValueError:
+            raise ValueError(f"Dates of {name.lower()} must be in YYYY-mm-dd format")
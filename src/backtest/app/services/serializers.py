@@ -0,0 +1,80 @@
+from typing import List
+import numpy as np
+import base64
+import json
+
+# 응답 형식 : "json"(기존 형식) / "columnar" / "ndjson"
+RESPONSE_FORMATS = ("json", "columnar", "ndjson")
+
+EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def epoch_days(dates: List[str]) -> np.ndarray:
+    """ ISO 날짜 문자열 -> 1970-01-01 기준 일수 (int32) """
+    return (np.array(dates, dtype="datetime64[D]") - EPOCH).astype(np.int32)
+
+
+def encode_array(values: np.ndarray, binary: bool):
+    """
+    binary인 경우 little-endian float32/int32 배열을 base64 문자열로, 아니면 JSON 숫자 목록으로 변환
+    (결측값은 binary에서는 NaN, JSON에서는 null)
+    """
+    if binary:
+        dtype = np.dtype("<f4" if values.dtype.kind == "f" else "<i4")
+        return {"dtype": dtype.name, "data": base64.b64encode(values.astype(dtype).tobytes()).decode("ascii")}
+    if values.dtype.kind == "f":
+        return [None if np.isnan(v) else v for v in values.tolist()]
+    return values.tolist()
+
+
+def align(days: np.ndarray, series_days: np.ndarray, values: List[float]) -> np.ndarray:
+    """ 포트폴리오 series를 공통 날짜축에 맞춰 정렬 (해당 날짜가 없으면 NaN) """
+    aligned = np.full(len(days), np.nan)
+    aligned[np.searchsorted(days, series_days)] = values
+    return aligned
+
+
+def columnar_portfolio(result: dict, days: np.ndarray, binary: bool) -> dict:
+    """ 포트폴리오 하나의 결과를 days 날짜축 기준의 열 형식으로 변환 """
+    series_days = epoch_days(result["date"])
+    annual = result["annual_returns"]
+    return {
+        "name": result["name"],
+        "performance": encode_array(align(days, series_days, result["performance"]), binary),
+        "drawdown": encode_array(align(days, series_days, result["drawdown"]), binary),
+        "annual_returns": {
+            "year": [item["year"] for item in annual],
+            "return": [round(item["return"], 4) for item in annual],
+        },
+        "metrics": result["metrics"],
+        **({"profile": result["profile"]} if "profile" in result else {}),
+    }
+
+
+def columnar_results(results: List[dict], binary: bool = False) -> dict:
+    """
+    포트폴리오별 결과를 공통 날짜축 하나와 포트폴리오별 배열로 변환
+    Output:
+    {
+        "format": "columnar",
+        "date": [int],      # epoch days, 모든 포트폴리오 날짜의 합집합
+        "portfolios": [{"name", "performance": [float], "drawdown": [float], "annual_returns": {"year": [int], "return": [float]}, "metrics"}]
+    }
+    """
+    days = np.unique(np.concatenate([epoch_days(result["date"]) for result in results])) if results else np.array([], dtype=np.int32)
+    return {
+        "format": "columnar",
+        "date": encode_array(days.astype(np.int32), binary),
+        "portfolios": [columnar_portfolio(result, days, binary) for result in results],
+    }
+
+
+def ndjson_line(record: dict) -> bytes:
+    """ NDJSON 한 줄 """
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode()
+
+
+def ndjson_portfolio(result: dict, binary: bool = False) -> dict:
+    """ 스트리밍 응답의 포트폴리오 레코드 (날짜축은 포트폴리오별로 포함) """
+    days = epoch_days(result["date"])
+    return {"type": "portfolio", "date": encode_array(days, binary), **columnar_portfolio(result, days, binary)}
@@ -0,0 +1,219 @@
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+import pandas as pd
+import numpy as np
+import os
+
+from .backtest import PortfolioItem
+from .vector_engine import COMMISSION, build_price_matrix
+from .price_store import dividend_matrix
+from .metrics import TRADING_DAYS
+
+SIMULATION_MAX_PATHS = int(os.getenv("SIMULATION_MAX_PATHS", 20000))
+SIMULATION_MAX_YEARS = int(os.getenv("SIMULATION_MAX_YEARS", 50))
+SIMULATION_CHUNK_PATHS = int(os.getenv("SIMULATION_CHUNK_PATHS", 2000))    # 한 번에 계산하는 경로 수 (메모리 제한)
+SIMULATION_SHARD_PATHS = int(os.getenv("SIMULATION_SHARD_PATHS", 2500))    # 프로세스 하나에 맡기는 최소 경로 수
+
+# 시뮬레이션 달력 : 1년 = 252 거래일, 1개월 = 21 거래일
+MONTH_DAYS = TRADING_DAYS // 12
+EVENT_INTERVALS = {
+    "monthly": MONTH_DAYS,
+    "quarterly": MONTH_DAYS * 3,
+    "yearly": TRADING_DAYS,
+}
+
+
+# --- Input Data Schema ---
+class SimulationRequest(BaseModel):
+    start_date: str                 # 표본으로 사용할 과거 구간
+    end_date: str
+    initial_capital: float
+    cashflow: float = 0
+    cashflow_freq: str = "monthly"  # e.g., "monthly / quarterly / yearly"
+    portfolio: List[PortfolioItem]
+    paths: int = 1000
+    years: int = 30
+    block_size: int = 21            # 한 번에 복원추출하는 연속 거래일 수
+    percentiles: List[float] = [5, 25, 50, 75, 95]
+    seed: Optional[int] = None
+
+
+def validate_simulation(params: SimulationRequest):
+    """ 시뮬레이션 요청 검증, 잘못된 요청이면 ValueError """
+    if params.start_date > params.end_date:
+        raise ValueError("Start date must be before end date")
+    if len(params.portfolio) == 0:
+        raise ValueError("Portfolio must not be empty")
+    if not 0 < params.paths <= SIMULATION_MAX_PATHS:
+        raise ValueError(f"Paths must be between 1 and {SIMULATION_MAX_PATHS}")
+    if not 0 < params.years <= SIMULATION_MAX_YEARS:
+        raise ValueError(f"Years must be between 1 and {SIMULATION_MAX_YEARS}")
+    if params.block_size <= 0:
+        raise ValueError("Block size must be positive")
+    if params.cashflow_freq not in EVENT_INTERVALS:
+        raise ValueError(f"Cashflow frequency must be one of {', '.join(EVENT_INTERVALS)}")
+    if any(not 0 <= q <= 100 for q in params.percentiles):
+        raise ValueError("Percentiles must be between 0 and 100")
+    for portfolio in params.portfolio:
+        if portfolio.rebalance_freq == "custom":
+            # 리샘플링한 경로에는 달력 날짜가 없음
+            raise ValueError("Custom schedules are not supported in simulations")
+        if portfolio.rebalance_freq != "none" and portfolio.rebalance_freq not in EVENT_INTERVALS:
+            raise ValueError(f"Rebalance frequency must be one of none, {', '.join(EVENT_INTERVALS)}")
+    if any(portfolio.strategy != "rebalance" for portfolio in params.portfolio):
+        # 리샘플링한 수익률 경로에는 가격 기반 신호를 적용할 수 없음
+        raise ValueError("Simulation only supports the rebalance strategy")
+
+
+def historical_returns(portfolio: PortfolioItem, data: Dict[str, pd.DataFrame]) -> np.ndarray:
+    """ 포트폴리오 종목의 일별 총수익률(배당 포함) [T-1, A] (allocation 순서) """
+    tickers = [item.upper() for item in portfolio.allocation]
+    frames = {ticker: data[ticker] for ticker in tickers}
+    dates, close, _ = build_price_matrix(frames)
+    dividends = dividend_matrix(frames, dates, tickers)
+    return (close[1:] + dividends[1:]) / close[:-1] - 1
+
+
+def bootstrap_indices(rng: np.random.Generator, n_history: int, paths: int, horizon: int, block_size: int) -> np.ndarray:
+    """ 길이 block_size의 연속 구간을 복원추출해 이어붙인 과거 수익률 index [horizon, paths] (시간축 우선) """
+    n_blocks = -(-horizon // block_size)
+    starts = rng.integers(0, n_history - block_size + 1, size=(n_blocks, paths))
+    return (starts[:, None, :] + np.arange(block_size)[:, None]).reshape(-1, paths)[:horizon]
+
+
+def simulate_paths(
+        returns: np.ndarray,
+        weights: np.ndarray,
+        initial_capital: float,
+        cashflow: float,
+        cashflow_every: int,
+        rebalance_every: int,
+        years: int,
+        block_size: int,
+        paths: int,
+        rng: np.random.Generator,
+        commission: float = COMMISSION,
+) -> Dict[str, np.ndarray]:
+    """
+    block bootstrap으로 만든 paths개의 미래 경로를 시뮬레이션
+    보유금액은 이벤트(캐시플로우, 리밸런싱) 사이에서 종목별 누적 수익률로만 변하므로
+    구간마다 cumprod 한 번으로 [days, paths, assets]를 계산하고, 이벤트 bar에서만 보유금액을 갱신한다.
+    구간은 연말에서도 끊어 한 번에 다루는 배열 크기를 [252, chunk, assets] 이하로 제한한다.
+
+    Output: {"year_values": [paths, years] 연말 평가금액, "max_drawdown": [paths] (%), "twr": [paths] 시간가중 누적 수익률 배수}
+    """
+    horizon = years * TRADING_DAYS
+    cash_days = np.arange(cashflow_every - 1, horizon, cashflow_every) if cashflow else np.array([], dtype=np.int64)
+    rebalance_days = np.arange(rebalance_every - 1, horizon, rebalance_every) if rebalance_every else np.array([], dtype=np.int64)
+    year_ends = np.arange(TRADING_DAYS - 1, horizon, TRADING_DAYS)
+    bounds = np.union1d(np.union1d(cash_days, rebalance_days), year_ends)
+    is_cash = np.isin(bounds, cash_days)
+    is_rebalance = np.isin(bounds, rebalance_days)
+
+    growth_history = 1 + returns
+    year_values = np.empty((paths, years))
+    max_drawdown = np.empty(paths)
+    twr = np.empty(paths)
+
+    for chunk_start in range(0, paths, SIMULATION_CHUNK_PATHS):
+        n = min(SIMULATION_CHUNK_PATHS, paths - chunk_start)
+        chunk = slice(chunk_start, chunk_start + n)
+        index = bootstrap_indices(rng, len(returns), n, horizon, block_size)
+
+        # 초기 매수는 vector engine과 동일하게 수수료를 포함해 보유 현금 안에서 매수
+        holdings = np.outer(np.full(n, initial_capital / (1 + commission)), weights)
+        base = holdings.sum(axis=1)   # 구간 시작 시점의 평가금액
+        level = base / initial_capital  # 구간 시작 시점의 시간가중 지수
+        peak = level.copy()
+        trough = np.ones(n)           # 고점 대비 최저 비율
+
+        seg_start = 0
+        for seg_end, cash_event, rebalance_event in zip(bounds, is_cash, is_rebalance):
+            growth = np.cumprod(np.take(growth_history, index[seg_start:seg_end + 1], axis=0), axis=0)  # [L, n, A]
+            values = np.matmul(growth.transpose(1, 0, 2), holdings[:, :, None])[:, :, 0].T  # [L, n]
+            levels = values * (level / base)
+
+            running_peak = np.maximum.accumulate(levels, axis=0)
+            np.maximum(running_peak, peak, out=running_peak)
+            trough = np.minimum(trough, (levels / running_peak).min(axis=0))
+            peak = running_peak[-1]
+
+            holdings = holdings * growth[-1]
+            value = values[-1]
+            level = levels[-1]
+            if (seg_end + 1) % TRADING_DAYS == 0:
+                year_values[chunk, seg_end // TRADING_DAYS] = value
+
+            # 이벤트 : 입금액은 목표 비중대로 매수, 리밸런싱은 거래금액에 수수료 부과
+            inflow = cashflow if cash_event else 0.0
+            if rebalance_event:
+                trade = (value + inflow)[:, None] * weights - holdings
+                cost = np.abs(trade).sum(axis=1) * commission
+                holdings = (value + inflow - cost)[:, None] * weights
+            elif inflow:
+                holdings = holdings + inflow / (1 + commission) * weights
+            after = holdings.sum(axis=1)
+            # 수수료만큼 시간가중 지수 차감 (입금액은 수익률에서 제외)
+            level = level * after / (value + inflow)
+            base = after
+            seg_start = seg_end + 1
+
+        max_drawdown[chunk] = (1 - trough) * 100
+        twr[chunk] = level
+    return {"year_values": year_values, "max_drawdown": max_drawdown, "twr": twr}
+
+
+def run_simulation_shard(params: SimulationRequest, portfolio: PortfolioItem, returns: np.ndarray, paths: int, seed: np.random.SeedSequence) -> Dict[str, np.ndarray]:
+    """ 프로세스 풀에서 실행하는 경로 일부(shard)의 시뮬레이션 """
+    if len(returns) < params.block_size:
+        raise ValueError(f"Not enough price history for block size {params.block_size} ({len(returns)} returns)")
+    weights = np.array([weight / 100 for weight in portfolio.allocation.values()])
+    return simulate_paths(
+        returns,
+        weights,
+        params.initial_capital,
+        params.cashflow,
+        EVENT_INTERVALS[params.cashflow_freq],
+        0 if portfolio.rebalance_freq == "none" else EVENT_INTERVALS[portfolio.rebalance_freq],
+        params.years,
+        params.block_size,
+        paths,
+        np.random.default_rng(seed),
+    )
+
+
+def simulation_shards(params: SimulationRequest, workers: int) -> List[tuple]:
+    """ 경로를 최대 workers개의 shard로 나누고 shard별로 독립된 난수 seed 부여 -> [(paths, seed)] """
+    count = max(1, min(workers, params.paths // SIMULATION_SHARD_PATHS))
+    sizes = [params.paths // count + (i < params.paths % count) for i in range(count)]
+    return list(zip(sizes, np.random.SeedSequence(params.seed).spawn(count)))
+
+
+def summarize_simulation(params: SimulationRequest, portfolio: PortfolioItem, shards: List[Dict[str, np.ndarray]]) -> dict:
+    """
+    shard 결과를 합쳐 percentile 구간으로 요약
+    Output:
+    {
+        "name": str,
+        "contributions": float,                       # 초기 자본 + 총 입금액
+        "terminal_value": [float], "max_drawdown": [float], "cagr": [float],   # percentiles 순서
+        "bands": {"year": [int], "value": [[float]]}  # 연말 평가금액의 percentile 구간 [percentile][year]
+    }
+    """
+    year_values = np.concatenate([shard["year_values"] for shard in shards])
+    max_drawdown = np.concatenate([shard["max_drawdown"] for shard in shards])
+    cagr = (np.concatenate([shard["twr"] for shard in shards]) ** (1 / params.years) - 1) * 100
+    events_per_year = TRADING_DAYS // EVENT_INTERVALS[params.cashflow_freq]
+
+    q = params.percentiles
+    return {
+        "name": portfolio.name,
+        "contributions": params.initial_capital + params.cashflow * events_per_year * params.years,
+        "terminal_value": np.round(np.percentile(year_values[:, -1], q), 2).tolist(),
+        "max_drawdown": np.round(np.percentile(max_drawdown, q), 2).tolist(),
+        "cagr": np.round(np.percentile(cagr, q), 4).tolist(),
+        "bands": {
+            "year": list(range(1, params.years + 1)),
+            "value": np.round(np.percentile(year_values, q, axis=0), 2).tolist(),
+        },
+    }
@@ -0,0 +1,134 @@
+from typing import Dict, Optional
+import pandas as pd
+import numpy as np
+
+
+class SignalStrategy:
+    """
+    포트폴리오 종목별 노출(0~1)을 가격 행렬 전체에서 한 번에 계산하는 전략
+    목표 비중 = allocation x 노출, 노출이 줄어든 만큼은 현금으로 보유
+    - defaults : 전략 파라미터와 기본값 (요청의 strategy_params로 변경)
+    - exposure() : close [T, A] -> [T, A] (None이면 항상 목표 비중 그대로 보유)
+    신호는 해당 bar 종가까지의 데이터로 계산하고, 다음 bar에 반영해 미래 가격을 사용하지 않는다.
+    """
+    name = ""
+    defaults: Dict[str, float] = {}
+
+    def resolve(self, overrides: Dict[str, float]) -> Dict[str, float]:
+        """ 기본값에 요청 파라미터를 덮어쓰고 검증, 잘못된 값이면 ValueError """
+        unknown = set(overrides) - set(self.defaults)
+        if unknown:
+            raise ValueError(f"Unknown parameters for strategy '{self.name}': {', '.join(sorted(unknown))}")
+        params = {**self.defaults, **overrides}
+        self.validate(params)
+        return params
+
+    def validate(self, params: Dict[str, float]):
+        pass
+
+    def signals(self, close: np.ndarray, params: Dict[str, float]) -> Optional[np.ndarray]:
+        """ 각 bar 종가 기준 신호 [T, A] """
+        return None
+
+    def exposure(self, close: np.ndarray, params: Dict[str, float]) -> Optional[np.ndarray]:
+        """ 각 bar에서 보유할 노출 [T, A] (신호를 한 bar 뒤로 미룸, 첫 bar는 현금) """
+        signals = self.signals(close, params)
+        if signals is None:
+            return None
+        exposure = np.zeros(signals.shape, dtype=np.float64)
+        exposure[1:] = signals[:-1]
+        return exposure
+
+
+# 요청의 strategy 이름 -> 전략
+STRATEGIES: Dict[str, SignalStrategy] = {}
+
+
+def register(cls):
+    """ 전략 등록 (class decorator) """
+    STRATEGIES[cls.name] = cls()
+    return cls
+
+
+def rolling_mean(values: np.ndarray, period: int) -> np.ndarray:
+    """ 열별 단순 이동평균 [T, A] (기간이 채워지기 전은 NaN) """
+    mean = np.full(values.shape, np.nan)
+    if len(values) >= period:
+        total = np.cumsum(np.vstack([np.zeros((1, values.shape[1])), values]), axis=0)
+        mean[period - 1:] = (total[period:] - total[:-period]) / period
+    return mean
+
+
+def check_period(params: Dict[str, float], *names: str):
+    for name in names:
+        if params[name] < 1 or params[name] != int(params[name]):
+            raise ValueError(f"{name} must be a positive integer")
+
+
+@register
+class Rebalance(SignalStrategy):
+    """ 목표 비중을 계속 보유하고 리밸런싱 일정에 맞춰 되돌림 (기본) """
+    name = "rebalance"
+
+
+@register
+class SimpleMovingAverage(SignalStrategy):
+    """ 단기 이동평균이 장기 이동평균 위에 있는 종목만 보유 """
+    name = "sma"
+    defaults = {"short_period": 20, "long_period": 50}
+
+    def validate(self, params):
+        check_period(params, "short_period", "long_period")
+        if params["short_period"] >= params["long_period"]:
+            raise ValueError("short_period must be less than long_period")
+
+    def signals(self, close, params):
+        short = rolling_mean(close, int(params["short_period"]))
+        long = rolling_mean(close, int(params["long_period"]))
+        return (short > long).astype(np.float64)
+
+
+@register
+class RSI(SignalStrategy):
+    """ RSI가 lower 아래로 내려가면 매수, upper 위로 올라가면 매도 (그 사이에서는 이전 상태 유지) """
+    name = "rsi"
+    defaults = {"period": 14, "upper": 70, "lower": 30}
+
+    def validate(self, params):
+        check_period(params, "period")
+        if not 0 <= params["lower"] < params["upper"] <= 100:
+            raise ValueError("RSI thresholds must satisfy 0 <= lower < upper <= 100")
+
+    def signals(self, close, params):
+        period = int(params["period"])
+        change = np.diff(close, axis=0, prepend=np.nan)
+        # Wilder 평활 (alpha = 1 / period)을 모든 종목에 대해 한 번에 계산
+        gain = pd.DataFrame(np.clip(change, 0, None)).ewm(alpha=1 / period, adjust=False, min_periods=period).mean().to_numpy()
+        loss = pd.DataFrame(np.clip(-change, 0, None)).ewm(alpha=1 / period, adjust=False, min_periods=period).mean().to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = np.where(loss == 0, 100.0, 100 - 100 / (1 + gain / loss))
+        rsi[np.isnan(gain)] = np.nan
+
+        # 매수/매도 신호가 없는 bar는 직전 상태를 이어감
+        events = np.where(rsi < params["lower"], 1.0, np.where(rsi > params["upper"], 0.0, np.nan))
+        return pd.DataFrame(events).ffill().fillna(0.0).to_numpy()
+
+
+def validate_strategy(name: str, params: Dict[str, float]):
+    """ 전략 이름과 파라미터 검증, 잘못된 값이면 ValueError """
+    if name not in STRATEGIES:
+        raise ValueError(f"Strategy must be one of {', '.join(STRATEGIES)}")
+    STRATEGIES[name].resolve(params)
+
+
+def strategy_exposure(name: str, params: Dict[str, float], close: np.ndarray) -> Optional[np.ndarray]:
+    """ 전략의 bar별 종목 노출 [T, A] (항상 목표 비중을 보유하는 전략이면 None) """
+    strategy = STRATEGIES[name]
+    return strategy.exposure(close, strategy.resolve(params))
+
+
+def exposure_changes(exposure: np.ndarray) -> np.ndarray:
+    """ 노출이 직전 bar와 달라지는 bar [T] bool (첫 bar는 초기 매수에서 반영) """
+    changed = np.zeros(len(exposure), dtype=bool)
+    changed[1:] = (exposure[1:] != exposure[:-1]).any(axis=1)
+    return changed
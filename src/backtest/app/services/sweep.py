@@ -0,0 +1,123 @@
+from typing import Dict, List
+from pydantic import BaseModel
+import pandas as pd
+import numpy as np
+import os
+
+from .vector_engine import build_price_matrix, simulate
+from .price_store import dividend_matrix
+from .schedules import event_mask, validate_schedule
+from .metrics import cagr, max_drawdown, volatility
+
+SWEEP_MAX_COMBINATIONS = int(os.getenv("SWEEP_MAX_COMBINATIONS", 5000))
+SWEEP_CHUNK_SIZE = int(os.getenv("SWEEP_CHUNK_SIZE", 256))  # 한 번에 시뮬레이션하는 조합 수 (메모리 제한)
+
+
+# --- Input Data Schema ---
+class SweepRequest(BaseModel):
+    start_date: str
+    end_date: str
+    initial_capital: float
+    tickers: List[str]
+    allocations: List[Dict[str, float]] = []          # e.g., [{"SPY": 60, "TLT": 40}, ...]
+    grid: Dict[str, List[float]] = {}                 # e.g., {"SPY": [40, 50, 60], "TLT": [40, 50, 60]} => 합이 100인 조합만 사용
+    rebalance_freqs: List[str] = ["monthly"]          # e.g., ["none", "monthly", "quarterly", "yearly"]
+    cashflows: List[float] = [0]
+    cashflow_freq: str = "monthly"
+    include_series: bool = False
+
+
+def grid_allocations(grid: Dict[str, List[float]], tickers: List[str]) -> np.ndarray:
+    """ 종목별 후보 비중의 모든 조합 중 합이 100인 것 [N, A] """
+    axes = [np.asarray(grid.get(ticker, [0]), dtype=np.float64) for ticker in tickers]
+    if np.prod([len(axis) for axis in axes], dtype=np.float64) > SWEEP_MAX_COMBINATIONS * 100:
+        raise ValueError("Allocation grid is too large")
+    combos = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, len(tickers))
+    return combos[np.isclose(combos.sum(axis=1), 100)]
+
+
+def sweep_allocations(params: SweepRequest) -> np.ndarray:
+    """ 요청의 allocation 목록과 grid를 합친 비중 행렬 [N, A] (단위 %) """
+    for freq in params.rebalance_freqs + [params.cashflow_freq]:
+        if freq == "custom":
+            raise ValueError("Custom schedules are not supported in sweeps")
+        validate_schedule(freq)
+    tickers = [ticker.upper() for ticker in params.tickers]
+    rows = [[{k.upper(): v for k, v in allocation.items()}.get(ticker, 0) for ticker in tickers] for allocation in params.allocations]
+    allocations = np.array(rows, dtype=np.float64).reshape(-1, len(tickers))
+    if params.grid:
+        grid = {k.upper(): v for k, v in params.grid.items()}
+        allocations = np.concatenate([allocations, grid_allocations(grid, tickers)])
+    if len(allocations) == 0:
+        raise ValueError("Either allocations or grid must be given")
+    if not np.allclose(allocations.sum(axis=1), 100):
+        raise ValueError("Each allocation must sum to 100")
+    return allocations
+
+
+def run_sweep(params: SweepRequest, data: Dict[str, pd.DataFrame]) -> dict:
+    """
+    하나의 종목 유니버스에서 비중 x 리밸런싱 주기 x 캐시플로우 조합을 한 번에 평가
+    가격 행렬과 스케줄은 한 번만 만들고, 조합 축으로 묶어서 simulate를 호출한다.
+    Output:
+    {
+        "tickers": [str],
+        "summary": {"allocation", "rebalance_freq", "cashflow", "final_value", "cagr", "max_drawdown", "volatility"},
+        "date": [str], "performance": [[float]]  # include_series인 경우만
+    }
+    """
+    tickers = [ticker.upper() for ticker in params.tickers]
+    allocations = sweep_allocations(params)
+
+    # 조합 : (비중 index, 리밸런싱 주기, 캐시플로우)
+    n_alloc, n_freq, n_cash = len(allocations), len(params.rebalance_freqs), len(params.cashflows)
+    total = n_alloc * n_freq * n_cash
+    if total > SWEEP_MAX_COMBINATIONS:
+        raise ValueError(f"Too many combinations ({total} > {SWEEP_MAX_COMBINATIONS})")
+    alloc_idx, freq_idx, cash_idx = (axis.ravel() for axis in np.meshgrid(np.arange(n_alloc), np.arange(n_freq), np.arange(n_cash), indexing="ij"))
+
+    frames = {ticker: data[ticker] for ticker in tickers}
+    dates, close, _ = build_price_matrix(frames)
+    # 배당은 모든 조합에서 지급 종목에 재투자 (총수익 기준 비교)
+    dividends = dividend_matrix(frames, dates, tickers)
+    freq_masks = np.stack([event_mask(dates, freq) for freq in params.rebalance_freqs])
+    cash_mask = event_mask(dates, params.cashflow_freq)
+    cash_amounts = np.asarray(params.cashflows, dtype=np.float64)
+
+    final_value = np.empty(total)
+    cagr_values, mdd_values, vol_values = np.empty(total), np.empty(total), np.empty(total)
+    series = [] if params.include_series else None
+
+    for start in range(0, total, SWEEP_CHUNK_SIZE):
+        chunk = slice(start, min(start + SWEEP_CHUNK_SIZE, total))
+        weights = allocations[alloc_idx[chunk]] / 100
+        rebalance_mask = freq_masks[freq_idx[chunk]]
+        cashflows = cash_amounts[cash_idx[chunk], None] * cash_mask
+
+        values = simulate(
+            close, weights, np.full(len(weights), params.initial_capital), cashflows, rebalance_mask,
+            dividends=dividends, reinvest=np.ones(len(weights), dtype=bool),
+        )
+        final_value[chunk] = values[:, -1]
+        cagr_values[chunk] = cagr(values, dates, cashflows)
+        mdd_values[chunk] = max_drawdown(values)
+        vol_values[chunk] = volatility(values, cashflows)
+        if series is not None:
+            series.extend(np.round(values, 2).tolist())
+
+    result = {
+        "tickers": tickers,
+        "summary": {
+            "allocation": [dict(zip(tickers, allocations[i].tolist())) for i in alloc_idx],
+            "rebalance_freq": [params.rebalance_freqs[i] for i in freq_idx],
+            "cashflow": cash_amounts[cash_idx].tolist(),
+            "final_value": np.round(final_value, 2).tolist(),
+            "cagr": np.round(cagr_values, 4).tolist(),
+            "max_drawdown": np.round(mdd_values, 4).tolist(),
+            "volatility": np.round(vol_values, 4).tolist(),
+        },
+    }
+    if series is not None:
+        result["date"] = np.datetime_as_string(dates, unit="D").tolist()
+        result["performance"] = series
+    return result
@@ -0,0 +1,13 @@
+# 가격 저장소의 종목 표기 규칙
+# scraper(src/stocks/scraper/prices/main.py)의 store_symbol/store_name과 같은 파일을 같은 이름으로 찾아야 하므로
+# 두 곳의 구현을 항상 같게 유지 (서비스별로 이미지를 따로 빌드하므로 코드를 import하지 않고 복사해 사용)
+
+
+def store_symbol(ticker: str) -> str:
+    """ yfinance 조회와 저장소에 쓰는 종목 표기 (brk.b, BRK.B, BRK-B -> BRK-B) """
+    return ticker.strip().upper().replace(".", "-")
+
+
+def store_name(ticker: str) -> str:
+    """ 저장소 파일 이름 (확장자 제외) """
+    return store_symbol(ticker).replace("/", "_")
@@ -0,0 +1,260 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import logging
+
+from .backtest import PortfolioItem, portfolio_frames
+from .metrics import backtest_report
+from .schedules import event_mask
+from .inflation import cpi_table, cashflow_amounts
+from .price_store import dividend_matrix
+from .rebalance import band_breach
+from .strategies import strategy_exposure, exposure_changes
+from .instrumentation import PhaseTimer
+
+logger = logging.getLogger('uvicorn.error')
+
+COMMISSION = 0.001
+
+
+# --- Price Matrix ---
+def build_price_matrix(frames: Dict[str, pd.DataFrame]) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    종목별 OHLCV DataFrame을 하나의 날짜축으로 정렬한 종가 행렬로 변환
+    Output: (dates[T] datetime64[D], close[T, A] float64, tickers[A])
+    """
+    tickers = list(frames)
+    close = pd.concat([frames[t]["close"].rename(t) for t in tickers], axis=1).sort_index()
+
+    # 거래일이 다른 종목은 직전 종가로 채우고, 모든 종목의 가격이 존재하는 시점부터 사용
+    close = close.ffill().dropna()
+    if close.empty:
+        raise ValueError("No overlapping price data for the given tickers")
+
+    dates = close.index.values.astype("datetime64[D]")
+    return dates, close.to_numpy(dtype=np.float64), tickers
+
+
+# --- Simulation ---
+def simulate(
+        close: np.ndarray,
+        weights: np.ndarray,
+        initial_capital: np.ndarray,
+        cashflows: np.ndarray,
+        rebalance_mask: np.ndarray,
+        commission: float = COMMISSION,
+        state: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+        return_state: bool = False,
+        dividends: Optional[np.ndarray] = None,
+        reinvest: Optional[np.ndarray] = None,
+        abs_band: Optional[np.ndarray] = None,
+        rel_band: Optional[np.ndarray] = None,
+        exposure: Optional[np.ndarray] = None,
+        exposure_changed: Optional[np.ndarray] = None,
+):
+    """
+    여러 포트폴리오(P)를 하나의 가격 행렬 위에서 동시에 시뮬레이션
+    포지션은 이벤트(초기 매수, 캐시플로우, 리밸런싱, 배당, 전략 신호 변경) 사이에서 변하지 않으므로
+    이벤트 bar에서만 상태를 갱신하고, 구간의 평가금액은 행렬곱으로 한 번에 계산한다.
+
+    close: [T, A] 종가, weights: [P, A] 목표 비중(합 1)
+    initial_capital: [P], cashflows: [P, T] bar별 입금액, rebalance_mask: [P, T]
+    state: 이전 실행의 (shares[P, A], cash[P]), 주어지면 초기 매수 없이 첫 bar부터 이어서 실행
+    dividends: [T, A] 주당 배당금 (price_store.dividend_matrix), 배당락일 종가 기준으로 현금 지급
+    reinvest: [P] 배당금으로 해당 종목을 바로 다시 매수할지 여부 (아니면 다음 리밸런싱까지 현금 보유)
+    abs_band, rel_band: [P] 리밸런싱 허용 범위 (rebalance.band_breach, 비중 단위), 주어지지 않으면 일정마다 항상 리밸런싱
+    exposure: [T, A] 전략의 bar별 종목 노출 (strategies.strategy_exposure), 목표 비중 = weights x exposure
+    exposure_changed: [T] 노출이 바뀌어 (허용 범위와 관계없이) 리밸런싱하는 bar, 주어지지 않으면 exposure에서 계산
+    Output: [P, T] bar별 포트폴리오 평가금액 (해당 bar의 배당 지급 후, 매매 이벤트 처리 전 기준)
+            return_state이면 (평가금액, 마지막 bar의 이벤트 처리 전 (shares, cash))
+    """
+    T = close.shape[0]
+    P = weights.shape[0]
+    values = np.empty((P, T), dtype=np.float64)
+    if state is None:
+        shares = np.zeros(weights.shape, dtype=np.float64)
+        cash = np.asarray(initial_capital, dtype=np.float64).copy()
+    else:
+        shares, cash = state[0].copy(), state[1].copy()
+
+    event_mask = rebalance_mask.any(axis=0) | (cashflows != 0).any(axis=0)
+    if dividends is not None:
+        event_mask |= (dividends != 0).any(axis=1)
+        reinvest = np.zeros(P, dtype=bool) if reinvest is None else np.asarray(reinvest, dtype=bool)
+    if exposure is not None:
+        if exposure_changed is None:
+            exposure_changed = exposure_changes(exposure)
+        event_mask |= exposure_changed
+    event_mask[0] = True
+    events = np.flatnonzero(event_mask)
+    bounds = np.append(events, T)
+    last_state = None
+    banded = abs_band is not None or rel_band is not None
+    if banded:
+        abs_band = np.zeros(P) if abs_band is None else np.asarray(abs_band, dtype=np.float64)
+        rel_band = np.zeros(P) if rel_band is None else np.asarray(rel_band, dtype=np.float64)
+
+    for t, seg_end in zip(events, bounds[1:]):
+        if t == T - 1 and not (t == 0 and state is None):
+            # 마지막 bar의 이벤트는 이어서 실행할 때 다시 처리하므로 처리 전 상태를 반환
+            last_state = (shares.copy(), cash.copy())
+        price = close[t]
+        if dividends is not None and (t > 0 or state is not None) and dividends[t].any():
+            payout = shares * dividends[t]
+            cash = cash + payout.sum(axis=1)
+            if reinvest.any():
+                # 배당금은 지급한 종목을 종가에 다시 매수 (수수료 포함)
+                bought = payout[reinvest] / (1 + commission)
+                shares[reinvest] += bought / price
+                cash[reinvest] -= payout[reinvest].sum(axis=1)
+        values[:, t] = cash + shares @ price
+        targets = weights if exposure is None else weights * exposure[t]
+
+        if t == 0 and state is None:
+            # 초기 매수 : 수수료를 포함해 보유 현금 안에서 목표 비중대로 매수
+            target = cash[:, None] * targets / (1 + commission)
+            shares = target / price
+            cash = cash - target.sum(axis=1) * (1 + commission)
+        else:
+            portfolio_value = values[:, t]
+            cash = cash + cashflows[:, t]
+
+            rebalance = rebalance_mask[:, t]
+            if banded and rebalance.any():
+                # 일정이 된 포트폴리오 중 허용 범위를 벗어난 포트폴리오만 한 번의 배열 연산으로 선택
+                rows = np.flatnonzero(rebalance)
+                current = shares[rows] * price / portfolio_value[rows, None]
+                rebalance = rebalance.copy()
+                rebalance[rows] = band_breach(current, targets[rows], abs_band[rows], rel_band[rows])
+            if exposure is not None and exposure_changed[t]:
+                rebalance = np.ones(P, dtype=bool)
+            if rebalance.any():
+                current = shares[rebalance] * price
+                target = portfolio_value[rebalance, None] * targets[rebalance]
+                trade = target - current
+                cash[rebalance] -= trade.sum(axis=1) + np.abs(trade).sum(axis=1) * commission
+                shares[rebalance] = target / price
+
+        if seg_end > t + 1:
+            values[:, t + 1:seg_end] = cash[:, None] + shares @ close[t + 1:seg_end].T
+    if return_state:
+        return values, last_state if last_state is not None else (shares, cash)
+    return values
+
+
+def run_vectorized_backtest(
+        start_date: str,
+        end_date: str,
+        initial_capital: float,
+        cashflow: float,
+        cashflow_freq: str,
+        adjust_inflation: bool,
+        portfolio: PortfolioItem,
+        data: Optional[Dict[str, pd.DataFrame]] = None,
+        cashflow_dates: Optional[List[str]] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+):
+    """
+    run_backtest와 동일한 입출력으로 NumPy 배열 연산 기반의 백테스트 수행
+    주문은 이벤트 bar의 종가로 체결된다고 가정 (Backtrader 엔진도 cheat-on-close로 같은 시점에 체결)
+    """
+    result, _ = extend_vectorized_backtest(
+        start_date, end_date, initial_capital, cashflow, cashflow_freq, adjust_inflation, portfolio, data, cashflow_dates, None, progress
+    )
+    return result
+
+
+def resume_bar(checkpoint: Optional[dict], dates: np.ndarray, close: np.ndarray, tickers: List[str]) -> Optional[int]:
+    """
+    checkpoint에서 이어서 실행할 bar index (이어서 실행할 수 없으면 None)
+    기존 날짜축이 새 날짜축의 앞부분과 같고, 마지막 bar의 종가가 바뀌지 않은 경우만 사용
+    (수정주가가 다시 계산되면 이전 구간의 결과도 달라지므로 처음부터 다시 실행)
+    """
+    if checkpoint is None or checkpoint["tickers"] != tickers:
+        return None
+    bar = len(checkpoint["dates"]) - 1
+    if bar + 1 >= len(dates) or not np.array_equal(checkpoint["dates"], dates[:bar + 1]):
+        return None
+    if not np.allclose(checkpoint["close"], close[bar], rtol=1e-9, atol=0):
+        return None
+    return bar
+
+
+def extend_vectorized_backtest(
+        start_date: str,
+        end_date: str,
+        initial_capital: float,
+        cashflow: float,
+        cashflow_freq: str,
+        adjust_inflation: bool,
+        portfolio: PortfolioItem,
+        data: Optional[Dict[str, pd.DataFrame]] = None,
+        cashflow_dates: Optional[List[str]] = None,
+        checkpoint: Optional[dict] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+) -> Tuple[dict, dict]:
+    """
+    같은 조건으로 더 짧은 기간을 실행한 checkpoint가 있으면 이후 bar만 시뮬레이션해 결과를 이어붙임
+    Output: (run_vectorized_backtest와 같은 결과, 마지막 bar 기준 checkpoint)
+    checkpoint : {"tickers", "dates", "close": 마지막 bar 종가, "values", "shares", "cash"}
+    - 마지막 bar의 이벤트는 다음 bar가 생겨야 확정되므로 (schedules.event_bars) 이벤트 처리 전 상태를 저장
+    - drawdown 고점, 수익률 등은 저장된 전체 series로 다시 계산
+    결과의 "profile"은 단계별 실행 시간 (fetch, prepare, run, extract, metrics)
+    """
+    timer = PhaseTimer()
+    with timer.phase("fetch"):
+        frames = portfolio_frames(portfolio, start_date, end_date, data)
+
+    with timer.phase("prepare"):
+        dates, close, tickers = build_price_matrix(frames)
+        weights = np.array([[portfolio.allocation[t] / 100 for t in tickers]])
+        dividends = dividend_matrix(frames, dates, tickers)
+        reinvest = np.array([portfolio.invest_dividends])
+        bands = {"abs_band": np.array([portfolio.abs_band / 100]), "rel_band": np.array([portfolio.rel_band / 100])}
+        # 전략 신호는 전체 가격 행렬에서 한 번에 계산 (과거 bar의 신호는 기간을 늘려도 바뀌지 않음)
+        exposure = strategy_exposure(portfolio.strategy, portfolio.strategy_params, close)
+        signals = {} if exposure is None else {"exposure": exposure, "exposure_changed": exposure_changes(exposure)}
+
+        # 이벤트 일정은 PortfolioRebalanceStrategy와 동일한 거래일 bar index
+        cashflows = cashflow_amounts(dates, event_mask(dates, cashflow_freq, cashflow_dates), max(cashflow, 0), adjust_inflation)[None, :]
+        rebalance_mask = event_mask(dates, portfolio.rebalance_freq, portfolio.rebalance_dates)[None, :]
+
+    with timer.phase("run"):
+        bar = resume_bar(checkpoint, dates, close, tickers)
+        if bar is None:
+            values, (shares, cash) = simulate(
+                close, weights, np.array([initial_capital]), cashflows, rebalance_mask, return_state=True, dividends=dividends, reinvest=reinvest,
+                **bands, **signals
+            )
+            values = values[0]
+        else:
+            logger.debug(f"Resume backtest from {dates[bar]} ({len(dates) - bar - 1} new bars)")
+            state = (checkpoint["shares"][None, :], np.array([checkpoint["cash"]]))
+            tail, (shares, cash) = simulate(
+                close[bar:], weights, np.array([initial_capital]), cashflows[:, bar:], rebalance_mask[:, bar:], state=state, return_state=True,
+                dividends=dividends[bar:], reinvest=reinvest, **bands, **{key: value[bar:] for key, value in signals.items()}
+            )
+            values = np.concatenate([checkpoint["values"][:bar], tail[0]])
+    if progress:
+        progress(len(dates), len(dates))
+
+    with timer.phase("extract"):
+        date_strings = np.datetime_as_string(dates, unit="D").tolist()
+    with timer.phase("metrics"):
+        # 계좌잔고는 소수점 둘째 자리까지만
+        report = backtest_report(dates, values, cashflows[0], cpi_table.deflator(dates), adjust_inflation)  # performance, drawdown, annual_returns, metrics
+    result = {
+        "name": portfolio.name,
+        "date": date_strings,
+        **report,
+        "profile": timer.profile(),
+    }
+    checkpoint = {
+        "tickers": tickers,
+        "dates": dates,
+        "close": close[-1],
+        "values": values,
+        "shares": shares[0],
+        "cash": float(cash[0]),
+    }
+    return result, checkpoint
@@ -0,0 +1,34 @@
+"""
+Backtest job worker
+API pod와 별도로 실행되어 공유 대기열(BACKTEST_JOB_STORE=redis)의 작업을 처리
+
+    python -m app.worker
+"""
+import threading
+import logging
+import signal
+
+from app.services.job_store import get_job_store
+from app.services.jobs import run_worker
+from app.services.hot_cache import start_refresh_thread
+from app.services.price_store import price_store
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('uvicorn.error')
+
+
+def main():
+    stop_event = threading.Event()
+    # 처리 중인 작업은 마치고 종료
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+
+    # 자주 쓰는 종목의 공유 메모리 맵 snapshot (Pod 안의 프로세스가 함께 사용)
+    start_refresh_thread(price_store)
+    logger.info("Backtest worker started")
+    run_worker(get_job_store(), stop_event)
+    logger.info("Backtest worker stopped")
+
+
+if __name__ == "__main__":
+    main()
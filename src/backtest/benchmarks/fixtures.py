@@ -0,0 +1,41 @@
+from typing import Dict, List
+import pandas as pd
+import numpy as np
+import zlib
+
+# 모든 fixture는 종목 이름으로 seed를 정하므로 같은 입력이면 항상 같은 가격을 생성
+FIXTURE_END = "2025-01-01"
+
+
+def synthetic_frame(ticker: str, start: str, end: str) -> pd.DataFrame:
+    """
+    price_store.get_frame과 같은 형식(Date index, open/high/low/close/volume/dividends/stock_splits)의 OHLCV
+    종가는 기하 브라운 운동, 시가/고가/저가는 종가 주변의 작은 변동, 배당은 분기 마지막 거래일에 종가의 0.4%
+    """
+    rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+    # 월~금 (pd.bdate_range보다 빠르게 만들어 수백 종목 fixture도 바로 생성)
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D"))
+    index = pd.DatetimeIndex(days[np.is_busday(days)].astype("datetime64[ns]"), name="Date")
+    drift, vol = rng.uniform(0.0001, 0.0005), rng.uniform(0.005, 0.02)
+    close = 100 * np.exp(np.cumsum(rng.normal(drift, vol, len(index))))
+    open_ = close * (1 + rng.normal(0, vol / 4, len(index)))
+    quarter = index.year.values * 4 + (index.month.values - 1) // 3
+    quarter_end = np.append(quarter[1:] != quarter[:-1], False)
+    return pd.DataFrame({
+        "open": open_,
+        "high": np.maximum(open_, close) * (1 + np.abs(rng.normal(0, vol / 4, len(index)))),
+        "low": np.minimum(open_, close) * (1 - np.abs(rng.normal(0, vol / 4, len(index)))),
+        "close": close,
+        "volume": rng.integers(1e5, 1e7, len(index)).astype(np.float64),
+        "dividends": np.where(quarter_end, close * 0.004, 0.0),
+        "stock_splits": np.zeros(len(index)),
+    }, index=index)
+
+
+def synthetic_tickers(count: int) -> List[str]:
+    return [f"SYN{i:03d}" for i in range(count)]
+
+
+def synthetic_data(tickers: List[str], start: str, end: str = FIXTURE_END) -> Dict[str, pd.DataFrame]:
+    """ load_frames와 같은 형태의 {TICKER: DataFrame} """
+    return {ticker: synthetic_frame(ticker, start, end) for ticker in tickers}
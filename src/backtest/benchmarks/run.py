@@ -0,0 +1,209 @@
+"""
+Offline benchmark of the backtest engines with synthetic price fixtures
+
+    cd src/backtest
+    python -m benchmarks.run                      # quick matrix, compare with the committed baseline
+    python -m benchmarks.run --matrix full        # tickers 1-500, years 1-30, portfolios 1-10
+    python -m benchmarks.run --update-baseline    # store the current results as the baseline (commit benchmarks/baseline.json)
+
+Each case runs in a fresh process so peak RSS is measured per case.
+Wall times depend on the machine, so every case is also expressed relative to a fixed calibration workload
+measured on the same host ("relative"), and only that ratio is compared with the committed baseline.
+Exit code is 1 if any case is slower than its baseline by more than --tolerance, or if there is no baseline to compare with.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+import multiprocessing
+import itertools
+import argparse
+import tempfile
+import resource
+import json
+import time
+import sys
+import os
+
+# 벤치마크는 가격 저장소나 yfinance를 사용하지 않음
+os.environ.setdefault("PRICE_STORE_DIR", tempfile.mkdtemp(prefix="backtest-bench-"))
+
+from benchmarks.fixtures import FIXTURE_END
+
+# 저장소에 포함된 기준 결과 (calibration 대비 비율로 비교하므로 host에 무관)
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+MATRICES = {
+    "quick": {
+        "tickers": [1, 10],
+        "years": [1, 10],
+        "portfolios": [1, 3],
+        "rebalance_freq": ["monthly"],
+    },
+    "full": {
+        "tickers": [1, 10, 50, 200, 500],
+        "years": [1, 10, 30],
+        "portfolios": [1, 5, 10],
+        "rebalance_freq": ["none", "monthly", "quarterly", "yearly"],
+    },
+}
+
+CALIBRATION_REPEAT = 10  # calibration 작업의 최소 반복 횟수 (가장 빠른 값 사용)
+
+# Backtrader는 bar x 종목 수에 비례해 느려지므로 이 크기를 넘는 case는 건너뜀 (--max-backtrader-size로 변경)
+MAX_BACKTRADER_SIZE = 10 * 252 * 10
+
+
+def case_id(engine: str, tickers: int, years: int, portfolios: int, rebalance_freq: str) -> str:
+    return f"{engine}:t{tickers}-y{years}-p{portfolios}-{rebalance_freq}"
+
+
+def run_case(engine: str, tickers: int, years: int, portfolios: int, rebalance_freq: str, repeat: int) -> Dict:
+    """ 새 프로세스에서 실행 : fixture 생성 후 포트폴리오별 엔진 실행 시간을 측정 """
+    from benchmarks.fixtures import synthetic_tickers, synthetic_data
+    from app.services.backtest import PortfolioItem
+    from app.services.runner import ENGINES
+
+    start_year = int(FIXTURE_END[:4]) - years
+    start_date, end_date = f"{start_year}-01-01", FIXTURE_END
+    names = synthetic_tickers(tickers)
+    data = synthetic_data(names, start_date, end_date)
+    bars = len(next(iter(data.values())))
+
+    # 포트폴리오마다 비중을 다르게 해 같은 결과가 재사용되지 않도록 함
+    items = []
+    for p in range(portfolios):
+        raw = [(i + p) % tickers + 1 for i in range(tickers)]
+        allocation = {name: weight * 100 / sum(raw) for name, weight in zip(names, raw)}
+        items.append(PortfolioItem(name=f"p{p}", allocation=allocation, drag=0, invest_dividends=False, rebalance_freq=rebalance_freq))
+
+    run_engine = ENGINES[engine]
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in items:
+            run_engine(start_date, end_date, 10000, 100, "monthly", False, item, data)
+        timings.append(time.perf_counter() - started)
+
+    wall = min(timings)
+    return {
+        "wall_s": round(wall, 4),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "bars": bars,
+        "bars_per_sec": round(bars * portfolios / wall, 1),
+    }
+
+
+def calibrate(repeat: int) -> float:
+    """
+    새 프로세스에서 실행 : host 속도의 기준이 되는 고정 작업 시간(초)
+    엔진과 같이 Python bar loop(backtrader)와 numpy 연산(vector engine)을 섞어, 두 엔진의 case를 같은 기준으로 나눈다.
+    """
+    import numpy as np
+
+    returns = np.random.default_rng(0).normal(0.0003, 0.01, size=(25200, 100))
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        values = np.cumprod(1 + returns, axis=0)
+        peak, worst = 0.0, 0.0
+        for row in values.tolist():
+            value = sum(row) / len(row)
+            peak = max(peak, value)
+            worst = min(worst, value / peak - 1)
+        np.linalg.eigvalsh(np.cov(returns, rowvar=False))
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def cases(matrix: Dict[str, List], engines: List[str], max_backtrader_size: int):
+    for engine, tickers, years, portfolios, freq in itertools.product(
+        engines, matrix["tickers"], matrix["years"], matrix["portfolios"], matrix["rebalance_freq"]
+    ):
+        if engine == "backtrader" and tickers * years * 252 * portfolios > max_backtrader_size:
+            continue
+        yield engine, tickers, years, portfolios, freq
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], calibration: float, tolerance: float, min_delta: float) -> List[str]:
+    """
+    baseline보다 relative가 tolerance 비율 이상, 이 host의 시간으로 min_delta초 이상 모두 느려진 case 목록
+    (수 ms 단위 case의 측정 오차 제외)
+    """
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        base = baseline[key]["relative"]
+        if result["relative"] > base * (1 + tolerance) and (result["relative"] - base) * calibration > min_delta:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    from app.services.runner import ENGINES
+
+    parser = argparse.ArgumentParser(description="Backtest engine benchmark")
+    parser.add_argument("--matrix", choices=MATRICES.keys(), default="quick")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES.keys(), default=list(ENGINES))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the fastest is reported")
+    parser.add_argument("--max-backtrader-size", type=int, default=MAX_BACKTRADER_SIZE, help="skip backtrader cases above tickers x bars x portfolios")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file (default: the committed benchmarks/baseline.json)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown ratio against the baseline")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="ignore slowdowns smaller than this many seconds on this host (scheduler jitter)")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["cases"]
+    elif not args.update_baseline:
+        print(f"[!] No baseline at {args.baseline}, nothing to compare with (record one with --update-baseline and commit it)")
+        sys.exit(1)
+
+    context = multiprocessing.get_context("spawn")
+
+    def measure_calibration() -> float:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            return pool.submit(calibrate, max(args.repeat, CALIBRATION_REPEAT)).result()
+
+    calibrations = [measure_calibration()]
+    results = {}
+    for case in cases(MATRICES[args.matrix], args.engines, args.max_backtrader_size):
+        key = case_id(*case)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results[key] = pool.submit(run_case, *case, args.repeat).result()
+
+    # host가 일시적으로 느려진 측정을 피하도록 case 실행 전후의 calibration 중 빠른 쪽을 사용
+    calibrations.append(measure_calibration())
+    calibration = min(calibrations)
+    print(f"Calibration: {calibration:.4f}s (before {calibrations[0]:.4f}s, after {calibrations[1]:.4f}s)")
+    print(f"{'case':<40} {'wall(s)':>9} {'relative':>9} {'base':>9} {'rss(MB)':>9} {'bars/s':>12}")
+    for key, result in results.items():
+        result["relative"] = round(result["wall_s"] / calibration, 4)
+        base = baseline.get(key, {}).get("relative")
+        print(f"{key:<40} {result['wall_s']:>9.4f} {result['relative']:>9.4f} {base if base is not None else '-':>9} {result['peak_rss_mb']:>9.1f} {result['bars_per_sec']:>12.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"calibration_s": round(calibration, 4), "cases": results}, f, indent=2)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump({"calibration_s": round(calibration, 4), "cases": dict(sorted(baseline.items()))}, f, indent=2)
+        print(f"Baseline updated for {len(results)} cases: {args.baseline}")
+        return
+
+    # baseline에 없는 case는 비교하지 않았음을 알림 (baseline은 --update-baseline으로만 기록)
+    missing = [key for key in results if key not in baseline]
+    if missing:
+        print(f"[!] {len(missing)} cases have no baseline and were NOT compared: {', '.join(missing)}")
+    regressions = compare(results, baseline, calibration, args.tolerance, args.min_delta)
+    for key in regressions:
+        print(f"[!] Regression {key}: relative {results[key]['relative']} > {baseline[key]['relative']} (+{args.tolerance:.0%})")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+
+from app.services.admission import AdmissionController, CostLimitError, ClientLimitError
+from app.services.executor import PoolBusyError
+
+
+def controller(**options) -> AdmissionController:
+    defaults = {"inline_cost": 0.1, "max_cost": 10, "max_running": 1, "queue_depth": 1, "queue_timeout": 5, "client_limit": 2}
+    return AdmissionController(**{**defaults, **options})
+
+
+def test_cost_tiers():
+    async def run():
+        admission = controller()
+        inline = await admission.acquire("a", 0.05)
+        queued = await admission.acquire("b", 5)
+        assert inline.inline and not queued.inline
+        # inline 요청은 실행 슬롯을 쓰지 않음
+        assert admission.running == 1
+        with pytest.raises(CostLimitError):
+            await admission.acquire("c", 11)
+        inline.release()
+        queued.release()
+        assert admission.running == 0 and not admission.clients
+    asyncio.run(run())
+
+
+def test_cost_limit_is_a_value_error():
+    # router는 ValueError를 400으로 변환
+    assert issubclass(CostLimitError, ValueError)
+
+
+def test_client_limit():
+    async def run():
+        admission = controller(max_running=4)
+        tickets = [await admission.acquire("a", 0.05), await admission.acquire("a", 5)]
+        with pytest.raises(ClientLimitError):
+            await admission.acquire("a", 0.05)
+        # 다른 client는 영향을 받지 않음
+        (await admission.acquire("b", 0.05)).release()
+        tickets[0].release()
+        tickets.append(await admission.acquire("a", 0.05))
+        for ticket in tickets:
+            ticket.release()
+        # release는 한 번만 반영
+        tickets[0].release()
+        assert admission.running == 0 and not admission.clients
+    asyncio.run(run())
+
+
+def test_queue_hands_slot_to_waiter_in_order():
+    async def run():
+        admission = controller(queue_depth=2, client_limit=10)
+        first = await admission.acquire("a", 5)
+        order = []
+
+        async def wait(name):
+            ticket = await admission.acquire(name, 5)
+            order.append(name)
+            return ticket
+
+        waiters = [asyncio.ensure_future(wait("b")), asyncio.ensure_future(wait("c"))]
+        await asyncio.sleep(0)
+        assert order == [] and admission.running == 1
+        first.release()
+        second = await waiters[0]
+        assert order == ["b"] and admission.running == 1
+        second.release()
+        (await waiters[1]).release()
+        assert order == ["b", "c"] and admission.running == 0
+    asyncio.run(run())
+
+
+def test_full_queue_and_timeout_raise_pool_busy():
+    async def run():
+        admission = controller(queue_depth=1, queue_timeout=0.05, client_limit=10)
+        running = await admission.acquire("a", 5)
+        waiting = asyncio.ensure_future(admission.acquire("b", 5))
+        await asyncio.sleep(0)
+        with pytest.raises(PoolBusyError):
+            await admission.acquire("c", 5)
+        with pytest.raises(PoolBusyError):
+            await waiting
+        # 거절된 요청은 client 수를 남기지 않음
+        assert set(admission.clients) == {"a"}
+        running.release()
+        assert admission.running == 0
+    asyncio.run(run())
@@ -0,0 +1,23 @@
+import asyncio
+import os
+import pytest
+
+from concurrent.futures.process import BrokenProcessPool
+from app.services.executor import BacktestPool
+
+
+def test_pool_recovers_after_worker_crash():
+    async def run():
+        pool = BacktestPool(size=1, queue_depth=1, timeout=60)
+        try:
+            assert await pool.submit(pow, 2, 10) == 1024
+            # 자식 프로세스 비정상 종료 (OOM kill 등)
+            with pytest.raises(BrokenProcessPool):
+                await pool.submit(os._exit, 1)
+            assert pool._pool is None
+            assert await pool.submit(pow, 3, 3) == 27
+            assert pool.pending == 0
+        finally:
+            pool.shutdown()
+    asyncio.run(run())
+
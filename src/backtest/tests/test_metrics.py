@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from app.services.metrics import performance_metrics, TRADING_DAYS
+
+DATES = np.arange(np.datetime64("2020-01-01", "D"), np.datetime64("2024-01-01", "D"))
+
+
+def test_constant_growth():
+    daily = 0.0003
+    values = 1000 * (1 + daily) ** np.arange(len(DATES))
+    metrics = performance_metrics(DATES, values)
+
+    years = (DATES[-1] - DATES[0]).astype(np.int64) / 365.25
+    expected_cagr = ((1 + daily) ** (len(DATES) - 1)) ** (1 / years) - 1
+    assert metrics["cagr"] == pytest.approx(expected_cagr * 100, abs=1e-4)
+    assert metrics["volatility"] == pytest.approx(0, abs=1e-6)
+    assert metrics["max_drawdown"]["max_drawdown"] == 0
+    assert metrics["monthly_returns"]["month"][:2] == ["2020-01", "2020-02"]
+    assert len(metrics["monthly_returns"]["month"]) == 48
+    # rolling 수익률은 bar 수 기준 (1461 bar > 252 x 5)
+    assert set(metrics["rolling_returns"]) == {"1y", "3y", "5y"}
+
+
+def test_drawdown_and_recovery():
+    values = np.full(len(DATES), 100.0)
+    values[100:200] = 80.0
+    values[200:] = 120.0
+    drawdown = performance_metrics(DATES, values)["max_drawdown"]
+    assert drawdown["max_drawdown"] == pytest.approx(20)
+    # 고점은 하락 직전 마지막으로 고점이었던 bar
+    assert drawdown["peak"] == str(DATES[99])
+    assert drawdown["trough"] == str(DATES[100])
+    assert drawdown["recovery"] == str(DATES[200])
+    assert drawdown["days"] == 101
+
+
+def test_cashflows_are_excluded_from_returns():
+    # 입금만 있고 가격 변동이 없으면 수익률 0 (t bar 입금액은 t+1 bar 평가금액부터 반영)
+    cashflows = np.zeros(len(DATES))
+    cashflows[::30] = 500
+    values = 1000 + np.concatenate([[0], np.cumsum(cashflows)[:-1]])
+    metrics = performance_metrics(DATES, values, cashflows)
+    assert metrics["cagr"] == pytest.approx(0, abs=1e-9)
+    assert metrics["max_drawdown"]["max_drawdown"] == pytest.approx(0, abs=1e-9)
+    assert metrics["sharpe"] is None
+
+
+def test_sharpe_uses_risk_free_rate():
+    rng = np.random.default_rng(0)
+    values = 1000 * np.cumprod(1 + rng.normal(0.0005, 0.01, len(DATES)))
+    returns = values[1:] / values[:-1] - 1
+    metrics = performance_metrics(DATES, values, risk_free=2)
+    expected = (returns - 0.02 / TRADING_DAYS).mean() / returns.std(ddof=1) * np.sqrt(TRADING_DAYS)
+    assert metrics["sharpe"] == pytest.approx(expected, abs=1e-4)
@@ -0,0 +1,32 @@
+import pytest
+
+from app.services.backtest import PortfolioItem
+from app.services.runner import ENGINES
+from benchmarks.fixtures import synthetic_data, synthetic_tickers
+
+# backtrader와 vector engine의 최종 평가액 허용 오차 (두 엔진 모두 종가에 체결하므로 남는 차이는 현금 여유분과 배당 재투자 시점뿐)
+PARITY_TOLERANCE = 0.005
+
+START, END = "2015-01-01", "2020-01-01"
+TICKERS = synthetic_tickers(3)
+
+
+@pytest.fixture(scope="module")
+def data():
+    return synthetic_data(TICKERS, START, END)
+
+
+@pytest.mark.parametrize("options, cashflow, cashflow_freq", [
+    ({"rebalance_freq": "none", "invest_dividends": False}, 0, "none"),
+    ({"rebalance_freq": "monthly", "invest_dividends": False}, 500, "monthly"),
+    ({"rebalance_freq": "quarterly", "invest_dividends": True}, 0, "none"),
+    ({"rebalance_freq": "yearly", "invest_dividends": True, "abs_band": 5}, 300, "monthly"),
+    ({"rebalance_freq": "monthly", "invest_dividends": False, "strategy": "sma", "strategy_params": {"short_period": 20, "long_period": 50}}, 0, "none"),
+], ids=["buy_and_hold", "monthly_cashflow", "quarterly_dividends", "yearly_band_dividends_cashflow", "sma"])
+def test_engines_agree(data, options, cashflow, cashflow_freq):
+    portfolio = PortfolioItem(name="parity", allocation={TICKERS[0]: 50, TICKERS[1]: 30, TICKERS[2]: 20}, drag=0, **options)
+    finals = {
+        engine: ENGINES[engine](START, END, 10000, cashflow, cashflow_freq, False, portfolio, data)["performance"][-1]
+        for engine in ("backtrader", "vector")
+    }
+    assert finals["backtrader"] == pytest.approx(finals["vector"], rel=PARITY_TOLERANCE)
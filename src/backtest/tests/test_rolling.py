@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from app.services.backtest import PortfolioItem
+from app.services.rolling import RollingRequest, portfolio_growth, run_rolling
+from benchmarks.fixtures import synthetic_data, synthetic_tickers
+
+TICKERS = synthetic_tickers(2)
+DATA = synthetic_data(TICKERS, "2005-01-01", "2020-01-01")
+
+
+def portfolio(allocation: dict) -> PortfolioItem:
+    return PortfolioItem(name="rolling", allocation=allocation, drag=0, rebalance_freq="yearly", invest_dividends=True)
+
+
+def test_lowercase_allocation_matches_uppercase():
+    # load_frames는 대문자 종목으로 데이터를 돌려줌
+    upper = portfolio({TICKERS[0]: 60, TICKERS[1]: 40})
+    lower = portfolio({TICKERS[0].lower(): 60, TICKERS[1].lower(): 40})
+    dates, values = portfolio_growth(upper, DATA)
+    lower_dates, lower_values = portfolio_growth(lower, DATA)
+    assert np.array_equal(dates, lower_dates)
+    assert np.allclose(values, lower_values)
+    assert values[0] == pytest.approx(1)
+
+
+def test_rolling_windows():
+    params = RollingRequest(start_date="2005-01-01", end_date="2020-01-01", portfolio=portfolio({TICKERS[0].lower(): 100}), years=10, step=21, include_series=True)
+    result = run_rolling(params, DATA)
+    assert result["windows"] == len(result["series"]["start"]) > 0
+    assert result["cagr"]["min"] <= result["cagr"]["percentiles"][2] <= result["cagr"]["max"]
+    assert result["worst"]["cagr"] == result["cagr"]["min"]
+    assert all(0 <= d <= 100 for d in result["series"]["max_drawdown"])
+
+
+def test_rolling_rejects_history_shorter_than_window():
+    params = RollingRequest(start_date="2005-01-01", end_date="2020-01-01", portfolio=portfolio({TICKERS[0]: 100}), years=20)
+    with pytest.raises(ValueError):
+        run_rolling(params, DATA)
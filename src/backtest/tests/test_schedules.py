@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from app.services.schedules import event_bars, event_mask
+
+
+def business_days(start: str, end: str) -> np.ndarray:
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D"))
+    return days[np.is_busday(days)]
+
+
+DATES = business_days("2020-01-01", "2021-01-01")
+
+
+def test_monthly_events_are_last_bar_of_each_month():
+    bars = event_bars(DATES, "monthly")
+    # 12월 말은 마지막 bar이므로 제외
+    assert len(bars) == 11
+    months = DATES.astype("datetime64[M]")
+    assert np.all(months[bars] != months[bars + 1])
+    assert str(DATES[bars[0]]) == "2020-01-31"
+
+
+def test_quarterly_and_yearly_events():
+    assert [str(d) for d in DATES[event_bars(DATES, "quarterly")]] == ["2020-03-31", "2020-06-30", "2020-09-30"]
+    dates = business_days("2018-01-01", "2021-01-01")
+    assert [str(d) for d in dates[event_bars(dates, "yearly")]] == ["2018-12-31", "2019-12-31"]
+
+
+def test_custom_dates_snap_to_next_trading_day():
+    # 2020-02-01은 토요일 -> 다음 거래일, 시작일 이전과 마지막 bar는 제외, 중복은 한 번만
+    bars = event_bars(DATES, "custom", ["2019-06-01", "2020-02-01", "2020-02-03", "2020-12-31"])
+    assert [str(d) for d in DATES[bars]] == ["2020-02-03"]
+
+
+def test_none_and_empty_dates():
+    assert len(event_bars(DATES, "none")) == 0
+    assert len(event_bars(DATES[:0], "monthly")) == 0
+
+
+def test_unknown_frequency_raises():
+    with pytest.raises(ValueError):
+        event_bars(DATES, "weekly")
+
+
+def test_event_mask_matches_event_bars():
+    mask = event_mask(DATES, "monthly")
+    assert mask.dtype == bool and len(mask) == len(DATES)
+    assert np.array_equal(np.flatnonzero(mask), event_bars(DATES, "monthly"))
@@ -0,0 +1,31 @@
+import ast
+import os
+import pytest
+
+from app.services import symbols
+
+# scraper는 별도 이미지로 빌드되어 import하지 않고 같은 구현을 복사해 사용하므로, 두 구현이 같은지 확인
+SCRAPER = os.path.join(os.path.dirname(__file__), "..", "..", "stocks", "scraper", "prices", "main.py")
+SAMPLES = ["BRK.B", "brk.b", "BRK-B", " spy ", "^GSPC", "BF/B", "005930.KS"]
+
+
+def scraper_functions() -> dict:
+    """ scraper의 store_symbol, store_name만 꺼내 실행 (scraper 의존성 없이) """
+    with open(SCRAPER) as f:
+        tree = ast.parse(f.read())
+    functions = [node for node in tree.body if isinstance(node, ast.FunctionDef) and node.name in ("store_symbol", "store_name")]
+    namespace = {}
+    exec(compile(ast.Module(body=functions, type_ignores=[]), SCRAPER, "exec"), namespace)
+    return namespace
+
+
+@pytest.mark.parametrize("name", ["store_symbol", "store_name"])
+def test_scraper_and_store_agree(name):
+    scraper = scraper_functions()
+    for ticker in SAMPLES:
+        assert scraper[name](ticker) == getattr(symbols, name)(ticker), ticker
+
+
+def test_store_symbol():
+    assert symbols.store_symbol(" brk.b ") == "BRK-B"
+    assert symbols.store_name("bf/b") == "BF_B"
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from app.services.backtest import PortfolioItem
+from app.services.vector_engine import simulate, run_vectorized_backtest, extend_vectorized_backtest
+from benchmarks.fixtures import synthetic_data, synthetic_tickers
+
+TICKERS = synthetic_tickers(3)
+
+
+def price_matrix(T: int = 300, A: int = 3) -> np.ndarray:
+    rng = np.random.default_rng(1)
+    return 100 * np.cumprod(1 + rng.normal(0.0003, 0.01, (T, A)), axis=0)
+
+
+def test_buy_and_hold_without_commission():
+    close = price_matrix()
+    weights = np.array([[0.5, 0.3, 0.2]])
+    values = simulate(close, weights, np.array([1000.0]), np.zeros((1, len(close))), np.zeros((1, len(close)), dtype=bool), commission=0)
+    expected = 1000 * (weights[0] * close / close[0]).sum(axis=1)
+    assert np.allclose(values[0], expected)
+
+
+def test_rebalance_restores_target_weights():
+    close = price_matrix()
+    weights = np.array([[0.5, 0.3, 0.2]])
+    mask = np.zeros((1, len(close)), dtype=bool)
+    mask[0, 100] = True
+    values, (shares, cash) = simulate(close, weights, np.array([1000.0]), np.zeros((1, len(close))), mask, commission=0, return_state=True)
+    # 리밸런싱 다음 bar부터 bar 100 종가 기준 목표 비중으로 보유
+    held = shares[0] * close[100] / values[0, 100]
+    assert np.allclose(held, weights[0])
+    assert cash[0] == pytest.approx(0, abs=1e-9)
+
+
+def test_portfolios_in_one_batch_match_individual_runs():
+    close = price_matrix()
+    T = len(close)
+    weights = np.array([[0.5, 0.3, 0.2], [0.0, 0.0, 1.0], [1 / 3, 1 / 3, 1 / 3]])
+    capital = np.array([1000.0, 500.0, 2000.0])
+    cashflows = np.zeros((3, T))
+    cashflows[0, ::21] = 100
+    mask = np.zeros((3, T), dtype=bool)
+    mask[0, ::63] = True
+    mask[2, ::21] = True
+    batch = simulate(close, weights, capital, cashflows, mask)
+    for p in range(3):
+        single = simulate(close, weights[p:p + 1], capital[p:p + 1], cashflows[p:p + 1], mask[p:p + 1])
+        assert np.allclose(batch[p], single[0])
+
+
+def test_commission_reduces_value():
+    close = price_matrix()
+    T = len(close)
+    mask = np.zeros((1, T), dtype=bool)
+    mask[0, ::21] = True
+    args = (close, np.array([[0.5, 0.3, 0.2]]), np.array([1000.0]), np.zeros((1, T)), mask)
+    assert simulate(*args, commission=0.001)[0, -1] < simulate(*args, commission=0)[0, -1]
+
+
+@pytest.mark.parametrize("options", [
+    {"rebalance_freq": "monthly", "invest_dividends": True},
+    {"rebalance_freq": "quarterly", "invest_dividends": False, "abs_band": 5},
+    {"rebalance_freq": "monthly", "invest_dividends": False, "strategy": "sma", "strategy_params": {"short_period": 20, "long_period": 50}},
+], ids=["monthly_dividends", "quarterly_band", "sma"])
+def test_checkpoint_resume_equals_full_run(options):
+    start, middle, end = "2012-01-01", "2016-07-15", "2020-01-01"
+    full_data = synthetic_data(TICKERS, start, end)
+    short_data = {ticker: df.loc[:middle] for ticker, df in full_data.items()}
+    portfolio = PortfolioItem(name="resume", allocation={TICKERS[0]: 50, TICKERS[1]: 30, TICKERS[2]: 20}, drag=0, **options)
+    args = (10000, 500, "monthly", False, portfolio)
+
+    _, checkpoint = extend_vectorized_backtest(start, middle, *args, short_data)
+    resumed, _ = extend_vectorized_backtest(start, end, *args, full_data, None, checkpoint)
+    full = run_vectorized_backtest(start, end, *args, full_data)
+
+    assert resumed["date"] == full["date"]
+    assert np.allclose(resumed["performance"], full["performance"])
+    assert resumed["metrics"] == full["metrics"]
+
+
+def test_checkpoint_is_ignored_when_prices_changed():
+    start, middle, end = "2012-01-01", "2016-07-15", "2020-01-01"
+    full_data = synthetic_data(TICKERS, start, end)
+    short_data = {ticker: df.loc[:middle] for ticker, df in full_data.items()}
+    portfolio = PortfolioItem(name="resume", allocation={TICKERS[0]: 60, TICKERS[1]: 40, TICKERS[2]: 0}, drag=0, rebalance_freq="monthly", invest_dividends=False)
+    args = (10000, 0, "none", False, portfolio)
+
+    _, checkpoint = extend_vectorized_backtest(start, middle, *args, short_data)
+    # 수정주가가 다시 계산된 경우 : checkpoint를 쓰지 않고 처음부터 실행
+    checkpoint["values"] = checkpoint["values"] * 2
+    checkpoint["close"] = checkpoint["close"] * 1.01
+    resumed, _ = extend_vectorized_backtest(start, end, *args, full_data, None, checkpoint)
+    assert np.allclose(resumed["performance"], run_vectorized_backtest(start, end, *args, full_data)["performance"])
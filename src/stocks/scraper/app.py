@@ -5,6 +5,8 @@ import sys
 AVAILABLE_JOBS = {
     "ticker": "ticker.main",
     "thirteenf": "thirteenf.main",
+    "cpi": "cpi.main",
+    "prices": "prices.main",
 }
 
 def main() -> None:
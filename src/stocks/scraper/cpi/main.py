@@ -0,0 +1,46 @@
+import os
+import sys
+import pandas as pd
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class Config:
+    # 미국 CPI-U (All Urban Consumers, 1982-84=100, 계절 조정 전) 월별 series
+    CPI_URL = os.getenv("CPI_URL", "https://fred.stlouisfed.org/graph/fredgraph.csv?id=CPIAUCNS")
+    # backtest 서비스의 CPI_PATH와 같은 위치 (shared volume)
+    CPI_OUTPUT = os.getenv("CPI_OUTPUT", "cpi.csv")
+
+
+def get_cpi():
+    df = pd.read_csv(Config.CPI_URL)
+
+    # FRED CSV의 날짜 컬럼 이름은 "DATE" 또는 "observation_date"
+    df.columns = ["date", "cpi"]
+    df["cpi"] = pd.to_numeric(df["cpi"], errors="coerce")
+    df = df.dropna()
+
+    print(f"[*] Got {len(df)} CPI items ({df['date'].iloc[0]} ~ {df['date'].iloc[-1]})")
+    return df
+
+def save_cpi(df, path):
+    # backtest 서비스가 읽는 중에 파일이 바뀌지 않도록 임시 파일에 쓴 뒤 교체
+    tmp_path = f"{path}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    print(f"[*] Saved CPI table to {path}")
+
+def run():
+    print(f"[*] Start CPI Scraper")
+    try:
+        df = get_cpi()
+    except Exception as e:
+        print(f"[!] Failed to get CPI: {e}")
+        sys.exit(1)
+
+    if df.empty:
+        print(f"[!] Empty CPI series")
+        sys.exit(1)
+
+    save_cpi(df, Config.CPI_OUTPUT)
@@ -0,0 +1,247 @@
+import pymysql
+import json
+import os
+import re
+import sys
+import pandas as pd
+import numpy as np
+import yfinance as yf
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class Config:
+    # backtest 서비스의 PRICE_ARCHIVE_DIR와 같은 위치 (shared volume)
+    PRICE_OUTPUT = os.getenv("PRICE_OUTPUT", "prices")
+    PRICE_START = os.getenv("PRICE_START", "1990-01-01")
+    # 쉼표로 구분한 종목 목록, 비어 있으면 market_stocks 전체
+    PRICE_TICKERS = [t.strip().upper() for t in os.getenv("PRICE_TICKERS", "").split(",") if t.strip()]
+    PRICE_WORKERS = int(os.getenv("PRICE_WORKERS", 4))        # 동시에 실행하는 yfinance 요청 수
+    PRICE_BATCH_SIZE = int(os.getenv("PRICE_BATCH_SIZE", 50))  # 요청 하나에 묶는 종목 수
+    PRICE_EMPTY_RETRY_DAYS = int(os.getenv("PRICE_EMPTY_RETRY_DAYS", 30))  # 데이터가 없던 종목(상장 폐지 등)을 다시 확인하는 간격
+
+# backtest 서비스 price_store와 같은 저장 형식 (종목별 파티션)
+# - <output>/<TICKER>.parquet : Date index, STORE_COLUMNS (float64)
+# - <output>/<TICKER>.json    : {"start", "end", "version"} 저장된 조회 구간 [start, end)
+STORE_COLUMNS = ["open", "high", "low", "close", "volume", "dividends", "stock_splits"]
+ACTION_COLUMNS = ["dividends", "stock_splits"]
+STORE_VERSION = 2
+
+SYMBOL_PATTERN = re.compile(r"^[A-Z0-9.\-]+$")
+SHORT_RANGE_DAYS = 7  # 이 일수 이하의 구간은 휴장일만 포함될 수 있어 데이터가 없어도 받은 것으로 기록
+
+
+# backtest 서비스 services/symbols.py와 같은 종목 표기 규칙 (같은 파일을 찾아야 하므로 두 곳을 항상 같게 유지)
+def store_symbol(ticker):
+    """ yfinance 조회와 저장소에 쓰는 종목 표기 (brk.b, BRK.B, BRK-B -> BRK-B) """
+    return ticker.strip().upper().replace(".", "-")
+
+def store_name(ticker):
+    """ 저장소 파일 이름 (확장자 제외) """
+    return store_symbol(ticker).replace("/", "_")
+
+
+def check_connectivity():
+    try:
+        conn = pymysql.connect(
+            host=os.environ['DB_HOST'],
+            user=os.environ['DB_USER'],
+            password=os.environ['DB_PASSWORD'],
+            database=os.environ['DB_NAME'],
+        )
+        with conn.cursor() as c:
+            c.execute("SELECT 1")
+        return True, conn
+    except (pymysql.Error, KeyError) as e:
+        print(f"[!] DB Connection Error: {e}")
+        return False, None
+
+def get_tickers():
+    """ 수집 대상 종목 (PRICE_TICKERS가 없으면 market_stocks 전체), 저장소 표기(store_symbol)로 변환 """
+    if Config.PRICE_TICKERS:
+        tickers = Config.PRICE_TICKERS
+    else:
+        is_connected, conn = check_connectivity()
+        if not is_connected:
+            raise RuntimeError("DB Connection Error")
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT ticker FROM market_stocks")
+                tickers = [row[0].strip().upper() for row in cur.fetchall()]
+        finally:
+            conn.close()
+    return sorted({store_symbol(t) for t in tickers if SYMBOL_PATTERN.match(t)})
+
+
+# --- Store ---
+def paths(ticker):
+    name = store_name(ticker)
+    return os.path.join(Config.PRICE_OUTPUT, f"{name}.parquet"), os.path.join(Config.PRICE_OUTPUT, f"{name}.json")
+
+def load_meta(ticker):
+    _, meta_path = paths(ticker)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return meta if meta.get("version") == STORE_VERSION else None
+
+def write_atomic(path, write):
+    # backtest 서비스가 읽는 중에 파일이 바뀌지 않도록 임시 파일에 쓴 뒤 교체
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def write_json(data):
+    def write(path):
+        with open(path, "w") as f:
+            json.dump(data, f)
+    return write
+
+def save(ticker, df, start, end):
+    data_path, meta_path = paths(ticker)
+    write_atomic(data_path, df.to_parquet)
+    write_atomic(meta_path, write_json({"start": start, "end": end, "version": STORE_VERSION}))
+
+def mark_empty(ticker):
+    """ 데이터가 없는 종목은 가격 파일 없이 확인 날짜만 기록 (backtest 서비스는 가격 파일이 없으면 사용하지 않음) """
+    _, meta_path = paths(ticker)
+    write_atomic(meta_path, write_json({"empty_checked": date.today().isoformat(), "version": STORE_VERSION}))
+
+
+def missing_range(meta, today):
+    """ 저장된 구간 밖에서 받아야 할 구간 [start, end), 받을 것이 없으면 None """
+    if meta is None:
+        return Config.PRICE_START, today
+    if "empty_checked" in meta:
+        retry = date.fromisoformat(meta["empty_checked"]) + timedelta(days=Config.PRICE_EMPTY_RETRY_DAYS)
+        return (Config.PRICE_START, today) if retry.isoformat() <= today else None
+    # 시작일을 앞당긴 경우 전체를 다시 받음 (앞/뒤 구간을 따로 받으면 분할 조정이 어긋날 수 있음)
+    if Config.PRICE_START < meta["start"]:
+        return Config.PRICE_START, today
+    if meta["end"] < today:
+        return meta["end"], today
+    return None
+
+
+# --- Download ---
+def normalize(df):
+    """ yfinance 결과 -> Date index, 소문자 STORE_COLUMNS """
+    df = df.rename(columns={
+        "Open": "open",
+        "High": "high",
+        "Low": "low",
+        "Close": "close",
+        "Volume": "volume",
+        "Dividends": "dividends",
+        "Stock Splits": "stock_splits",
+    })
+    df.index = pd.DatetimeIndex(df.index).tz_localize(None).normalize()
+    df.index.name = "Date"
+    df = df.reindex(columns=STORE_COLUMNS).astype(np.float64)
+    df[ACTION_COLUMNS] = df[ACTION_COLUMNS].fillna(0.0)
+    return df.dropna(subset=["close"])
+
+def is_short_range(start, end):
+    return (pd.Timestamp(end) - pd.Timestamp(start)).days <= SHORT_RANGE_DAYS
+
+def download(tickers, start, end):
+    """ 한 번의 요청으로 여러 종목 다운로드 (배당 미반영 종가 + 배당/분할) -> {ticker: DataFrame, 데이터 없으면 None} """
+    df = yf.download(tickers, start=start, end=end, group_by="ticker", actions=True, auto_adjust=False, progress=False, threads=False)
+    if df is None or df.empty:
+        # 휴장일 다음 날처럼 짧은 구간은 거래일이 없어 비어 있을 수 있음 (backtest price_store와 같은 기준)
+        if is_short_range(start, end):
+            return {ticker: None for ticker in tickers}
+        # yfinance는 요청 실패 시에도 빈 DataFrame을 반환하므로, 긴 구간의 묶음 전체가 비면 실패로 보고 다음 실행에서 다시 받음
+        raise RuntimeError("Empty response from yfinance")
+    result = {}
+    for ticker in tickers:
+        if ticker not in df.columns.get_level_values(0):
+            result[ticker] = None
+            continue
+        result[ticker] = normalize(df[ticker])
+    return result
+
+def merge(ticker, fetched, start, end):
+    """ 새로 받은 구간을 저장된 데이터에 병합, 저장된 데이터 이후의 분할은 저장된 가격에 반영 """
+    data_path, _ = paths(ticker)
+    meta = load_meta(ticker)
+    if meta is None or "empty_checked" in meta or start <= meta["start"] or not os.path.exists(data_path):
+        return fetched, start, end
+
+    stored = pd.read_parquet(data_path)
+    splits = fetched["stock_splits"]
+    splits = splits[(splits.index > stored.index[-1]) & (splits > 0)] if not stored.empty else splits.iloc[:0]
+    if not splits.empty:
+        ratio = float(splits.prod())
+        stored[["open", "high", "low", "close", "dividends"]] /= ratio
+        stored["volume"] *= ratio
+    df = pd.concat([stored, fetched])
+    df = df[~df.index.duplicated(keep="last")].sort_index()
+    return df, meta["start"], end
+
+def ingest_batch(tickers, start, end):
+    """ 같은 구간이 필요한 종목 묶음 하나를 받아 저장 -> (저장한 종목 수, 데이터 없는 종목 수) """
+    frames = download(tickers, start, end)
+    saved, empty = 0, 0
+    for ticker, frame in frames.items():
+        if frame is None or frame.empty:
+            meta = load_meta(ticker)
+            if meta is None or "empty_checked" in meta:
+                # 새 종목인데 데이터가 없으면 상장 폐지 등으로 보고 한동안 다시 받지 않음
+                mark_empty(ticker)
+                empty += 1
+            elif is_short_range(start, end):
+                # 휴장일만 포함된 짧은 구간은 데이터가 없어도 받은 것으로 기록
+                _, meta_path = paths(ticker)
+                write_atomic(meta_path, write_json({"start": meta["start"], "end": end, "version": STORE_VERSION}))
+            continue
+        df, coverage_start, coverage_end = merge(ticker, frame, start, end)
+        save(ticker, df, coverage_start, coverage_end)
+        saved += 1
+    return saved, empty
+
+
+def run():
+    print(f"[*] Start Price Scraper")
+    try:
+        tickers = get_tickers()
+    except Exception as e:
+        print(f"[!] Failed to get tickers: {e}")
+        sys.exit(1)
+    os.makedirs(Config.PRICE_OUTPUT, exist_ok=True)
+
+    # 오늘은 아직 확정되지 않은 데이터이므로 어제까지만 저장 (backtest price_store와 같은 기준)
+    today = date.today().isoformat()
+    groups = defaultdict(list)
+    for ticker in tickers:
+        missing = missing_range(load_meta(ticker), today)
+        if missing is not None:
+            groups[missing].append(ticker)
+    batches = [
+        (group[i:i + Config.PRICE_BATCH_SIZE], start, end)
+        for (start, end), group in groups.items()
+        for i in range(0, len(group), Config.PRICE_BATCH_SIZE)
+    ]
+    print(f"[*] {len(tickers)} tickers, {sum(len(g) for g in groups.values())} to update in {len(batches)} batches")
+
+    saved, empty, failed = 0, 0, 0
+    with ThreadPoolExecutor(max_workers=Config.PRICE_WORKERS) as executor:
+        futures = {executor.submit(ingest_batch, *batch): batch for batch in batches}
+        for future in as_completed(futures):
+            batch_tickers, start, end = futures[future]
+            try:
+                s, e = future.result()
+                saved += s
+                empty += e
+            except Exception as e:
+                failed += len(batch_tickers)
+                print(f"[!] Failed to ingest {batch_tickers[0]}.. ({len(batch_tickers)} tickers, {start} ~ {end}): {e}")
+
+    print(f"[*] Saved {saved} tickers, {empty} without data, {failed} failed")
+    if batches and saved == 0 and failed > 0:
+        sys.exit(1)